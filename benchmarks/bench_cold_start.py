@@ -0,0 +1,194 @@
+"""洪绘空调冷启动基准测试.
+
+运行方式::
+
+    pytest benchmarks/bench_cold_start.py --bench-budget-import 50 --bench-budget-available 2000
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+import subprocess
+import sys
+import time
+
+import pytest
+
+from homeassistant.components.climate import DOMAIN as CLIMATE_DOMAIN
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EVENT_STATE_CHANGED, STATE_UNAVAILABLE
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.setup import async_setup_component
+
+import custom_components.honghui_climate as integration
+from custom_components.honghui_climate.const import DOMAIN
+
+from harness import (
+    async_setup_fake_sources,
+    check_budgets,
+    create_virtual_entries,
+    percentile,
+    save_results,
+    summarize,
+    virtual_entity_ids,
+)
+
+ENTRY_COUNTS = (1, 10, 100)
+
+ROOT = Path(__file__).parents[1]
+
+# 集成的所有模块，按 Home Assistant 加载的顺序
+MODULES = (
+    f"custom_components.{DOMAIN}",
+    f"custom_components.{DOMAIN}.config_flow",
+    f"custom_components.{DOMAIN}.climate",
+    f"custom_components.{DOMAIN}.sensor",
+    f"custom_components.{DOMAIN}.diagnostics",
+)
+
+IMPORT_MARKER = "-- honghui_climate --"
+
+# 在新的解释器中先导入 Home Assistant 本身的依赖，只计时集成自己的模块
+IMPORT_SCRIPT = f"""
+import importlib, json, sys, time
+sys.path.insert(0, {str(ROOT)!r})
+import homeassistant.components.climate
+import homeassistant.components.sensor
+import homeassistant.config_entries
+import homeassistant.helpers.config_validation
+import homeassistant.helpers.restore_state
+print({IMPORT_MARKER!r}, file=sys.stderr, flush=True)
+start = time.perf_counter()
+for module in {MODULES!r}:
+    importlib.import_module(module)
+print(json.dumps(time.perf_counter() - start))
+"""
+
+
+def _import_once(importtime: bool = False) -> subprocess.CompletedProcess[str]:
+    """在子进程中导入一次集成模块."""
+    args = [sys.executable, "-X", "importtime"] if importtime else [sys.executable]
+    return subprocess.run(
+        [*args, "-c", IMPORT_SCRIPT],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+
+
+def _slowest_imports(stderr: str, limit: int = 10) -> list[dict[str, int | str]]:
+    """解析 -X importtime 的输出，返回自身耗时最长的集成模块及其依赖."""
+    rows = []
+    # 只统计标记之后的导入，格式: "import time:  self [us] | cumulative | imported package"
+    for line in stderr.partition(IMPORT_MARKER)[2].splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        rows.append(
+            {
+                "module": name.strip(),
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+            }
+        )
+    rows.sort(key=lambda row: row["self_us"], reverse=True)
+    return rows[:limit]
+
+
+def test_import_time(bench_params: dict, bench_budgets: dict, bench_output: Path) -> None:
+    """测量集成模块在新解释器中的导入时间."""
+    samples = [
+        json.loads(_import_once().stdout) for _ in range(bench_params["import_runs"])
+    ]
+    results = {
+        **summarize(samples),
+        "slowest": _slowest_imports(_import_once(importtime=True).stderr),
+    }
+    save_results(bench_output, "import_time", bench_params, results)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+    if exceeded := check_budgets({"import_ms": results["p50_ms"]}, bench_budgets):
+        pytest.fail("超出时间预算: " + "; ".join(exceeded))
+
+
+@pytest.mark.parametrize("entries", ENTRY_COUNTS)
+async def test_cold_start(
+    hass: HomeAssistant,
+    monkeypatch: pytest.MonkeyPatch,
+    entries: int,
+    bench_params: dict,
+    bench_budgets: dict,
+    bench_output: Path,
+) -> None:
+    """测量每个条目的设置时间，以及从开始设置到所有虚拟空调可用的时间."""
+    fake_acs, sensors = await async_setup_fake_sources(
+        hass, entries, bench_params["source_latency"]
+    )
+    config_entries = create_virtual_entries(hass, fake_acs, sensors)
+    fake_entity_ids = {fake_ac.entity_id for fake_ac in fake_acs}
+
+    setup_times: list[float] = []
+    original_setup_entry = integration.async_setup_entry
+
+    async def _timed_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+        start = time.perf_counter()
+        try:
+            return await original_setup_entry(hass, entry)
+        finally:
+            setup_times.append(time.perf_counter() - start)
+
+    monkeypatch.setattr(integration, "async_setup_entry", _timed_setup_entry)
+
+    # 每个虚拟空调第一次写入可用状态的时间
+    available_at: dict[str, float] = {}
+
+    @callback
+    def _async_state_changed(event: Event) -> None:
+        entity_id = event.data["entity_id"]
+        new_state = event.data["new_state"]
+        if (
+            new_state is None
+            or new_state.domain != CLIMATE_DOMAIN
+            or entity_id in fake_entity_ids
+            or entity_id in available_at
+            or new_state.state == STATE_UNAVAILABLE
+        ):
+            return
+        available_at[entity_id] = time.perf_counter()
+
+    unsub = hass.bus.async_listen(EVENT_STATE_CHANGED, _async_state_changed)
+    start = time.perf_counter()
+    assert await async_setup_component(hass, DOMAIN, {})
+    setup_done = time.perf_counter()
+    await hass.async_block_till_done()
+    unsub()
+
+    entity_ids = virtual_entity_ids(hass, config_entries)
+    missing = [entity_id for entity_id in entity_ids if entity_id not in available_at]
+    assert not missing, f"虚拟空调未变为可用: {missing}"
+
+    available = [available_at[entity_id] - start for entity_id in entity_ids]
+    results = {
+        "entries": entries,
+        "setup_component_ms": round((setup_done - start) * 1000, 3),
+        "setup_entry": summarize(setup_times),
+        "time_to_available": {
+            **summarize(available),
+            "all_ms": percentile(available, 1.0),
+        },
+    }
+    save_results(bench_output, f"cold_start_{entries}", bench_params, results)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+    for entry in config_entries:
+        await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+
+    if exceeded := check_budgets(
+        {
+            "setup_ms": results["setup_entry"]["p99_ms"],
+            "available_ms": results["time_to_available"]["all_ms"],
+        },
+        {key: bench_budgets[key] for key in ("setup_ms", "available_ms")},
+    ):
+        pytest.fail("超出时间预算: " + "; ".join(exceeded))
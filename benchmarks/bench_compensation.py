@@ -0,0 +1,158 @@
+"""洪绘空调闭环补偿在模拟房间中的控制效果和命令数量.
+
+运行方式::
+
+    pytest benchmarks/bench_compensation.py --bench-sim-hours 24
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+import json
+from pathlib import Path
+import random
+
+import pytest
+
+from custom_components.honghui_climate.compensation import CommandBudget, SetpointCompensator
+from custom_components.honghui_climate.const import (
+    COMPENSATION_GAIN,
+    COMPENSATION_INTEGRAL_TIME,
+    DEFAULT_COMPENSATION_MAX_OFFSET,
+    DEFAULT_COMPENSATION_MAX_PER_HOUR,
+    DEFAULT_COMPENSATION_MIN_INTERVAL,
+)
+
+from harness import save_results
+
+TARGET = 24.0
+STEP = 1
+MIN_TEMP = 16
+MAX_TEMP = 30
+# 温度传感器的上报间隔（秒）和噪声（°C）
+SENSOR_INTERVAL = 60
+SENSOR_NOISE = 0.05
+
+
+@dataclass
+class Scenario:
+    """一个模拟房间：室外温度、空调内部传感器的偏差和制冷/制热能力."""
+
+    name: str
+    heating: bool
+    outdoor: float
+    # 空调内部传感器读数减去房间实际温度
+    bias: float
+    # 压缩机运行时每秒改变的室温（°C）
+    capacity: float
+    # 房间与室外换热的时间常数（秒）
+    tau: float = 3 * 3600
+    # 空调自身恒温器的回差（°C）
+    thermostat_band: float = 0.5
+
+
+SCENARIOS = (
+    # 内机在吊顶附近，读数偏高，制冷时房间被过度降温
+    Scenario("cool_sensor_high", heating=False, outdoor=32, bias=1.5, capacity=0.0015),
+    # 内机读数偏低，制冷不足
+    Scenario("cool_sensor_low", heating=False, outdoor=32, bias=-1.0, capacity=0.0015),
+    # 热空气聚集在内机附近，制热时房间偏冷
+    Scenario("heat_sensor_high", heating=True, outdoor=5, bias=2.0, capacity=0.0025),
+)
+
+
+class ThermalPlant:
+    """一阶房间热模型和按内部传感器开关压缩机的空调."""
+
+    def __init__(self, scenario: Scenario, setpoint: float) -> None:
+        """初始化，房间从偏离目标 3°C 开始."""
+        self.scenario = scenario
+        self.setpoint = setpoint
+        self.room = TARGET - 3 if scenario.heating else TARGET + 3
+        self.running = False
+
+    def step(self) -> None:
+        """前进一秒."""
+        scenario = self.scenario
+        internal = self.room + scenario.bias
+        band = scenario.thermostat_band
+        if scenario.heating:
+            if internal < self.setpoint - band:
+                self.running = True
+            elif internal > self.setpoint + band:
+                self.running = False
+        else:
+            if internal > self.setpoint + band:
+                self.running = True
+            elif internal < self.setpoint - band:
+                self.running = False
+        self.room += (scenario.outdoor - self.room) / scenario.tau
+        if self.running:
+            self.room += scenario.capacity if scenario.heating else -scenario.capacity
+
+
+def simulate(scenario: Scenario, hours: float, compensate: bool, seed: int = 1) -> dict:
+    """运行一次模拟，返回后半段的控制误差和发送的命令."""
+    rng = random.Random(seed)
+    budget = CommandBudget(DEFAULT_COMPENSATION_MIN_INTERVAL, DEFAULT_COMPENSATION_MAX_PER_HOUR)
+    compensator = SetpointCompensator(
+        budget, DEFAULT_COMPENSATION_MAX_OFFSET, COMPENSATION_GAIN, COMPENSATION_INTEGRAL_TIME
+    )
+    plant = ThermalPlant(scenario, TARGET)
+    sent: list[int] = []
+    if compensate:
+        # 用户设置目标温度的命令
+        plant.setpoint = compensator.start(TARGET, plant.room, 0, STEP, MIN_TEMP, MAX_TEMP)
+        sent.append(0)
+
+    duration = int(hours * 3600)
+    errors: list[float] = []
+    for now in range(duration):
+        plant.step()
+        if now % SENSOR_INTERVAL:
+            continue
+        reading = round(plant.room + rng.gauss(0, SENSOR_NOISE), 1)
+        if now >= duration / 2:
+            errors.append(reading - TARGET)
+        if compensate and (
+            setpoint := compensator.update(
+                TARGET, reading, now, plant.setpoint, STEP, MIN_TEMP, MAX_TEMP
+            )
+        ) is not None:
+            plant.setpoint = setpoint
+            sent.append(now)
+
+    gaps = [later - earlier for earlier, later in zip(sent, sent[1:])]
+    return {
+        "mean_abs_error": round(sum(abs(error) for error in errors) / len(errors), 3),
+        "mean_error": round(sum(errors) / len(errors), 3),
+        "commands": len(sent),
+        "commands_per_hour": round(len(sent) / hours, 2),
+        "max_commands_in_hour": max(
+            (sum(1 for other in sent if start <= other < start + 3600) for start in sent),
+            default=0,
+        ),
+        "min_gap_s": min(gaps) if gaps else None,
+        "final_setpoint": plant.setpoint,
+    }
+
+
+@pytest.mark.parametrize("scenario", SCENARIOS, ids=lambda scenario: scenario.name)
+def test_compensation(scenario: Scenario, bench_params: dict, bench_output: Path) -> None:
+    """比较不补偿和闭环补偿时房间温度相对目标的误差，以及补偿发送的命令."""
+    hours = bench_params["sim_hours"]
+    results = {
+        "scenario": scenario.name,
+        "hours": hours,
+        "uncompensated": simulate(scenario, hours, compensate=False),
+        "compensated": simulate(scenario, hours, compensate=True),
+    }
+    save_results(bench_output, f"compensation_{scenario.name}", bench_params, results)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+    compensated = results["compensated"]
+    assert compensated["mean_abs_error"] < results["uncompensated"]["mean_abs_error"]
+    assert compensated["max_commands_in_hour"] <= DEFAULT_COMPENSATION_MAX_PER_HOUR
+    assert (
+        compensated["min_gap_s"] is None
+        or compensated["min_gap_s"] >= DEFAULT_COMPENSATION_MIN_INTERVAL
+    )
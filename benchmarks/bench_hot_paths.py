@@ -0,0 +1,192 @@
+"""洪绘空调实体热路径基准测试.
+
+运行方式::
+
+    pytest benchmarks --bench-entities 50 --bench-sensor-rate 10 --bench-output results.json
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+import tracemalloc
+
+import pytest
+
+from homeassistant.components.climate import DOMAIN as CLIMATE_DOMAIN
+from homeassistant.const import ATTR_ENTITY_ID, ATTR_TEMPERATURE
+from homeassistant.core import HomeAssistant
+from homeassistant.setup import async_setup_component
+
+from custom_components.honghui_climate.climate import HonghuiAirClimate
+from custom_components.honghui_climate.const import DOMAIN
+
+from harness import (
+    BenchEnvironment,
+    WriteRecorder,
+    async_setup_fake_sources,
+    create_virtual_entries,
+    save_results,
+    summarize,
+    virtual_entity_ids,
+)
+
+# 注入事件后等待合并窗口和延迟写入完成的时间（秒）
+SETTLE_TIME = 1.0
+
+
+@pytest.fixture
+def write_recorder(monkeypatch: pytest.MonkeyPatch) -> WriteRecorder:
+    """统计虚拟空调的 async_write_ha_state 调用."""
+    recorder = WriteRecorder()
+    original = HonghuiAirClimate.async_write_ha_state
+
+    def _recording_write(self: HonghuiAirClimate) -> None:
+        recorder.on_write(self.entity_id)
+        original(self)
+
+    monkeypatch.setattr(HonghuiAirClimate, "async_write_ha_state", _recording_write)
+    return recorder
+
+
+async def _async_setup_environment(
+    hass: HomeAssistant, entities: int, source_latency: float = 0.0
+) -> BenchEnvironment:
+    """创建假源实体和对应的虚拟空调."""
+    fake_acs, sensors = await async_setup_fake_sources(hass, entities, source_latency)
+    entries = create_virtual_entries(hass, fake_acs, sensors)
+    assert await async_setup_component(hass, DOMAIN, {})
+    await hass.async_block_till_done()
+    return BenchEnvironment(
+        hass, fake_acs, sensors, virtual_entity_ids(hass, entries), entries
+    )
+
+
+async def _async_drive_events(
+    env: BenchEnvironment,
+    recorder: WriteRecorder,
+    ac_rate: float,
+    sensor_rate: float,
+    duration: float,
+) -> dict[str, int]:
+    """按给定频率向所有源空调和温度传感器注入状态变化."""
+    rng = random.Random(0)
+    ac_interval = 1 / ac_rate if ac_rate > 0 else None
+    sensor_interval = 1 / sensor_rate if sensor_rate > 0 else None
+    counts = {"ac_events": 0, "sensor_events": 0}
+
+    start = time.perf_counter()
+    next_ac = start if ac_interval else float("inf")
+    next_sensor = start if sensor_interval else float("inf")
+    while (now := time.perf_counter()) - start < duration:
+        if now >= next_ac:
+            for fake_ac, virtual in zip(env.fake_acs, env.virtual_entities):
+                # 只改变属性（目标温度），模拟遥控器或云端同步
+                fake_ac._attr_target_temperature = 18 + counts["ac_events"] % 8
+                recorder.mark_event(virtual)
+                fake_ac.async_write_ha_state()
+            counts["ac_events"] += len(env.fake_acs)
+            next_ac += ac_interval
+        if now >= next_sensor:
+            for sensor, virtual in zip(env.sensors, env.virtual_entities):
+                recorder.mark_event(virtual)
+                env.hass.states.async_set(
+                    sensor,
+                    f"{25 + rng.uniform(-0.5, 0.5):.2f}",
+                    {"unit_of_measurement": "°C"},
+                )
+            counts["sensor_events"] += len(env.sensors)
+            next_sensor += sensor_interval
+        await asyncio.sleep(max(0.0, min(next_ac, next_sensor) - time.perf_counter()))
+
+    await asyncio.sleep(SETTLE_TIME)
+    await env.hass.async_block_till_done()
+    return counts
+
+
+async def test_event_ingestion(
+    hass: HomeAssistant,
+    bench_params: dict,
+    bench_output,
+    write_recorder: WriteRecorder,
+) -> None:
+    """事件到状态写入的延迟、写入次数和每个事件的内存分配."""
+    env = await _async_setup_environment(hass, bench_params["entities"])
+
+    # 第一轮：延迟和写入次数
+    write_recorder.reset()
+    counts = await _async_drive_events(
+        env,
+        write_recorder,
+        bench_params["ac_rate"],
+        bench_params["sensor_rate"],
+        bench_params["duration"],
+    )
+    events = counts["ac_events"] + counts["sensor_events"]
+    latency = summarize(write_recorder.latencies)
+    writes = write_recorder.writes
+
+    # 第二轮：在 tracemalloc 下重复，避免分配跟踪影响延迟测量
+    write_recorder.reset()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    alloc_counts = await _async_drive_events(
+        env,
+        write_recorder,
+        bench_params["ac_rate"],
+        bench_params["sensor_rate"],
+        min(bench_params["duration"], 2.0),
+    )
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    alloc_events = alloc_counts["ac_events"] + alloc_counts["sensor_events"]
+    net_blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+
+    await env.async_unload()
+
+    results = {
+        **counts,
+        "state_writes": writes,
+        "writes_per_event": round(writes / events, 4) if events else None,
+        "event_to_write_latency": latency,
+        "allocations": {
+            "events": alloc_events,
+            "net_blocks_per_event": round(net_blocks / alloc_events, 3) if alloc_events else None,
+            "peak_bytes_per_event": round(peak / alloc_events, 1) if alloc_events else None,
+        },
+    }
+    save_results(bench_output, "event_ingestion", bench_params, results)
+    assert writes <= events
+
+
+async def test_command_round_trip(
+    hass: HomeAssistant, bench_params: dict, bench_output
+) -> None:
+    """async_set_temperature、async_turn_on 和 async_turn_off 的往返时间."""
+    env = await _async_setup_environment(hass, 1, bench_params["source_latency"])
+    virtual = env.virtual_entities[0]
+    samples: dict[str, list[float]] = {
+        "set_temperature": [],
+        "turn_on": [],
+        "turn_off": [],
+    }
+
+    async def _async_timed_call(service: str, data: dict) -> None:
+        start = time.perf_counter()
+        await hass.services.async_call(
+            CLIMATE_DOMAIN, service, {ATTR_ENTITY_ID: virtual, **data}, blocking=True
+        )
+        samples[service].append(time.perf_counter() - start)
+
+    for index in range(bench_params["commands"]):
+        await _async_timed_call("set_temperature", {ATTR_TEMPERATURE: 18 + index % 8})
+        await _async_timed_call("turn_off", {})
+        await _async_timed_call("turn_on", {})
+
+    await env.async_unload()
+
+    results = {service: summarize(values) for service, values in samples.items()}
+    save_results(bench_output, "command_round_trip", bench_params, results)
+    assert all(values for values in samples.values())
@@ -0,0 +1,49 @@
+"""比较两次基准测试结果.
+
+用法::
+
+    python benchmarks/compare.py old.json new.json
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+import sys
+from typing import Any
+
+
+def _flatten(prefix: str, value: Any, out: dict[str, float]) -> None:
+    """把嵌套结果展开为 "a.b.c" -> 数值."""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _flatten(f"{prefix}.{key}" if prefix else key, item, out)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        out[prefix] = value
+
+
+def main(old_path: str, new_path: str) -> int:
+    """打印两次结果中每个指标的变化."""
+    old = json.loads(Path(old_path).read_text())
+    new = json.loads(Path(new_path).read_text())
+    print(f"{old.get('version')} -> {new.get('version')}")
+    for name, bench in new.get("benchmarks", {}).items():
+        if name not in old.get("benchmarks", {}):
+            continue
+        old_metrics: dict[str, float] = {}
+        new_metrics: dict[str, float] = {}
+        _flatten("", old["benchmarks"][name]["results"], old_metrics)
+        _flatten("", bench["results"], new_metrics)
+        print(f"\n[{name}]")
+        for metric, value in new_metrics.items():
+            if (previous := old_metrics.get(metric)) is None:
+                continue
+            change = f"{(value - previous) / previous * 100:+.1f}%" if previous else "n/a"
+            print(f"  {metric:<45} {previous:>12} -> {value:<12} {change}")
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print(__doc__)
+        sys.exit(2)
+    sys.exit(main(sys.argv[1], sys.argv[2]))
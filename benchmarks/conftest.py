@@ -0,0 +1,93 @@
+"""洪绘空调基准测试的 pytest 配置."""
+from __future__ import annotations
+
+from pathlib import Path
+import sys
+
+import pytest
+
+# 让 Home Assistant 的加载器能找到仓库中的 custom_components
+sys.path.insert(0, str(Path(__file__).parents[1]))
+
+pytest_plugins = ["pytest_homeassistant_custom_component"]
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    """基准测试参数."""
+    group = parser.getgroup("honghui_climate benchmarks")
+    group.addoption("--bench-entities", type=int, default=10, help="虚拟空调数量")
+    group.addoption("--bench-ac-rate", type=float, default=2.0, help="每个源空调每秒的事件数")
+    group.addoption("--bench-sensor-rate", type=float, default=5.0, help="每个温度传感器每秒的事件数")
+    group.addoption("--bench-duration", type=float, default=5.0, help="注入事件的持续时间（秒）")
+    group.addoption("--bench-commands", type=int, default=20, help="每种命令的测量次数")
+    group.addoption("--bench-source-latency", type=float, default=0.0, help="假源空调的响应延迟（秒）")
+    group.addoption("--bench-import-runs", type=int, default=5, help="测量导入时间的子进程次数")
+    group.addoption("--bench-sim-hours", type=float, default=24.0, help="闭环补偿模拟的时长（小时）")
+    group.addoption(
+        "--bench-budget-import",
+        type=float,
+        default=None,
+        help="模块导入时间预算（毫秒，中位数），超出时测试失败",
+    )
+    group.addoption(
+        "--bench-budget-setup",
+        type=float,
+        default=None,
+        help="单个条目设置时间预算（毫秒，p99），超出时测试失败",
+    )
+    group.addoption(
+        "--bench-budget-available",
+        type=float,
+        default=None,
+        help="所有虚拟空调可用的时间预算（毫秒），超出时测试失败",
+    )
+    group.addoption(
+        "--bench-output",
+        type=Path,
+        default=Path("bench_output.json"),
+        help="结果 JSON 文件",
+    )
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    """收集 bench_*.py 文件中的基准测试."""
+    config.addinivalue_line("python_files", "bench_*.py")
+
+
+@pytest.fixture
+def bench_params(request: pytest.FixtureRequest) -> dict:
+    """命令行传入的基准测试参数."""
+    option = request.config.getoption
+    return {
+        "entities": option("--bench-entities"),
+        "ac_rate": option("--bench-ac-rate"),
+        "sensor_rate": option("--bench-sensor-rate"),
+        "duration": option("--bench-duration"),
+        "commands": option("--bench-commands"),
+        "source_latency": option("--bench-source-latency"),
+        "import_runs": option("--bench-import-runs"),
+        "sim_hours": option("--bench-sim-hours"),
+    }
+
+
+@pytest.fixture
+def bench_budgets(request: pytest.FixtureRequest) -> dict:
+    """命令行传入的时间预算（毫秒），未设置的为 None."""
+    option = request.config.getoption
+    return {
+        "import_ms": option("--bench-budget-import"),
+        "setup_ms": option("--bench-budget-setup"),
+        "available_ms": option("--bench-budget-available"),
+    }
+
+
+@pytest.fixture
+def bench_output(request: pytest.FixtureRequest) -> Path:
+    """结果 JSON 文件路径."""
+    return request.config.getoption("--bench-output")
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    """启用 custom_components 中的集成."""
+    yield
@@ -0,0 +1,265 @@
+"""洪绘空调基准测试使用的本地 Home Assistant 测试环境."""
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+import json
+from pathlib import Path
+import statistics
+import time
+from typing import Any
+
+from homeassistant.components.climate import (
+    ClimateEntity,
+    ClimateEntityFeature,
+    HVACMode,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import ATTR_TEMPERATURE, Platform, UnitOfTemperature
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    MockModule,
+    MockPlatform,
+    mock_integration,
+    mock_platform,
+)
+
+from custom_components.honghui_climate.const import (
+    CONF_AC_ENTITY_ID,
+    CONF_TEMP_ENTITY_ID,
+    DOMAIN,
+)
+
+FAKE_DOMAIN = "fake_climate"
+MANIFEST = Path(__file__).parents[1] / "custom_components" / DOMAIN / "manifest.json"
+
+
+class FakeClimate(ClimateEntity):
+    """作为源空调的假空调实体，可以模拟云端或红外的响应延迟."""
+
+    _attr_has_entity_name = False
+    _attr_hvac_modes = [HVACMode.OFF, HVACMode.COOL, HVACMode.HEAT, HVACMode.AUTO]
+    _attr_fan_modes = ["auto", "low", "high"]
+    _attr_swing_modes = ["off", "vertical"]
+    _attr_min_temp = 16
+    _attr_max_temp = 30
+    _attr_target_temperature_step = 1
+    _attr_temperature_unit = UnitOfTemperature.CELSIUS
+    _attr_supported_features = (
+        ClimateEntityFeature.TARGET_TEMPERATURE
+        | ClimateEntityFeature.FAN_MODE
+        | ClimateEntityFeature.SWING_MODE
+        | ClimateEntityFeature.TURN_ON
+        | ClimateEntityFeature.TURN_OFF
+    )
+    _enable_turn_on_off_backwards_compatibility = False
+
+    def __init__(self, index: int, latency: float = 0.0) -> None:
+        """初始化假空调."""
+        self.entity_id = f"climate.fake_ac_{index}"
+        self._attr_unique_id = f"fake_ac_{index}"
+        self._attr_name = f"Fake AC {index}"
+        self._attr_hvac_mode = HVACMode.COOL
+        self._attr_target_temperature = 24
+        self._attr_fan_mode = "auto"
+        self._attr_swing_mode = "off"
+        self.latency = latency
+
+    async def _async_respond(self) -> None:
+        """模拟源集成的响应延迟后写入状态."""
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.async_write_ha_state()
+
+    async def async_set_temperature(self, **kwargs: Any) -> None:
+        """设置温度."""
+        if (hvac_mode := kwargs.get("hvac_mode")) is not None:
+            self._attr_hvac_mode = hvac_mode
+        self._attr_target_temperature = kwargs[ATTR_TEMPERATURE]
+        await self._async_respond()
+
+    async def async_set_hvac_mode(self, hvac_mode: HVACMode) -> None:
+        """设置模式."""
+        self._attr_hvac_mode = hvac_mode
+        await self._async_respond()
+
+    async def async_set_fan_mode(self, fan_mode: str) -> None:
+        """设置风扇模式."""
+        self._attr_fan_mode = fan_mode
+        await self._async_respond()
+
+    async def async_set_swing_mode(self, swing_mode: str) -> None:
+        """设置摆动模式."""
+        self._attr_swing_mode = swing_mode
+        await self._async_respond()
+
+    async def async_turn_on(self) -> None:
+        """开机."""
+        self._attr_hvac_mode = HVACMode.COOL
+        await self._async_respond()
+
+    async def async_turn_off(self) -> None:
+        """关机."""
+        self._attr_hvac_mode = HVACMode.OFF
+        await self._async_respond()
+
+
+@dataclass
+class WriteRecorder:
+    """记录虚拟空调的状态写入次数和事件到写入的延迟."""
+
+    writes: int = 0
+    latencies: list[float] = field(default_factory=list)
+    _pending_since: dict[str, float] = field(default_factory=dict)
+
+    def mark_event(self, entity_id: str) -> None:
+        """记录一个注入到源实体的事件."""
+        self._pending_since.setdefault(entity_id, time.perf_counter())
+
+    def on_write(self, entity_id: str) -> None:
+        """记录一次状态写入，延迟从最早一个尚未反映的事件算起."""
+        self.writes += 1
+        if (since := self._pending_since.pop(entity_id, None)) is not None:
+            self.latencies.append(time.perf_counter() - since)
+
+    def reset(self) -> None:
+        """清除记录."""
+        self.writes = 0
+        self.latencies.clear()
+        self._pending_since.clear()
+
+
+@dataclass
+class BenchEnvironment:
+    """一组假源空调、温度传感器和虚拟空调."""
+
+    hass: HomeAssistant
+    fake_acs: list[FakeClimate]
+    sensors: list[str]
+    virtual_entities: list[str]
+    entries: list[ConfigEntry]
+
+    async def async_unload(self) -> None:
+        """卸载所有虚拟空调条目."""
+        for entry in self.entries:
+            await self.hass.config_entries.async_unload(entry.entry_id)
+        await self.hass.async_block_till_done()
+
+
+async def async_setup_fake_sources(
+    hass: HomeAssistant, count: int, latency: float = 0.0
+) -> tuple[list[FakeClimate], list[str]]:
+    """创建 count 个假源空调和温度传感器."""
+    fake_acs = [FakeClimate(index, latency) for index in range(count)]
+
+    async def async_setup_entry_platform(
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        async_add_entities: AddEntitiesCallback,
+    ) -> None:
+        async_add_entities(fake_acs)
+
+    async def async_setup_entry_init(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+        await hass.config_entries.async_forward_entry_setups(entry, [Platform.CLIMATE])
+        return True
+
+    mock_integration(
+        hass, MockModule(FAKE_DOMAIN, async_setup_entry=async_setup_entry_init)
+    )
+    mock_platform(
+        hass,
+        f"{FAKE_DOMAIN}.{Platform.CLIMATE}",
+        MockPlatform(async_setup_entry=async_setup_entry_platform),
+    )
+    fake_entry = MockConfigEntry(domain=FAKE_DOMAIN)
+    fake_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(fake_entry.entry_id)
+
+    sensors = []
+    for index in range(count):
+        sensor = f"sensor.room_{index}"
+        hass.states.async_set(sensor, "25.0", {"unit_of_measurement": "°C"})
+        sensors.append(sensor)
+    await hass.async_block_till_done()
+    return fake_acs, sensors
+
+
+def create_virtual_entries(
+    hass: HomeAssistant,
+    fake_acs: list[FakeClimate],
+    sensors: list[str],
+    options: dict[str, Any] | None = None,
+) -> list[MockConfigEntry]:
+    """为每对源空调和传感器创建一个虚拟空调配置条目."""
+    entries = []
+    for fake_ac, sensor in zip(fake_acs, sensors):
+        entry = MockConfigEntry(
+            domain=DOMAIN,
+            data={CONF_AC_ENTITY_ID: fake_ac.entity_id, CONF_TEMP_ENTITY_ID: [sensor]},
+            options=options or {},
+            unique_id=f"{fake_ac.entity_id}_{sensor}",
+        )
+        entry.add_to_hass(hass)
+        entries.append(entry)
+    return entries
+
+
+def virtual_entity_ids(hass: HomeAssistant, entries: list[ConfigEntry]) -> list[str]:
+    """从实体注册表查找虚拟空调的实体ID."""
+    registry = er.async_get(hass)
+    return [
+        registry.async_get_entity_id(
+            Platform.CLIMATE, DOMAIN, f"{DOMAIN}_{entry.entry_id}"
+        )
+        for entry in entries
+    ]
+
+
+def percentile(values: list[float], fraction: float) -> float | None:
+    """计算百分位数（毫秒）."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))
+    return round(ordered[index] * 1000, 3)
+
+
+def summarize(values: list[float]) -> dict[str, Any]:
+    """延迟样本的摘要（毫秒）."""
+    return {
+        "count": len(values),
+        "p50_ms": percentile(values, 0.5),
+        "p99_ms": percentile(values, 0.99),
+        "mean_ms": round(statistics.fmean(values) * 1000, 3) if values else None,
+    }
+
+
+def integration_version() -> str:
+    """集成版本号，用于在不同版本间比较结果."""
+    return json.loads(MANIFEST.read_text())["version"]
+
+
+def save_results(path: Path, name: str, params: dict[str, Any], results: dict[str, Any]) -> None:
+    """把一组结果合并写入 JSON 文件."""
+    data = json.loads(path.read_text()) if path.exists() else {}
+    data["version"] = integration_version()
+    data.setdefault("benchmarks", {})[name] = {
+        "timestamp": time.time(),
+        "params": params,
+        "results": results,
+    }
+    path.write_text(json.dumps(data, indent=2, ensure_ascii=False))
+
+
+def check_budgets(measured: dict[str, float | None], budgets: dict[str, float | None]) -> list[str]:
+    """对比测量值和预算（毫秒），返回超出预算的说明."""
+    return [
+        f"{key}: {value} ms > {budget} ms"
+        for key, budget in budgets.items()
+        if budget is not None
+        and (value := measured.get(key)) is not None
+        and value > budget
+    ]
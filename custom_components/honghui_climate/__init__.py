@@ -1,48 +1,120 @@
 """HongHui Climate 集成."""
 from __future__ import annotations
 
+import asyncio
 import logging
 import voluptuous as vol
-import time
+from typing import Any
 
+from homeassistant.components.climate import (
+    ATTR_FAN_MODE,
+    ATTR_HVAC_MODE,
+    ATTR_SWING_MODE,
+    HVACMode,
+)
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant, ServiceCall, callback
-from homeassistant.const import Platform, ATTR_ENTITY_ID, EVENT_HOMEASSISTANT_STARTED
-import homeassistant.helpers.config_validation as cv
-from homeassistant.helpers.entity_registry import (
-    EntityRegistry,
-    async_get as async_get_entity_registry,
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+    split_entity_id,
 )
+from homeassistant.const import Platform, ATTR_ENTITY_ID, ATTR_TEMPERATURE
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.entity_registry import async_get as async_get_entity_registry
 
-from .const import DOMAIN, CONF_AC_ENTITY_ID, CONF_TEMP_ENTITY_ID
-
-# 防止递归锁
-_SERVICE_LOCKS = {}
-_MAX_SERVICE_FREQUENCY = 1.0  # 服务调用最小间隔时间（秒）
+from .const import (
+    DOMAIN,
+    CONF_AC_ENTITY_ID,
+    CONF_TEMP_ENTITY_ID,
+    CONF_SERVICE_BURST,
+    CONF_SERVICE_RATE,
+    DATA_DISPATCHER,
+    DATA_ENTITY,
+    DATA_GATEWAYS,
+    DATA_LIMITER,
+    DATA_METRICS,
+    DATA_OPTIONS,
+    DEFAULT_SERVICE_BURST,
+    DEFAULT_SERVICE_RATE,
+)
+from .bulk import async_bulk_control
+from .commands import TargetState
+from .helpers import entity_id_list
+from .metrics import EntityMetrics
+from .ratelimit import TokenBucketLimiter
 
 _LOGGER = logging.getLogger(__name__)
 
-PLATFORMS = [Platform.CLIMATE]
+PLATFORMS = [Platform.CLIMATE, Platform.SENSOR]
 
 # 服务架构
 SERVICE_SET_AC_ENTITY = "set_ac_entity"
 SERVICE_SET_TEMP_ENTITY = "set_temp_entity"
+SERVICE_SET_SOURCES = "set_sources"
+SERVICE_BULK_CONTROL = "bulk_control"
+
+ATTR_ENTITIES = "entities"
+ATTR_MAX_PARALLEL = "max_parallel"
+ATTR_TIMEOUT = "timeout"
+DEFAULT_MAX_PARALLEL = 8
+DEFAULT_BULK_TIMEOUT = 30
 
 SET_AC_ENTITY_SCHEMA = vol.Schema({
     vol.Required(ATTR_ENTITY_ID): cv.entity_id,
-    vol.Required(CONF_AC_ENTITY_ID): cv.entity_id,
+    vol.Required(CONF_AC_ENTITY_ID): cv.entity_ids,
 })
 
 SET_TEMP_ENTITY_SCHEMA = vol.Schema({
     vol.Required(ATTR_ENTITY_ID): cv.entity_id,
-    vol.Required(CONF_TEMP_ENTITY_ID): cv.entity_id,
+    vol.Required(CONF_TEMP_ENTITY_ID): cv.entity_ids,
 })
 
+SET_SOURCES_SCHEMA = vol.Schema({
+    vol.Required(ATTR_ENTITIES): vol.Schema({
+        cv.entity_id: vol.All(
+            vol.Schema({
+                vol.Optional(CONF_AC_ENTITY_ID): cv.entity_ids,
+                vol.Optional(CONF_TEMP_ENTITY_ID): cv.entity_ids,
+            }),
+            cv.has_at_least_one_key(CONF_AC_ENTITY_ID, CONF_TEMP_ENTITY_ID),
+        )
+    }),
+    vol.Optional(ATTR_MAX_PARALLEL, default=DEFAULT_MAX_PARALLEL): vol.All(
+        vol.Coerce(int), vol.Range(min=1, max=64)
+    ),
+})
+
+BULK_CONTROL_SCHEMA = vol.All(
+    vol.Schema({
+        vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
+        vol.Optional(ATTR_HVAC_MODE): vol.Coerce(HVACMode),
+        vol.Optional(ATTR_TEMPERATURE): vol.Coerce(float),
+        vol.Optional(ATTR_FAN_MODE): cv.string,
+        vol.Optional(ATTR_SWING_MODE): cv.string,
+        vol.Optional(ATTR_MAX_PARALLEL, default=DEFAULT_MAX_PARALLEL): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=64)
+        ),
+        vol.Optional(ATTR_TIMEOUT, default=DEFAULT_BULK_TIMEOUT): vol.All(
+            vol.Coerce(float), vol.Range(min=1, max=600)
+        ),
+    }),
+    cv.has_at_least_one_key(ATTR_HVAC_MODE, ATTR_TEMPERATURE, ATTR_FAN_MODE, ATTR_SWING_MODE),
+)
+
 # 定义 CONFIG_SCHEMA
 CONFIG_SCHEMA = vol.Schema({
     vol.Optional(DOMAIN): vol.Schema({
-        vol.Optional(CONF_AC_ENTITY_ID): cv.entity_id,
-        vol.Optional(CONF_TEMP_ENTITY_ID): cv.entity_id,
+        vol.Optional(CONF_AC_ENTITY_ID): cv.entity_ids,
+        vol.Optional(CONF_TEMP_ENTITY_ID): cv.entity_ids,
+        vol.Optional(CONF_SERVICE_RATE, default=DEFAULT_SERVICE_RATE): vol.All(
+            vol.Coerce(float), vol.Range(min=0.01)
+        ),
+        vol.Optional(CONF_SERVICE_BURST, default=DEFAULT_SERVICE_BURST): vol.All(
+            vol.Coerce(int), vol.Range(min=1)
+        ),
     })
 }, extra=vol.ALLOW_EXTRA)
 
@@ -53,32 +125,39 @@ async def async_setup(hass: HomeAssistant, config: dict) -> bool:
     # 初始化数据结构
     hass.data.setdefault(DOMAIN, {})
     
+    # 服务调用限流器，速率和突发量可以在 configuration.yaml 中配置
+    domain_config = config.get(DOMAIN, {})
+    limiter = hass.data[DOMAIN][DATA_LIMITER] = TokenBucketLimiter(
+        hass,
+        rate=domain_config.get(CONF_SERVICE_RATE, DEFAULT_SERVICE_RATE),
+        burst=domain_config.get(CONF_SERVICE_BURST, DEFAULT_SERVICE_BURST),
+    )
+    
+    def _rebind_action(entry: ConfigEntry):
+        """限流器执行的切换操作，参数中缺少的源实体沿用条目中的值。"""
+        async def _async_rebind(payload: dict[str, Any]) -> None:
+            # 运行中的实体原地切换源实体，不重新加载条目
+            await async_rebind_sources(
+                hass,
+                entry,
+                payload.get(CONF_AC_ENTITY_ID, entry.data[CONF_AC_ENTITY_ID]),
+                payload.get(CONF_TEMP_ENTITY_ID, entry.data[CONF_TEMP_ENTITY_ID]),
+            )
+        return _async_rebind
+    
     # 注册服务
     async def async_handle_set_ac_entity(call: ServiceCall) -> None:
         """处理设置空调实体服务。"""
         entity_id = call.data[ATTR_ENTITY_ID]
         ac_entity_id = call.data[CONF_AC_ENTITY_ID]
         
-        # 防止服务频繁调用
-        lock_key = f"set_ac_{entity_id}"
-        current_time = time.time()
-        if lock_key in _SERVICE_LOCKS:
-            elapsed = current_time - _SERVICE_LOCKS[lock_key]
-            if elapsed < _MAX_SERVICE_FREQUENCY:
-                _LOGGER.warning(
-                    "服务调用过于频繁，距离上次调用仅 %.2f 秒，已跳过: %s", 
-                    elapsed, lock_key
-                )
-                return
-        _SERVICE_LOCKS[lock_key] = current_time
-        
         # 检查是否试图将实体设置为虚拟空调
-        if ac_entity_id.startswith(f"{DOMAIN}."):
+        if any(ac.startswith(f"{DOMAIN}.") for ac in ac_entity_id):
             _LOGGER.error("不能将空调实体设置为虚拟空调实体: %s", ac_entity_id)
             return
         
         # 获取实体条目ID
-        entity_registry = hass.helpers.entity_registry.async_get(hass)
+        entity_registry = async_get_entity_registry(hass)
         entity_entry = entity_registry.async_get(entity_id)
         
         if not entity_entry or not entity_entry.config_entry_id:
@@ -95,36 +174,18 @@ async def async_setup(hass: HomeAssistant, config: dict) -> bool:
             _LOGGER.error("找不到配置条目 %s", entry_id)
             return
             
-        new_data = {**entry.data, CONF_AC_ENTITY_ID: ac_entity_id}
-        hass.config_entries.async_update_entry(entry, data=new_data)
-        
-        # 更新内存中的数据
-        if entry_id in hass.data[DOMAIN]:
-            hass.data[DOMAIN][entry_id][CONF_AC_ENTITY_ID] = ac_entity_id
-            
-        # 刷新条目
-        await hass.config_entries.async_reload(entry_id)
+        # 按虚拟空调限流，过于频繁的调用推迟执行并与最新的调用合并
+        await limiter.async_call(
+            entry_id, {CONF_AC_ENTITY_ID: ac_entity_id}, _rebind_action(entry)
+        )
         
     async def async_handle_set_temp_entity(call: ServiceCall) -> None:
         """处理设置温度传感器实体服务。"""
         entity_id = call.data[ATTR_ENTITY_ID]
         temp_entity_id = call.data[CONF_TEMP_ENTITY_ID]
         
-        # 防止服务频繁调用
-        lock_key = f"set_temp_{entity_id}"
-        current_time = time.time()
-        if lock_key in _SERVICE_LOCKS:
-            elapsed = current_time - _SERVICE_LOCKS[lock_key]
-            if elapsed < _MAX_SERVICE_FREQUENCY:
-                _LOGGER.warning(
-                    "服务调用过于频繁，距离上次调用仅 %.2f 秒，已跳过: %s", 
-                    elapsed, lock_key
-                )
-                return
-        _SERVICE_LOCKS[lock_key] = current_time
-        
         # 获取实体条目ID
-        entity_registry = hass.helpers.entity_registry.async_get(hass)
+        entity_registry = async_get_entity_registry(hass)
         entity_entry = entity_registry.async_get(entity_id)
         
         if not entity_entry or not entity_entry.config_entry_id:
@@ -141,26 +202,145 @@ async def async_setup(hass: HomeAssistant, config: dict) -> bool:
             _LOGGER.error("找不到配置条目 %s", entry_id)
             return
             
-        new_data = {**entry.data, CONF_TEMP_ENTITY_ID: temp_entity_id}
-        hass.config_entries.async_update_entry(entry, data=new_data)
-        
-        # 更新内存中的数据
-        if entry_id in hass.data[DOMAIN]:
-            hass.data[DOMAIN][entry_id][CONF_TEMP_ENTITY_ID] = temp_entity_id
-            
-        # 刷新条目
-        await hass.config_entries.async_reload(entry_id)
+        # 按虚拟空调限流，过于频繁的调用推迟执行并与最新的调用合并
+        await limiter.async_call(
+            entry_id, {CONF_TEMP_ENTITY_ID: temp_entity_id}, _rebind_action(entry)
+        )
     
     hass.services.async_register(
         DOMAIN, SERVICE_SET_AC_ENTITY, async_handle_set_ac_entity, 
         schema=SET_AC_ENTITY_SCHEMA
     )
     
+    async def async_handle_set_sources(call: ServiceCall) -> ServiceResponse:
+        """批量切换多个虚拟空调的源实体，返回每个实体的结果。"""
+        requested: dict[str, dict[str, Any]] = call.data[ATTR_ENTITIES]
+        results: dict[str, dict[str, Any]] = {}
+        
+        # 一次遍历实体注册表，先验证整批请求
+        entity_registry = async_get_entity_registry(hass)
+        planned: dict[str, tuple[ConfigEntry, str, Any]] = {}
+        claimed: dict[str, str] = {}
+        for entity_id, sources in requested.items():
+            error = None
+            entity_entry = entity_registry.async_get(entity_id)
+            entry = (
+                hass.config_entries.async_get_entry(entity_entry.config_entry_id)
+                if entity_entry and entity_entry.config_entry_id
+                else None
+            )
+            ac_entity_id = sources.get(CONF_AC_ENTITY_ID)
+            ac_entries = [entity_registry.async_get(ac) for ac in ac_entity_id or ()]
+            temp_entity_id = sources.get(CONF_TEMP_ENTITY_ID)
+            temp_entries = [entity_registry.async_get(temp) for temp in temp_entity_id or ()]
+            if entry is None or entry.domain != DOMAIN:
+                error = "不是洪绘空调实体"
+            elif entry.entry_id in claimed:
+                error = f"与 {claimed[entry.entry_id]} 属于同一个配置条目"
+            elif any(
+                ac.startswith(f"{DOMAIN}.")
+                or (ac_entry is not None and ac_entry.platform == DOMAIN)
+                for ac, ac_entry in zip(ac_entity_id or (), ac_entries)
+            ):
+                error = "不能将空调实体设置为虚拟空调实体"
+            elif invalid := [
+                ac
+                for ac in ac_entity_id or ()
+                if split_entity_id(ac)[0] != Platform.CLIMATE
+            ]:
+                error = f"空调必须是 climate 实体: {invalid}"
+            elif missing := [
+                ac
+                for ac, ac_entry in zip(ac_entity_id or (), ac_entries)
+                if ac_entry is None and hass.states.get(ac) is None
+            ]:
+                error = f"找不到空调实体: {missing}"
+            elif invalid := [
+                temp
+                for temp, temp_entry in zip(temp_entity_id or (), temp_entries)
+                if split_entity_id(temp)[0] != Platform.SENSOR
+                or (temp_entry is not None and temp_entry.platform == DOMAIN)
+            ]:
+                error = f"温度传感器必须是 sensor 实体且不能是虚拟空调的实体: {invalid}"
+            elif missing := [
+                temp
+                for temp, temp_entry in zip(temp_entity_id or (), temp_entries)
+                if temp_entry is None and hass.states.get(temp) is None
+            ]:
+                error = f"找不到温度传感器: {missing}"
+            if error is not None:
+                results[entity_id] = {"success": False, "error": error}
+                continue
+            claimed[entry.entry_id] = entity_id
+            planned[entity_id] = (
+                entry,
+                ac_entity_id or entry.data[CONF_AC_ENTITY_ID],
+                temp_entity_id or entry.data[CONF_TEMP_ENTITY_ID],
+            )
+        
+        # 先保存所有条目，再以有限的并发应用到运行中的实体
+        loaded: dict[str, dict] = {}
+        for entity_id, (entry, ac_entity_id, temp_entity_id) in planned.items():
+            entry_data = async_store_sources(hass, entry, ac_entity_id, temp_entity_id)
+            if entry_data is not None:
+                loaded[entity_id] = entry_data
+        semaphore = asyncio.Semaphore(call.data[ATTR_MAX_PARALLEL])
+        
+        async def _async_apply(entity_id: str) -> dict[str, Any]:
+            """应用单个实体的新源实体."""
+            entry = planned[entity_id][0]
+            if (entry_data := loaded.get(entity_id)) is None:
+                return {"success": True, "applied": False, "error": None}
+            async with semaphore:
+                try:
+                    await _async_apply_sources(hass, entry, entry_data)
+                except Exception as err:  # noqa: BLE001
+                    _LOGGER.exception("切换 %s 的源实体失败", entity_id)
+                    return {"success": False, "applied": False, "error": str(err)}
+            return {"success": True, "applied": True, "error": None}
+        
+        applied = await asyncio.gather(*(_async_apply(entity_id) for entity_id in planned))
+        results.update(zip(planned, applied))
+        return {"results": results}
+    
     hass.services.async_register(
         DOMAIN, SERVICE_SET_TEMP_ENTITY, async_handle_set_temp_entity, 
         schema=SET_TEMP_ENTITY_SCHEMA
     )
     
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SET_SOURCES,
+        async_handle_set_sources,
+        schema=SET_SOURCES_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    
+    async def async_handle_bulk_control(call: ServiceCall) -> ServiceResponse:
+        """把多个虚拟空调带到同一个目标状态，共用的源空调只发送一次命令。"""
+        results = await async_bulk_control(
+            hass,
+            call.data[ATTR_ENTITY_ID],
+            TargetState(
+                hvac_mode=call.data.get(ATTR_HVAC_MODE),
+                temperature=call.data.get(ATTR_TEMPERATURE),
+                fan_mode=call.data.get(ATTR_FAN_MODE),
+                swing_mode=call.data.get(ATTR_SWING_MODE),
+            ),
+            max_parallel=call.data[ATTR_MAX_PARALLEL],
+            timeout=call.data[ATTR_TIMEOUT],
+            context=call.context,
+        )
+        return {"results": results}
+    
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_BULK_CONTROL,
+        async_handle_bulk_control,
+        schema=BULK_CONTROL_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    
     return True
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
@@ -177,20 +357,13 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     hass.data[DOMAIN][entry.entry_id] = {
         CONF_AC_ENTITY_ID: entry.data.get(CONF_AC_ENTITY_ID),
         CONF_TEMP_ENTITY_ID: entry.data.get(CONF_TEMP_ENTITY_ID),
+        DATA_METRICS: EntityMetrics(),
+        # 选项快照，用于区分选项变化（需要重新加载）和源实体变化（原地切换）
+        DATA_OPTIONS: dict(entry.options),
     }
     
-    # 如果Home Assistant已经启动完成，立即设置平台
-    if hass.is_running:
-        await async_setup_platforms(hass, entry)
-    else:
-        # 否则，等待Home Assistant启动完成后再设置
-        async def setup_platforms_after_start(_event):
-            """在Home Assistant启动完成后设置平台"""
-            await async_setup_platforms(hass, entry)
-            
-        hass.bus.async_listen_once(
-            EVENT_HOMEASSISTANT_STARTED, setup_platforms_after_start
-        )
+    # 立即设置平台：实体先显示上次保存的状态，源实体加载后在后台对齐
+    await async_setup_platforms(hass, entry)
     
     # 设置配置项更新监听
     entry.async_on_unload(entry.add_update_listener(update_listener))
@@ -203,10 +376,76 @@ async def async_setup_platforms(hass: HomeAssistant, entry: ConfigEntry) -> None
     _LOGGER.debug("正在设置平台: %s", PLATFORMS)
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
+async def async_rebind_sources(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    ac_entity_id: str | list[str],
+    temp_entity_id: str | list[str],
+) -> None:
+    """保存新的源实体，并让运行中的虚拟空调原地切换."""
+    entry_data = async_store_sources(hass, entry, ac_entity_id, temp_entity_id)
+    if entry_data is None:
+        # 条目未加载，下次加载时使用新的源实体
+        return
+    await _async_apply_sources(hass, entry, entry_data)
+
+@callback
+def async_store_sources(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    ac_entity_id: str | list[str],
+    temp_entity_id: str | list[str],
+) -> dict | None:
+    """保存新的源实体，返回已加载条目的内存数据."""
+    entry_data = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    if entry_data is not None:
+        # 先更新内存中的数据，条目更新触发的 update_listener 会发现源实体已经一致
+        entry_data[CONF_AC_ENTITY_ID] = ac_entity_id
+        entry_data[CONF_TEMP_ENTITY_ID] = temp_entity_id
+    hass.config_entries.async_update_entry(
+        entry,
+        data={
+            **entry.data,
+            CONF_AC_ENTITY_ID: ac_entity_id,
+            CONF_TEMP_ENTITY_ID: temp_entity_id,
+        },
+    )
+    return entry_data
+
+async def _async_apply_sources(
+    hass: HomeAssistant, entry: ConfigEntry, entry_data: dict
+) -> None:
+    """把内存中的源实体应用到虚拟空调."""
+    entity = entry_data.get(DATA_ENTITY)
+    if entity is None or entity.hass is None:
+        # 实体还在等待源实体出现，重新加载后按新的源实体等待
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+    entity.async_rebind_sources(
+        entity_id_list(entry_data[CONF_AC_ENTITY_ID]),
+        entity_id_list(entry_data[CONF_TEMP_ENTITY_ID]),
+    )
+
 async def update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """处理配置项更新."""
     _LOGGER.info("更新洪绘空调配置: %s", entry.entry_id)
-    await hass.config_entries.async_reload(entry.entry_id)
+    entry_data = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    if entry_data is None or dict(entry.options) != entry_data[DATA_OPTIONS]:
+        # 选项只在创建实体时读取，变化时重新加载
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+    
+    # 只有源实体变化（例如选项流程修改了源实体）时原地切换
+    ac_entity_id = entry.data.get(CONF_AC_ENTITY_ID)
+    temp_entity_id = entry.data.get(CONF_TEMP_ENTITY_ID)
+    if (
+        ac_entity_id == entry_data[CONF_AC_ENTITY_ID]
+        and temp_entity_id == entry_data[CONF_TEMP_ENTITY_ID]
+    ):
+        return
+    entry_data[CONF_AC_ENTITY_ID] = ac_entity_id
+    entry_data[CONF_TEMP_ENTITY_ID] = temp_entity_id
+    await _async_apply_sources(hass, entry, entry_data)
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
@@ -215,9 +454,27 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     # 卸载平台
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     
+    # 丢弃该虚拟空调的限流状态
+    if (limiter := hass.data.get(DOMAIN, {}).get(DATA_LIMITER)) is not None:
+        limiter.async_remove(entry.entry_id)
+    
     # 如果卸载成功，移除数据
     if unload_ok and entry.entry_id in hass.data.get(DOMAIN, {}):
         hass.data[DOMAIN].pop(entry.entry_id)
         _LOGGER.debug("已移除洪绘空调数据: %s", entry.entry_id)
+        if not any(isinstance(data, dict) for data in hass.data[DOMAIN].values()):
+            _async_release_shared(hass)
         
-    return unload_ok 
\ No newline at end of file
+    return unload_ok
+
+@callback
+def _async_release_shared(hass: HomeAssistant) -> None:
+    """最后一个配置条目卸载后释放集成共享的对象."""
+    domain_data = hass.data[DOMAIN]
+    # 分发器的状态订阅随最后一个监听器释放，这里只在没有订阅者时移除分发器
+    dispatcher = domain_data.get(DATA_DISPATCHER)
+    if dispatcher is not None and not dispatcher.sources:
+        domain_data.pop(DATA_DISPATCHER).async_shutdown()
+    # 停止仍在排队的网关命令
+    if (gateways := domain_data.pop(DATA_GATEWAYS, None)) is not None:
+        gateways.async_shutdown()
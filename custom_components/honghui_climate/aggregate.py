@@ -0,0 +1,107 @@
+"""HongHui Climate 多温度传感器聚合."""
+from __future__ import annotations
+
+from bisect import bisect_left, insort
+
+from .const import AGGREGATION_MAX, AGGREGATION_MEDIAN, AGGREGATION_MIN
+
+
+class SensorAggregate:
+    """多个温度传感器读数的增量聚合.
+
+    平均值通过未经舍入的累计和维护，最小值和最大值缓存当前的极值，只有移除的
+    读数恰好是极值时才在剩余的传感器中重新查找。中值通过有序列表维护，只在中值
+    聚合时使用；一个虚拟空调只有少数几个传感器，列表的插入和删除（O(n) 的内存
+    移动）比平衡结构更快。读取为 O(1)。
+    """
+
+    def __init__(self, method: str) -> None:
+        """初始化聚合."""
+        self._method = method
+        self._values: dict[str, float] = {}
+        self._sorted: list[float] | None = [] if method == AGGREGATION_MEDIAN else None
+        # 只有最小值和最大值聚合维护当前的极值
+        self._tracks_extreme = method in (AGGREGATION_MIN, AGGREGATION_MAX)
+        self._extreme: float | None = None
+        self._sum = 0.0
+
+    @property
+    def method(self) -> str:
+        """聚合方式."""
+        return self._method
+
+    @property
+    def values(self) -> dict[str, float]:
+        """当前参与聚合的传感器读数."""
+        return dict(self._values)
+
+    def get(self, entity_id: str) -> float | None:
+        """单个传感器当前参与聚合的读数."""
+        return self._values.get(entity_id)
+
+    def __contains__(self, entity_id: str) -> bool:
+        """传感器是否参与聚合."""
+        return entity_id in self._values
+
+    def __len__(self) -> int:
+        """参与聚合的传感器数量."""
+        return len(self._values)
+
+    @property
+    def value(self) -> float | None:
+        """聚合结果，没有可用传感器时返回 None."""
+        count = len(self._values)
+        if not count:
+            return None
+        if self._method in (AGGREGATION_MIN, AGGREGATION_MAX):
+            return self._extreme
+        if self._sorted is not None:
+            middle = count // 2
+            if count % 2:
+                return self._sorted[middle]
+            return (self._sorted[middle - 1] + self._sorted[middle]) / 2
+        # 只在输出时舍入，累计和保持原始精度
+        return round(self._sum / count, 2)
+
+    def update(self, entity_id: str, value: float) -> None:
+        """更新一个传感器的读数."""
+        self._discard(entity_id)
+        self._values[entity_id] = value
+        self._sum += value
+        if self._sorted is not None:
+            insort(self._sorted, value)
+        elif self._tracks_extreme and (
+            self._extreme is None or self._beats(value, self._extreme)
+        ):
+            self._extreme = value
+
+    def remove(self, entity_id: str) -> None:
+        """把一个传感器（不可用或过期）排除出聚合."""
+        self._discard(entity_id)
+
+    def clear(self) -> None:
+        """清除所有读数."""
+        self._values.clear()
+        if self._sorted is not None:
+            self._sorted.clear()
+        self._extreme = None
+        self._sum = 0.0
+
+    def _beats(self, value: float, other: float) -> bool:
+        """value 是否比 other 更接近聚合方式的极值."""
+        return value > other if self._method == AGGREGATION_MAX else value < other
+
+    def _discard(self, entity_id: str) -> None:
+        """移除传感器的旧读数."""
+        if (old := self._values.pop(entity_id, None)) is None:
+            return
+        self._sum -= old
+        if self._sorted is not None:
+            del self._sorted[bisect_left(self._sorted, old)]
+        elif self._tracks_extreme and old == self._extreme:
+            # 移除的是当前极值，在剩余的传感器中重新查找
+            pick = max if self._method == AGGREGATION_MAX else min
+            self._extreme = pick(self._values.values(), default=None)
+        if not self._values:
+            # 没有读数时重置累计和，避免浮点误差累积
+            self._sum = 0.0
@@ -0,0 +1,114 @@
+"""HongHui Climate 多个虚拟空调的批量控制."""
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import Context, HomeAssistant
+
+from .commands import TargetState
+from .const import DATA_ENTITY, DOMAIN
+from .group import RESULT_OK, RESULT_TIMEOUT, RESULT_UNCHANGED
+
+if TYPE_CHECKING:
+    from .climate import HonghuiAirClimate
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _async_find_entities(
+    hass: HomeAssistant, entity_ids: list[str]
+) -> tuple[dict[str, HonghuiAirClimate], dict[str, str]]:
+    """查找运行中的虚拟空调，返回找到的实体和找不到的原因."""
+    entities_by_id = {
+        entity.entity_id: entity
+        for entry_data in hass.data.get(DOMAIN, {}).values()
+        if isinstance(entry_data, dict)
+        and (entity := entry_data.get(DATA_ENTITY)) is not None
+        and entity.hass is not None
+    }
+    found: dict[str, HonghuiAirClimate] = {}
+    errors: dict[str, str] = {}
+    for entity_id in entity_ids:
+        if (entity := entities_by_id.get(entity_id)) is None:
+            errors[entity_id] = "不是已加载的洪绘空调实体"
+        else:
+            found[entity_id] = entity
+    return found, errors
+
+
+async def async_bulk_control(
+    hass: HomeAssistant,
+    entity_ids: list[str],
+    target: TargetState,
+    max_parallel: int,
+    timeout: float,
+    context: Context | None = None,
+) -> dict[str, dict[str, Any]]:
+    """把多个虚拟空调带到同一个目标状态，返回每个虚拟空调的结果.
+
+    命令按源空调分组：每台源空调由第一个绑定它的虚拟空调负责，经该虚拟空调自己的
+    命令队列发送，多个虚拟空调共用的源空调只收到一次命令，已经处于目标状态的源空调
+    不发送命令。虚拟空调之间以有限的并发发送，整批在 timeout 秒内结束，届时仍未
+    完成的源空调记为超时。所有命令都以本次批量调用的 Context 为父 Context。
+    不负责任何源空调的虚拟空调也会收到目标状态，以便更新闭环补偿的目标温度。
+    """
+    context = context or Context()
+    entities, errors = _async_find_entities(hass, entity_ids)
+    results: dict[str, dict[str, Any]] = {
+        entity_id: {"success": False, "error": error} for entity_id, error in errors.items()
+    }
+
+    # 虚拟空调 -> 由它负责发送命令的源空调（源空调归第一个绑定它的虚拟空调）
+    owners: dict[str, str] = {}
+    for entity_id, entity in entities.items():
+        for source_entity_id in entity.source_entity_ids:
+            owners.setdefault(source_entity_id, entity_id)
+    owned: dict[str, list[str]] = {}
+    for source_entity_id, entity_id in owners.items():
+        owned.setdefault(entity_id, []).append(source_entity_id)
+
+    semaphore = asyncio.Semaphore(max_parallel)
+
+    async def _async_control_entity(entity_id: str) -> dict[str, str]:
+        """经一个虚拟空调向它负责的源空调发送达到目标状态所需的命令."""
+        entity = entities[entity_id]
+        async with semaphore:
+            entity.async_set_context(context)
+            try:
+                return await entity.async_bulk_apply(target, owned.get(entity_id, []))
+            except Exception as err:  # noqa: BLE001
+                _LOGGER.warning("批量控制虚拟空调 %s 失败: %s", entity_id, err)
+                return dict.fromkeys(owned.get(entity_id, []), repr(err))
+
+    tasks = {
+        entity_id: hass.async_create_task(
+            _async_control_entity(entity_id),
+            f"honghui_climate bulk control {entity_id}",
+        )
+        for entity_id in entities
+    }
+    source_results: dict[str, str] = {}
+    if tasks:
+        _done, pending = await asyncio.wait(tasks.values(), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        for entity_id, task in tasks.items():
+            if task in pending:
+                source_results.update(dict.fromkeys(owned.get(entity_id, []), RESULT_TIMEOUT))
+            else:
+                source_results.update(task.result())
+
+    for entity_id, entity in entities.items():
+        sources = {
+            source_entity_id: source_results.get(source_entity_id, RESULT_TIMEOUT)
+            for source_entity_id in entity.source_entity_ids
+        }
+        results[entity_id] = {
+            "success": all(
+                result in (RESULT_OK, RESULT_UNCHANGED) for result in sources.values()
+            ),
+            "sources": sources,
+        }
+    return results
@@ -0,0 +1,84 @@
+"""HongHui Climate 源空调能力快照."""
+from __future__ import annotations
+
+from collections.abc import Mapping
+from dataclasses import asdict, dataclass
+from typing import Any
+from weakref import WeakValueDictionary
+
+from homeassistant.components.climate import HVACMode
+
+# 相同能力集合的快照只保留一份，没有实体引用时自动释放
+_INTERNED: WeakValueDictionary[tuple, SourceCapabilities] = WeakValueDictionary()
+
+
+def _as_tuple(value: Any) -> tuple | None:
+    """列表属性转换为元组."""
+    return tuple(value) if value is not None else None
+
+
+@dataclass(frozen=True)
+class SourceCapabilities:
+    """源空调的静态能力，不可变并在所有虚拟空调之间共享."""
+
+    source_hvac_modes: tuple[str, ...]
+    hvac_modes: tuple[HVACMode, ...]
+    fan_modes: tuple[str, ...] | None
+    swing_modes: tuple[str, ...] | None
+    min_temp: float | None
+    max_temp: float | None
+    target_temp_step: float | None
+
+    def as_dict(self) -> dict[str, Any]:
+        """以字典形式导出."""
+        return asdict(self)
+
+
+def intern_capabilities(attributes: Mapping[str, Any]) -> SourceCapabilities:
+    """从源空调状态属性获取能力快照，相同的能力集合返回同一个对象."""
+    source_hvac_modes = tuple(attributes.get("hvac_modes") or ())
+    key = (
+        source_hvac_modes,
+        _as_tuple(attributes.get("fan_modes")),
+        _as_tuple(attributes.get("swing_modes")),
+        attributes.get("min_temp"),
+        attributes.get("max_temp"),
+        attributes.get("target_temp_step"),
+    )
+    if (capabilities := _INTERNED.get(key)) is None:
+        capabilities = SourceCapabilities(
+            source_hvac_modes=source_hvac_modes,
+            # 虚拟空调总是支持关机，其余模式按枚举顺序排列
+            hvac_modes=(HVACMode.OFF,)
+            + tuple(
+                mode
+                for mode in HVACMode
+                if mode is not HVACMode.OFF and mode.value in source_hvac_modes
+            ),
+            fan_modes=key[1],
+            swing_modes=key[2],
+            min_temp=key[3],
+            max_temp=key[4],
+            target_temp_step=key[5],
+        )
+        _INTERNED[key] = capabilities
+    return capabilities
+
+
+def capabilities_from_dict(data: Mapping[str, Any]) -> SourceCapabilities:
+    """从保存的字典恢复能力快照（同样共享）."""
+    return intern_capabilities(
+        {
+            "hvac_modes": data.get("source_hvac_modes"),
+            "fan_modes": data.get("fan_modes"),
+            "swing_modes": data.get("swing_modes"),
+            "min_temp": data.get("min_temp"),
+            "max_temp": data.get("max_temp"),
+            "target_temp_step": data.get("target_temp_step"),
+        }
+    )
+
+
+def interned_count() -> int:
+    """当前共享的能力快照数量."""
+    return len(_INTERNED)
@@ -1,11 +1,13 @@
 """HongHui Climate 气候实体."""
 from __future__ import annotations
 
-import logging
 import asyncio
-from typing import Any, Final, List, cast
-
-import voluptuous as vol
+from collections.abc import Mapping
+from dataclasses import dataclass, replace
+from datetime import timedelta
+import logging
+import time
+from typing import Any, Final
 
 from homeassistant.components.climate import (
     ClimateEntity,
@@ -17,67 +19,163 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
     ATTR_TEMPERATURE,
     PRECISION_TENTHS,
-    PRECISION_WHOLE,
     STATE_UNAVAILABLE,
     STATE_UNKNOWN,
     UnitOfTemperature,
 )
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.core import CALLBACK_TYPE, Context, HomeAssistant, State, callback
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.event import async_track_state_change_event
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.helpers.restore_state import ExtraStoredData, RestoreEntity
+from homeassistant.helpers.event import async_track_time_interval
+import homeassistant.util.dt as dt_util
 import functools
 
 from .const import (
+    ATTR_RESTORED,
+    ATTR_SOURCE_TEMPERATURE,
+    ATTR_TEMPERATURE_TREND,
+    ATTR_TIME_TO_TARGET,
+    ATTR_TEMP_UPDATES_SUPPRESSED,
+    ATTR_UNITS,
     CONF_AC_ENTITY_ID,
+    CONF_COMMAND_TIMEOUT,
+    CONF_COMPENSATION,
+    CONF_COMPENSATION_MAX_OFFSET,
+    CONF_COMPENSATION_MAX_PER_HOUR,
+    CONF_COMPENSATION_MIN_INTERVAL,
+    CONF_GATEWAY,
+    CONF_GATEWAY_SPACING,
+    CONF_GROUP_MAX_PARALLEL,
+    CONF_SOURCE_TIMEOUT,
+    CONF_TEMP_AGGREGATION,
+    CONF_TEMP_DEADBAND,
+    CONF_TEMP_EMA_ALPHA,
     CONF_TEMP_ENTITY_ID,
+    CONF_TEMP_MIN_INTERVAL,
+    CONF_TEMP_SMOOTHING,
+    CONF_TEMP_STALE_AFTER,
+    CONF_OPTIMISTIC,
+    CONF_OPTIMISTIC_TIMEOUT,
+    CONF_UPDATE_WINDOW,
+    DATA_ENTITY,
+    COMPENSATION_GAIN,
+    COMPENSATION_INTEGRAL_TIME,
+    DATA_METRICS,
+    DEFAULT_COMMAND_TIMEOUT,
+    DEFAULT_COMPENSATION,
+    DEFAULT_COMPENSATION_MAX_OFFSET,
+    DEFAULT_COMPENSATION_MAX_PER_HOUR,
+    DEFAULT_COMPENSATION_MIN_INTERVAL,
+    DEFAULT_GATEWAY,
+    DEFAULT_GATEWAY_SPACING,
+    DEFAULT_GROUP_MAX_PARALLEL,
     DEFAULT_NAME,
+    DEFAULT_OPTIMISTIC,
+    DEFAULT_OPTIMISTIC_TIMEOUT,
+    DEFAULT_SOURCE_TIMEOUT,
+    DEFAULT_TEMP_AGGREGATION,
+    DEFAULT_TEMP_DEADBAND,
+    DEFAULT_TEMP_EMA_ALPHA,
+    DEFAULT_TEMP_MIN_INTERVAL,
+    DEFAULT_TEMP_SMOOTHING,
+    DEFAULT_TEMP_STALE_AFTER,
+    DEFAULT_UPDATE_WINDOW,
     DOMAIN,
+    EVENT_OPTIMISTIC_ROLLBACK,
+    HISTORY_CAPACITY,
+    HISTORY_RESOLUTION,
+    HISTORY_TREND_WINDOW,
+    OUTBOUND_CONTEXT_CACHE_SIZE,
+)
+from . import async_store_sources
+from .aggregate import SensorAggregate
+from .capabilities import (
+    SourceCapabilities,
+    capabilities_from_dict,
+    intern_capabilities,
+    interned_count,
+)
+from .commands import (
+    CommandQueue,
+    PlannedCommand,
+    TargetState,
+    command_satisfied,
+    plan_commands,
+    preferred_on_mode,
+    source_value,
+    values_match,
 )
+from .compensation import CommandBudget, SetpointCompensator
+from .confirmation import ConfirmationTracker, OutboundContexts
+from .dispatcher import async_get_dispatcher
+from .gateway import async_get_gateways, async_resolve_gateway
+from .group import (
+    RESULT_OK,
+    RESULT_SUPERSEDED,
+    RESULT_TIMEOUT,
+    RESULT_UNAVAILABLE,
+    RESULT_UNCHANGED,
+    STATE_MIXED,
+    SourceGroup,
+    source_fingerprint,
+)
+from .helpers import entity_id_list
+from .history import SampleHistory
+from .metrics import EntityMetrics
+from .optimistic import OptimisticOverlay
+from .readiness import SourceReadinessWaiter
+from .scheduler import UpdateCoalescer
+from .sensor_filter import TemperatureFilter
 
 _LOGGER = logging.getLogger(__name__)
 
-# 重试间隔和最大尝试次数
-RETRY_INTERVAL = 10  # 秒
-MAX_RETRIES = 12  # 最多重试12次，总共2分钟
+# 虚拟空调对外可见的属性，变化时才需要写入状态
+_PROJECTED_ENTITY_ATTRIBUTES: Final = (
+    "_attr_available",
+    "_attr_hvac_mode",
+    "_attr_hvac_modes",
+    "_attr_hvac_action",
+    "_attr_fan_mode",
+    "_attr_fan_modes",
+    "_attr_swing_mode",
+    "_attr_swing_modes",
+    "_attr_target_temperature",
+    "_attr_target_temperature_high",
+    "_attr_target_temperature_low",
+    "_attr_min_temp",
+    "_attr_max_temp",
+    "_attr_target_temperature_step",
+    "_restored",
+    "_units",
+    "_source_temperature",
+    "_attr_current_temperature",
+)
 
-# 添加递归保护计数器
-_RECURSION_COUNTERS = {}
-_MAX_RECURSION_DEPTH = 3  # 设置最大递归深度
+# 乐观值对应的实体属性
+_OPTIMISTIC_ATTRIBUTES: Final = {
+    "hvac_mode": "_attr_hvac_mode",
+    ATTR_TEMPERATURE: "_attr_target_temperature",
+    "fan_mode": "_attr_fan_mode",
+    "swing_mode": "_attr_swing_mode",
+}
 
-def prevent_recursion(method):
-    """防止方法被递归调用超过特定次数的装饰器。"""
-    @functools.wraps(method)
-    async def wrapper(self, *args, **kwargs):
-        # 为每个实体和方法创建唯一键
-        key = f"{self.entity_id}_{method.__name__}"
-        
-        # 初始化或增加计数器
-        if key not in _RECURSION_COUNTERS:
-            _RECURSION_COUNTERS[key] = 0
-        _RECURSION_COUNTERS[key] += 1
-        
-        try:
-            # 检查是否超过最大递归深度
-            if _RECURSION_COUNTERS[key] > _MAX_RECURSION_DEPTH:
-                _LOGGER.error(
-                    "检测到过度递归调用(%s次)：%s - 操作已取消",
-                    _RECURSION_COUNTERS[key],
-                    key
-                )
-                return
-            
-            # 执行原始方法
-            return await method(self, *args, **kwargs)
-        finally:
-            # 减少计数器
-            _RECURSION_COUNTERS[key] -= 1
-            # 如果计数器归零，移除它以避免内存泄漏
-            if _RECURSION_COUNTERS[key] == 0:
-                del _RECURSION_COUNTERS[key]
-    
-    return wrapper
+
+def _parse_temperature(temp_state: State | None) -> float | None:
+    """从温度传感器状态解析温度."""
+    if temp_state is None or temp_state.state in (STATE_UNAVAILABLE, STATE_UNKNOWN):
+        return None
+    try:
+        return float(temp_state.state)
+    except ValueError:
+        _LOGGER.error("无法将温度传感器值转换为数字: %s", temp_state.state)
+        return None
+
+
+def _reported_timestamp(state: State) -> float:
+    """状态最近一次上报的时间戳（值未变化的上报也会更新）."""
+    return getattr(state, "last_reported", state.last_updated).timestamp()
 
 
 async def async_setup_entry(
@@ -86,87 +184,74 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """设置HongHui Climate气候实体."""
-    ac_entity_id = entry.data[CONF_AC_ENTITY_ID]
-    temp_entity_id = entry.data[CONF_TEMP_ENTITY_ID]
+    ac_entity_ids = entity_id_list(entry.data[CONF_AC_ENTITY_ID])
+    temp_entity_ids = entity_id_list(entry.data[CONF_TEMP_ENTITY_ID])
     
     # 确保配置项存在
-    if not ac_entity_id or not temp_entity_id:
+    if not ac_entity_ids or not temp_entity_ids:
         _LOGGER.error("缺少必要的配置项：空调实体或温度传感器实体")
         return
     
-    # 创建延迟加载任务，等待依赖实体加载完成
-    hass.async_create_task(
-        async_setup_climate_with_retry(
-            hass, entry, async_add_entities, ac_entity_id, temp_entity_id
-        )
-    )
-
-
-async def async_setup_climate_with_retry(
-    hass: HomeAssistant,
-    entry: ConfigEntry,
-    async_add_entities: AddEntitiesCallback,
-    ac_entity_id: str,
-    temp_entity_id: str,
-    attempt: int = 0,
-) -> None:
-    """尝试设置气候实体，如果失败则重试."""
-    # 检查实体是否都已加载
-    ac_entity_available = hass.states.get(ac_entity_id) is not None
-    temp_entity_available = hass.states.get(temp_entity_id) is not None
-    
-    if not ac_entity_available or not temp_entity_available:
-        if attempt >= MAX_RETRIES:
+    # 验证空调实体不是虚拟空调实体，避免递归
+    for ac_entity_id in ac_entity_ids:
+        if ac_entity_id.startswith(f"{DOMAIN}."):
             _LOGGER.error(
-                "在多次尝试后仍无法找到必要的实体。空调实体: %s (%s), 温度传感器实体: %s (%s)",
-                ac_entity_id,
-                "可用" if ac_entity_available else "不可用",
-                temp_entity_id,
-                "可用" if temp_entity_available else "不可用",
+                "不能使用虚拟空调实体作为源空调实体，这会导致递归调用。请选择真实的空调实体。实体ID: %s",
+                ac_entity_id
             )
             return
-            
-        attempt += 1
-        _LOGGER.debug(
-            "等待实体加载，尝试 %s/%s。空调实体: %s (%s), 温度传感器实体: %s (%s)",
-            attempt,
-            MAX_RETRIES,
-            ac_entity_id,
-            "可用" if ac_entity_available else "不可用",
-            temp_entity_id,
-            "可用" if temp_entity_available else "不可用",
-        )
-        
-        # 延迟后重试
-        await asyncio.sleep(RETRY_INTERVAL)
-        await async_setup_climate_with_retry(
-            hass, entry, async_add_entities, ac_entity_id, temp_entity_id, attempt
-        )
-        return
-    
-    # 到这里，说明两个实体都已加载
-    
-    # 验证空调实体不是虚拟空调实体，避免递归
-    if ac_entity_id.startswith(f"{DOMAIN}."):
-        _LOGGER.error(
-            "不能使用虚拟空调实体作为源空调实体，这会导致递归调用。请选择真实的空调实体。实体ID: %s",
-            ac_entity_id
-        )
-        return
-    
-    _LOGGER.info("创建洪绘空调实体，使用空调：%s，温度传感器：%s", ac_entity_id, temp_entity_id)
     
+    # 立即注册实体，先显示上次保存的状态，源实体就绪后在后台对齐
+    _LOGGER.info(
+        "创建洪绘空调实体，使用空调：%s，温度传感器：%s", ac_entity_ids, temp_entity_ids
+    )
     entity = HonghuiAirClimate(
         hass=hass,
         entry_id=entry.entry_id,
-        ac_entity_id=ac_entity_id,
-        temp_entity_id=temp_entity_id
+        ac_entity_ids=ac_entity_ids,
+        temp_entity_ids=temp_entity_ids,
+        options=entry.options,
+        metrics=hass.data[DOMAIN][entry.entry_id][DATA_METRICS],
     )
-    
-    async_add_entities([entity], True)
+    hass.data[DOMAIN][entry.entry_id][DATA_ENTITY] = entity
+    async_add_entities([entity])
+
+
+@dataclass
+class HonghuiClimateExtraStoredData(ExtraStoredData):
+    """重启后恢复的源空调能力、最近的运行模式和闭环补偿的目标温度."""
+
+    capabilities: SourceCapabilities | None
+    last_active_mode: HVACMode | None
+    user_target: float | None = None
+
+    def as_dict(self) -> dict[str, Any]:
+        """以字典形式保存."""
+        return {
+            "capabilities": (
+                self.capabilities.as_dict() if self.capabilities is not None else None
+            ),
+            "last_active_mode": self.last_active_mode,
+            "user_target": self.user_target,
+        }
+
+    @classmethod
+    def from_dict(cls, restored: dict[str, Any]) -> HonghuiClimateExtraStoredData | None:
+        """从保存的字典恢复."""
+        try:
+            capabilities = restored.get("capabilities")
+            last_active_mode = restored.get("last_active_mode")
+            user_target = restored.get("user_target")
+            return cls(
+                capabilities_from_dict(capabilities) if capabilities else None,
+                HVACMode(last_active_mode) if last_active_mode else None,
+                float(user_target) if user_target is not None else None,
+            )
+        except (AttributeError, TypeError, ValueError):
+            return None
 
 
-class HonghuiAirClimate(ClimateEntity):
+class HonghuiAirClimate(ClimateEntity, RestoreEntity):
     """表示虚拟空调实体."""
 
     # 启用实体注册表命名，以便正确使用翻译
@@ -183,6 +268,18 @@ class HonghuiAirClimate(ClimateEntity):
     _attr_temperature_unit = UnitOfTemperature.CELSIUS
     _attr_translation_key = "honghui_climate"
     
+    # 静态能力（模式列表、温度范围）已由 ClimateEntity 排除；这里只排除本集成的
+    # 诊断和派生属性，它们变化频繁且可以从其他历史记录推算
+    _unrecorded_attributes = frozenset(
+        {
+            ATTR_TEMP_UPDATES_SUPPRESSED,
+            ATTR_UNITS,
+            ATTR_SOURCE_TEMPERATURE,
+            ATTR_TEMPERATURE_TREND,
+            ATTR_TIME_TO_TARGET,
+        }
+    )
+    
     # 预设一些基本属性，防止初始化时出错
     _attr_hvac_modes = [HVACMode.OFF, HVACMode.COOL, HVACMode.HEAT, HVACMode.AUTO]
     _attr_hvac_mode = HVACMode.OFF
@@ -195,14 +292,16 @@ class HonghuiAirClimate(ClimateEntity):
         self,
         hass: HomeAssistant,
         entry_id: str,
-        ac_entity_id: str,
-        temp_entity_id: str,
+        ac_entity_ids: list[str],
+        temp_entity_ids: list[str],
+        options: Mapping[str, Any],
+        metrics: EntityMetrics,
     ) -> None:
         """初始化虚拟空调."""
         self.hass = hass
         self._entry_id = entry_id
-        self._ac_entity_id = ac_entity_id
-        self._temp_entity_id = temp_entity_id
+        self._temp_entity_ids = temp_entity_ids
+        self._metrics = metrics
         
         # 生成唯一ID
         self._attr_unique_id = f"{DOMAIN}_{entry_id}"
@@ -215,211 +314,1142 @@ class HonghuiAirClimate(ClimateEntity):
             model="Virtual AC",
         )
         
+        # 一台或多台源空调，多台时合并状态并并发发送命令
+        self._group_max_parallel = int(
+            options.get(CONF_GROUP_MAX_PARALLEL, DEFAULT_GROUP_MAX_PARALLEL)
+        )
+        self._group = SourceGroup(hass, ac_entity_ids, self._group_max_parallel)
+        self._units: list[dict[str, Any]] | None = None
+        
         # 跟踪源实体的变化
-        self._unsubscribe_ac = None
-        self._unsubscribe_temp = None
+        self._unsubscribe_ac: list[CALLBACK_TYPE] = []
+        self._unsubscribe_temp: list[CALLBACK_TYPE] = []
         
-    async def async_added_to_hass(self) -> None:
-        """实体添加到Home Assistant时的处理."""
-        await super().async_added_to_hass()
+        # 变化检测：源空调投射字段指纹、缓存的源模式列表和上次写入的对外状态
+        self._ac_fingerprint: tuple | None = None
+        self._capabilities: SourceCapabilities | None = None
         
-        self._unsubscribe_ac = async_track_state_change_event(
-            self.hass, [self._ac_entity_id], self._async_ac_changed
+        # 源实体加载前显示上次保存的状态，源空调上报后清除
+        self._restored = False
+        self._source_timeout = options.get(CONF_SOURCE_TIMEOUT, DEFAULT_SOURCE_TIMEOUT) or None
+        self._waiter: SourceReadinessWaiter | None = None
+        self._last_projected: tuple | None = None
+        self._last_active_mode: HVACMode | None = None
+        
+        # 多个温度传感器的增量聚合
+        self._temp_aggregate = SensorAggregate(
+            options.get(CONF_TEMP_AGGREGATION, DEFAULT_TEMP_AGGREGATION)
+        )
+        self._temp_stale_after = options.get(CONF_TEMP_STALE_AFTER, DEFAULT_TEMP_STALE_AFTER)
+        
+        # 温度传感器输入过滤
+        self._temp_filter = TemperatureFilter(
+            deadband=options.get(CONF_TEMP_DEADBAND, DEFAULT_TEMP_DEADBAND),
+            min_interval=options.get(CONF_TEMP_MIN_INTERVAL, DEFAULT_TEMP_MIN_INTERVAL),
+            smoothing=options.get(CONF_TEMP_SMOOTHING, DEFAULT_TEMP_SMOOTHING),
+            ema_alpha=options.get(CONF_TEMP_EMA_ALPHA, DEFAULT_TEMP_EMA_ALPHA),
         )
+        self._temp_flush_handle: asyncio.TimerHandle | None = None
+        
+        # 出站命令队列，按属性合并未发送的命令
+        self._commands = CommandQueue(hass, self._async_call_source, self._group.primary)
+        self._confirmations = ConfirmationTracker(hass)
+        # 最近发出的命令 Context，用于识别源空调的回声
+        self._outbound = OutboundContexts(OUTBOUND_CONTEXT_CACHE_SIZE)
+        self._command_timeout = options.get(CONF_COMMAND_TIMEOUT, DEFAULT_COMMAND_TIMEOUT)
+        
+        # 网关组：同一红外发射器或云账号下的源空调命令串行、按间隔发送
+        self._gateway_setting = options.get(CONF_GATEWAY, DEFAULT_GATEWAY)
+        self._gateway_spacing = options.get(CONF_GATEWAY_SPACING, DEFAULT_GATEWAY_SPACING)
+        self._gateways: dict[str, str | None] = {}
+        
+        # 乐观模式：命令发出后立即显示，等待源空调确认或超时回滚
+        self._optimistic: OptimisticOverlay | None = None
+        if options.get(CONF_OPTIMISTIC, DEFAULT_OPTIMISTIC):
+            self._optimistic = OptimisticOverlay(
+                hass,
+                options.get(CONF_OPTIMISTIC_TIMEOUT, DEFAULT_OPTIMISTIC_TIMEOUT),
+                self._async_optimistic_rollback,
+            )
+        
+        # 闭环补偿：按温度传感器测得的室温调整发送给源空调的设定温度，
+        # 此时显示的目标温度是用户的目标温度，源空调的设定温度作为属性显示
+        self._compensator: SetpointCompensator | None = None
+        if options.get(CONF_COMPENSATION, DEFAULT_COMPENSATION):
+            self._compensator = SetpointCompensator(
+                CommandBudget(
+                    options.get(
+                        CONF_COMPENSATION_MIN_INTERVAL, DEFAULT_COMPENSATION_MIN_INTERVAL
+                    ),
+                    int(
+                        options.get(
+                            CONF_COMPENSATION_MAX_PER_HOUR, DEFAULT_COMPENSATION_MAX_PER_HOUR
+                        )
+                    ),
+                ),
+                options.get(CONF_COMPENSATION_MAX_OFFSET, DEFAULT_COMPENSATION_MAX_OFFSET),
+                COMPENSATION_GAIN,
+                COMPENSATION_INTEGRAL_TIME,
+            )
+        self._user_target: float | None = None
+        self._source_temperature: float | None = None
+        self._compensation_handle: asyncio.TimerHandle | None = None
         
-        self._unsubscribe_temp = async_track_state_change_event(
-            self.hass, [self._temp_entity_id], self._async_temp_changed
+        # 最近的温度、目标温度和模式样本，用于趋势属性；启动时用历史记录填充
+        self._history = SampleHistory(HISTORY_CAPACITY, HISTORY_RESOLUTION)
+        self._history_seed: asyncio.Task | None = None
+        # 趋势属性（°C/小时和分钟），只在事件引起的写入时顺带更新，本身不触发写入
+        self._temperature_trend: float | None = None
+        self._time_to_target: int | None = None
+        
+        # 合并源事件的更新调度器
+        self._updater = UpdateCoalescer(
+            hass,
+            options.get(CONF_UPDATE_WINDOW, DEFAULT_UPDATE_WINDOW),
+            self._async_coalesced_update,
         )
         
-        # 初始状态更新
+    async def async_added_to_hass(self) -> None:
+        """实体添加到Home Assistant时的处理."""
+        await super().async_added_to_hass()
+        self._async_subscribe_sources()
+        
+        # 多传感器时定期排除长时间没有上报的传感器
+        if self._temp_stale_after > 0:
+            self.async_on_remove(
+                async_track_time_interval(
+                    self.hass,
+                    self._async_expire_stale_sensors,
+                    timedelta(seconds=max(self._temp_stale_after / 2, 1)),
+                )
+            )
+        
+        # 初始状态更新，之后只通过事件增量维护温度聚合
+        self._seed_temperature()
+        if self._compensator is not None:
+            await self._async_restore_user_target()
+        if self._group.state is None:
+            # 源空调尚未加载，先显示上次保存的状态
+            await self._async_restore()
         self._update_state()
+        self._last_projected = self._projected_state()
+        
+        # 在后台等待源实体出现（并跟随注册表中的重命名）
+        self._async_wait_for_sources()
+        
+        # 在后台用一次历史记录查询填充趋势样本
+        if "recorder" in self.hass.config.components:
+            self._history_seed = self.hass.async_create_background_task(
+                self._async_seed_history(), f"honghui_climate history {self.entity_id}"
+            )
         
     async def async_will_remove_from_hass(self) -> None:
         """实体从Home Assistant移除时的处理."""
-        if self._unsubscribe_ac:
-            self._unsubscribe_ac()
-        if self._unsubscribe_temp:
-            self._unsubscribe_temp()
+        if self._waiter is not None:
+            self._waiter.async_cancel()
+            self._waiter = None
+        if self._history_seed is not None:
+            self._history_seed.cancel()
+            self._history_seed = None
+        self._updater.async_cancel()
+        self._commands.async_shutdown()
+        self._confirmations.async_cancel()
+        if self._optimistic is not None:
+            self._optimistic.async_clear()
+        if self._temp_flush_handle is not None:
+            self._temp_flush_handle.cancel()
+            self._temp_flush_handle = None
+        if self._compensation_handle is not None:
+            self._compensation_handle.cancel()
+            self._compensation_handle = None
+        self._async_unsubscribe_sources()
+    
+    @callback
+    def async_rebind_sources(
+        self, ac_entity_ids: list[str], temp_entity_ids: list[str]
+    ) -> None:
+        """在不重新加载条目的情况下切换源空调和温度传感器."""
+        _LOGGER.info(
+            "虚拟空调 %s 切换源实体，空调：%s，温度传感器：%s",
+            self.entity_id,
+            ac_entity_ids,
+            temp_entity_ids,
+        )
+        self._async_unsubscribe_sources()
+        self._group = SourceGroup(self.hass, ac_entity_ids, self._group_max_parallel)
+        # 尚未发送的命令是按旧源空调的状态规划的，随旧队列一起放弃
+        self._commands.async_shutdown()
+        self._commands = CommandQueue(self.hass, self._async_call_source, self._group.primary)
+        self._gateways.clear()
+        self._temp_entity_ids = temp_entity_ids
+        self._async_subscribe_sources()
+        
+        # 丢弃基于旧源实体的缓存，立即重新投射
+        self._updater.async_cancel()
+        if self._optimistic is not None:
+            self._optimistic.async_clear()
+        if self._temp_flush_handle is not None:
+            self._temp_flush_handle.cancel()
+            self._temp_flush_handle = None
+        self._ac_fingerprint = None
+        self._capabilities = None
+        if self._compensator is not None:
+            self._compensator.reset()
+        self._temp_aggregate.clear()
+        self._temp_filter.reset()
+        # 趋势样本来自旧的温度传感器，不再有意义
+        if self._history_seed is not None:
+            self._history_seed.cancel()
+            self._history_seed = None
+        self._history.clear()
+        self._seed_temperature()
+        self._update_state()
+        self._async_write_if_changed()
+        self._async_wait_for_sources()
+    
+    @property
+    def source_entity_ids(self) -> list[str]:
+        """绑定的源空调."""
+        return self._group.entity_ids
+    
+    async def async_bulk_apply(
+        self, target: TargetState, entity_ids: list[str]
+    ) -> dict[str, str]:
+        """批量控制：经本实体的命令队列把 entity_ids 中的源空调带到目标状态，返回每台的结果.
+
+        负责本实体所有源空调时与实体服务走同一条路径：按合并状态规划命令，与进行中
+        的命令合并，并乐观显示；只负责其中一部分（其余由共用它们的虚拟空调发送）时
+        按每台源空调的状态分别规划，只发送给这些源空调。调用的 Context 由批量控制
+        通过 ``async_set_context`` 设置。
+
+        闭环补偿时目标温度是用户的目标温度：与 ``async_set_temperature`` 一样更新
+        显示并重新开始补偿，发送补偿后的设定温度；不负责任何源空调时只更新目标。
+        """
+        if self._recursive_target():
+            _LOGGER.error("检测到递归调用：无法将批量控制传递给虚拟空调实体 %s", self._group.entity_ids)
+            self._metrics.recursion_guard_trips += 1
+            raise HomeAssistantError("检测到递归调用，命令未发送")
+        
+        compensated = False
+        if (
+            self._compensator is not None
+            and target.temperature is not None
+            and target.hvac_mode != HVACMode.OFF
+        ):
+            compensated = True
+            self._user_target = target.temperature
+            self._attr_target_temperature = target.temperature
+            if entity_ids:
+                target = replace(
+                    target,
+                    temperature=self._compensator.start(
+                        target.temperature,
+                        self._attr_current_temperature,
+                        self.hass.loop.time(),
+                        self._attr_target_temperature_step or 1,
+                        self._attr_min_temp,
+                        self._attr_max_temp,
+                    ),
+                )
+            else:
+                # 共用的源空调由其他虚拟空调发送，这里只按新的目标重新开始补偿
+                self._compensator.reset()
+            self._update_hvac_action()
+            self._async_write_if_changed()
+        
+        if set(entity_ids) == set(self._group.entity_ids):
+            batches = [(None, self._group.command_state)]
+        else:
+            batches = [([entity_id], self.hass.states.get(entity_id)) for entity_id in entity_ids]
+        
+        results: dict[str, str] = {}
+        for targets, ac_state in batches:
+            units = self._group.entity_ids if targets is None else targets
+            if ac_state is None or ac_state.state in (STATE_UNAVAILABLE, STATE_UNKNOWN):
+                results.update(dict.fromkeys(units, RESULT_UNAVAILABLE))
+                continue
+            if not (plan := plan_commands(ac_state, target)):
+                results.update(dict.fromkeys(units, RESULT_UNCHANGED))
+                continue
+            optimistic: list[str] = []
+            if targets is None:
+                optimistic = self._async_show_optimistic(
+                    {"hvac_mode": target.hvac_mode}
+                    if target.hvac_mode == HVACMode.OFF
+                    else {
+                        "hvac_mode": target.hvac_mode,
+                        # 闭环补偿时已经显示用户的目标温度
+                        ATTR_TEMPERATURE: None if compensated else target.temperature,
+                        "fan_mode": target.fan_mode,
+                        "swing_mode": target.swing_mode,
+                    }
+                )
+            try:
+                outcomes = await self._commands.async_execute(
+                    plan, targets, self._context
+                )
+            except Exception as err:  # noqa: BLE001
+                self._async_rollback_optimistic(optimistic)
+                _LOGGER.warning("批量控制源空调 %s 失败: %s", units, err)
+                results.update(dict.fromkeys(units, repr(err)))
+                continue
+            for outcome in outcomes:
+                for entity_id, result in outcome.items():
+                    # 每台源空调保留第一个不成功的结果
+                    if results.get(entity_id, RESULT_OK) == RESULT_OK:
+                        results[entity_id] = result
+            if targets is None and target.hvac_mode not in (None, HVACMode.OFF):
+                # 与开机一样记住运行模式
+                self._last_active_mode = target.hvac_mode
+        
+        self._update_state()
+        self._async_write_if_changed()
+        return results
+    
+    @property
+    def extra_restore_state_data(self) -> HonghuiClimateExtraStoredData:
+        """重启后恢复的额外数据."""
+        return HonghuiClimateExtraStoredData(
+            self._capabilities, self._last_active_mode, self._user_target
+        )
+    
+    async def _async_seed_history(self) -> None:
+        """从历史记录读取本实体最近的状态，填充趋势样本."""
+        # 记录器是可选的，只在需要时导入
+        from homeassistant.components.recorder import get_instance, history
+        
+        start = dt_util.utcnow() - timedelta(seconds=HISTORY_CAPACITY * HISTORY_RESOLUTION)
+        try:
+            states = await get_instance(self.hass).async_add_executor_job(
+                functools.partial(
+                    history.get_significant_states,
+                    self.hass,
+                    start,
+                    entity_ids=[self.entity_id],
+                    significant_changes_only=False,
+                )
+            )
+        except Exception as err:  # noqa: BLE001
+            _LOGGER.debug("读取 %s 的历史记录失败: %s", self.entity_id, err)
+            return
+        finally:
+            self._history_seed = None
+        seeded = self._history.seed(
+            (
+                state.last_updated.timestamp(),
+                state.attributes.get("current_temperature"),
+                state.attributes.get(ATTR_TEMPERATURE),
+                state.state,
+            )
+            for state in states.get(self.entity_id, [])
+            if state.state not in (STATE_UNAVAILABLE, STATE_UNKNOWN)
+        )
+        _LOGGER.debug("从历史记录填充 %s 个样本: %s", seeded, self.entity_id)
+    
+    async def _async_restore_user_target(self) -> None:
+        """恢复闭环补偿的目标温度，源空调的设定温度不是用户的目标温度."""
+        if (extra := await self.async_get_last_extra_data()) is not None and (
+            stored := HonghuiClimateExtraStoredData.from_dict(extra.as_dict())
+        ) is not None:
+            self._user_target = stored.user_target
+    
+    async def _async_restore(self) -> None:
+        """恢复上次保存的状态和源空调能力."""
+        if (last_state := await self.async_get_last_state()) is None:
+            return
+        try:
+            hvac_mode = HVACMode(last_state.state)
+        except ValueError:
+            # 上次就是不可用或未知状态，没有可以显示的内容
+            return
+        
+        if (extra := await self.async_get_last_extra_data()) is not None and (
+            stored := HonghuiClimateExtraStoredData.from_dict(extra.as_dict())
+        ) is not None:
+            self._last_active_mode = stored.last_active_mode
+            if (capabilities := stored.capabilities) is not None:
+                self._capabilities = capabilities
+                self._attr_hvac_modes = capabilities.hvac_modes
+                self._attr_fan_modes = capabilities.fan_modes or ()
+                self._attr_swing_modes = capabilities.swing_modes or ()
+                self._attr_min_temp = capabilities.min_temp
+                self._attr_max_temp = capabilities.max_temp
+                self._attr_target_temperature_step = capabilities.target_temp_step or 1
+        
+        attributes = last_state.attributes
+        self._attr_hvac_mode = hvac_mode
+        self._attr_target_temperature = attributes.get(ATTR_TEMPERATURE)
+        if self._compensator is not None and self._user_target is None:
+            self._user_target = self._attr_target_temperature
+        self._attr_target_temperature_high = attributes.get("target_temp_high")
+        self._attr_target_temperature_low = attributes.get("target_temp_low")
+        self._attr_fan_mode = attributes.get("fan_mode")
+        self._attr_swing_mode = attributes.get("swing_mode")
+        if self._attr_current_temperature is None:
+            self._attr_current_temperature = attributes.get("current_temperature")
+        self._restored = True
+        _LOGGER.debug("源空调 %s 尚未加载，使用保存的状态: %s", self._group.entity_ids, hvac_mode)
+    
+    @callback
+    def _async_wait_for_sources(self) -> None:
+        """等待源实体出现；源实体被重命名时切换到新的实体ID."""
+        if self._waiter is not None:
+            self._waiter.async_cancel()
+        self._waiter = SourceReadinessWaiter(
+            self.hass,
+            [*self._group.entity_ids, *self._temp_entity_ids],
+            self._async_sources_ready,
+            timeout=self._source_timeout,
+            on_timeout=self._async_sources_timed_out,
+        )
+        self._waiter.async_start()
+    
+    @callback
+    def _async_sources_timed_out(self, _pending: list[str]) -> None:
+        """源实体在期限内没有出现，不再显示恢复的状态."""
+        self._waiter = None
+        if self._restored:
+            self._restored = False
+            self._update_state()
+            self._async_write_if_changed()
+    
+    @callback
+    def _async_sources_ready(self, resolved: list[str]) -> None:
+        """源实体都已出现."""
+        self._waiter = None
+        ac_entity_ids = resolved[: len(self._group)]
+        temp_entity_ids = resolved[len(self._group) :]
+        if (
+            ac_entity_ids != self._group.entity_ids
+            or temp_entity_ids != self._temp_entity_ids
+        ):
+            self.async_rebind_sources(ac_entity_ids, temp_entity_ids)
+            # 保存重命名后的实体ID，否则重启后仍会等待已经不存在的旧ID
+            if (entry := self.hass.config_entries.async_get_entry(self._entry_id)) is not None:
+                async_store_sources(self.hass, entry, ac_entity_ids, temp_entity_ids)
+    
+    @callback
+    def _async_subscribe_sources(self) -> None:
+        """订阅源实体的状态变化."""
+        # 通过集成共享的分发器订阅源实体，多个虚拟空调共用同一个源时只有一个订阅
+        dispatcher = async_get_dispatcher(self.hass)
+        self._unsubscribe_ac = [
+            dispatcher.async_subscribe(ac_entity_id, self._async_ac_changed)
+            for ac_entity_id in self._group.entity_ids
+        ]
+        self._unsubscribe_temp = [
+            dispatcher.async_subscribe(temp_entity_id, self._async_temp_changed)
+            for temp_entity_id in self._temp_entity_ids
+        ]
+    
+    @callback
+    def _async_unsubscribe_sources(self) -> None:
+        """取消源实体的订阅."""
+        for unsubscribe in (*self._unsubscribe_ac, *self._unsubscribe_temp):
+            unsubscribe()
+        self._unsubscribe_ac = []
+        self._unsubscribe_temp = []
+    
+    def _seed_temperature(self) -> None:
+        """从温度传感器的当前状态建立聚合."""
+        for temp_entity_id in self._temp_entity_ids:
+            if (value := _parse_temperature(self.hass.states.get(temp_entity_id))) is not None:
+                self._temp_aggregate.update(temp_entity_id, value)
+        if (value := self._temp_aggregate.value) is not None:
+            self._attr_current_temperature = self._temp_filter.push(
+                value, self.hass.loop.time()
+            )
+        else:
+            self._attr_current_temperature = None
             
     @callback
     def _async_ac_changed(self, event) -> None:
         """空调实体状态变化时的处理."""
         # 记录事件详情，帮助调试
         _LOGGER.debug("接收到空调状态变化事件: %s", event.data)
+        self._metrics.inbound_events += 1
         
-        # 获取新状态和旧状态
-        old_state = event.data.get('old_state')
-        new_state = event.data.get('new_state')
+        # 确认等待中的出站命令
+        self._confirmations.async_process(event)
         
-        # 检查状态是否真的发生了变化
-        if old_state and new_state:
-            old_hvac_mode = old_state.state if old_state else None
-            new_hvac_mode = new_state.state if new_state else None
-            
-            # 如果状态没有实际变化，跳过更新
-            if old_hvac_mode == new_hvac_mode:
-                _LOGGER.debug("HVAC模式未发生变化，跳过更新: %s", new_hvac_mode)
-                return
-        
-        # 使用更智能的防抖机制
-        key = f"{self.entity_id}_ac_changed"
-        current_time = self.hass.loop.time()
-        
-        # 检查是否在短时间内多次更新
-        if key in _RECURSION_COUNTERS:
-            if isinstance(_RECURSION_COUNTERS[key], dict) and 'time' in _RECURSION_COUNTERS[key]:
-                time_diff = current_time - _RECURSION_COUNTERS[key]['time']
-                
-                # 如果最近一次更新在0.5秒内，则增加计数
-                if time_diff < 0.5:
-                    _RECURSION_COUNTERS[key]['count'] += 1
-                    # 如果短时间内更新次数太多，使用延迟更新策略
-                    if _RECURSION_COUNTERS[key]['count'] > 3:
-                        _LOGGER.debug("检测到频繁状态更新，延迟处理: %s (第%d次)", key, _RECURSION_COUNTERS[key]['count'])
-                        # 延迟0.2秒后更新，确保获取到最终状态
-                        self.hass.async_create_task(self._delayed_state_update())
-                        return
-                else:
-                    # 重置计数器
-                    _RECURSION_COUNTERS[key]['count'] = 1
-            else:
-                # 如果结构不正确，重新初始化
-                _RECURSION_COUNTERS[key] = {'count': 1, 'time': current_time}
-        else:
-            # 初始化计数器
-            _RECURSION_COUNTERS[key] = {'count': 1, 'time': current_time}
+        # 只比较 _update_state 实际投射的字段，属性变化（目标温度、风扇模式等）不会被漏掉
+        ac_entity_id = event.data["entity_id"]
+        if not self._group.async_changed(ac_entity_id, event.data.get('new_state')):
+            _LOGGER.debug("源空调投射字段未发生变化，跳过更新: %s", ac_entity_id)
+            self._metrics.suppressed_events += 1
+            self._metrics.record_event(ac_entity_id, "unchanged")
+            return
         
-        # 更新时间戳
-        _RECURSION_COUNTERS[key]['time'] = current_time
+        # 本实体命令的回声：投射结果已经是当前显示的状态，无需重新投射和写入
+        new_state = event.data.get('new_state')
+        if (
+            new_state is not None
+            and event.context in self._outbound
+            and self._echo_reflected(new_state)
+        ):
+            _LOGGER.debug("源空调回声已反映在当前状态中，跳过更新: %s", ac_entity_id)
+            self._metrics.suppressed_events += 1
+            self._metrics.echo_events += 1
+            self._metrics.record_event(ac_entity_id, "echo")
+            if self._optimistic:
+                self._optimistic.async_confirm(new_state)
+            return
         
-        self._update_state()
-        self.async_write_ha_state()
-    
-    async def _delayed_state_update(self) -> None:
-        """延迟状态更新，用于处理频繁的状态变化."""
-        await asyncio.sleep(0.2)  # 延迟0.2秒
-        _LOGGER.debug("执行延迟状态更新")
-        self._update_state()
-        self.async_write_ha_state()
+        # 窗口内的任意多个事件合并为一次 _update_state 和状态写入
+        self._metrics.record_event(ac_entity_id, "scheduled")
+        self._async_schedule_update()
         
     @callback
     def _async_temp_changed(self, event) -> None:
         """温度传感器状态变化时的处理."""
-        # 温度传感器的变化通常不会导致递归，所以简单处理
+        # 温度传感器的变化只影响当前温度和运行状态，不需要重新投射源空调
+        self._metrics.inbound_events += 1
+        temp_entity_id = event.data["entity_id"]
+        if (value := _parse_temperature(event.data.get('new_state'))) is None:
+            # 不可用的传感器不参与聚合
+            self._temp_aggregate.remove(temp_entity_id)
+        else:
+            self._temp_aggregate.update(temp_entity_id, value)
+        if (aggregated := self._temp_aggregate.value) is None:
+            self._metrics.record_event(temp_entity_id, "unavailable")
+            return
+        accepted = self._async_ingest_temperature(aggregated)
+        self._metrics.record_event(temp_entity_id, "scheduled" if accepted else "filtered")
+    
+    @callback
+    def _async_expire_stale_sensors(self, _now=None) -> None:
+        """定期核对传感器：排除长时间没有上报的，恢复重新上报的."""
+        now = dt_util.utcnow().timestamp()
+        changed = False
+        for temp_entity_id in self._temp_entity_ids:
+            temp_state = self.hass.states.get(temp_entity_id)
+            value = _parse_temperature(temp_state)
+            if value is not None and now - _reported_timestamp(temp_state) <= self._temp_stale_after:
+                if self._temp_aggregate.get(temp_entity_id) != value:
+                    self._temp_aggregate.update(temp_entity_id, value)
+                    changed = True
+            elif temp_entity_id in self._temp_aggregate:
+                _LOGGER.debug("温度传感器长时间未上报，暂不参与聚合: %s", temp_entity_id)
+                self._temp_aggregate.remove(temp_entity_id)
+                changed = True
+        if changed and (aggregated := self._temp_aggregate.value) is not None:
+            self._async_ingest_temperature(aggregated)
+    
+    @callback
+    def _async_ingest_temperature(self, value: float) -> bool:
+        """温度读数经过输入过滤后再更新当前温度，返回读数是否被采用."""
+        now = self.hass.loop.time()
+        filtered = self._temp_filter.push(value, now)
+        if filtered is None:
+            self._metrics.suppressed_events += 1
+            # 被最小间隔拦下的值在间隔结束后发布
+            delay = self._temp_filter.next_flush(now)
+            if delay is not None and self._temp_flush_handle is None:
+                self._temp_flush_handle = self.hass.loop.call_later(
+                    delay, self._async_flush_temperature
+                )
+            return False
+        self._attr_current_temperature = filtered
+        self._async_schedule_update()
+        return True
+    
+    @callback
+    def _async_flush_temperature(self) -> None:
+        """发布最小间隔内被拦下的最后一个温度读数."""
+        self._temp_flush_handle = None
+        if (value := self._temp_filter.flush(self.hass.loop.time())) is None:
+            return
+        self._attr_current_temperature = value
+        self._async_schedule_update()
+    
+    @callback
+    def _async_schedule_update(self) -> None:
+        """请求一次合并的状态更新."""
+        if self._updater.pending:
+            self._metrics.coalesced_updates += 1
+        self._updater.async_request()
+    
+    @callback
+    def _async_coalesced_update(self) -> None:
+        """执行合并后的状态更新."""
+        start = time.monotonic()
         self._update_state()
+        self._history.record(
+            time.time(),
+            self._attr_current_temperature,
+            self._attr_target_temperature,
+            self._attr_hvac_mode,
+        )
+        written = self._async_write_if_changed()
+        self._metrics.record_event(
+            "update", "written" if written else "skipped", time.monotonic() - start
+        )
+        self._async_compensate()
+    
+    @callback
+    def _async_compensate(self) -> None:
+        """按温度传感器测得的室温调整源空调的设定温度（闭环补偿）."""
+        if self._compensator is None:
+            return
+        if self._compensation_handle is not None:
+            self._compensation_handle.cancel()
+            self._compensation_handle = None
+        ac_state = self._group.command_state
+        room = self._attr_current_temperature
+        if (
+            self._user_target is None
+            or room is None
+            or not self._attr_available
+            or self._restored
+            or ac_state is None
+            or ac_state.state not in (HVACMode.COOL, HVACMode.HEAT)
+        ):
+            # 只在制冷和制热模式下补偿，其他时间不积分
+            self._compensator.pause()
+            return
+        now = self.hass.loop.time()
+        setpoint = self._compensator.update(
+            self._user_target,
+            room,
+            now,
+            ac_state.attributes.get(ATTR_TEMPERATURE),
+            self._attr_target_temperature_step or 1,
+            self._attr_min_temp,
+            self._attr_max_temp,
+        )
+        if setpoint is not None:
+            self.hass.async_create_task(
+                self._async_send_compensation(setpoint),
+                f"honghui_climate compensation {self.entity_id}",
+            )
+        elif self._compensator.deferred is not None:
+            # 命令预算用完，预算恢复后按届时的室温重新计算
+            self._compensation_handle = self.hass.loop.call_later(
+                self._compensator.budget.delay(now), self._async_compensate
+            )
+    
+    def _source_setpoint(self) -> float | None:
+        """切换模式或开机时随命令发送给源空调的设定温度.
+
+        闭环补偿时是源空调当前（补偿后）的设定温度，而不是用户的目标温度。
+        """
+        if self._compensator is None:
+            return self._attr_target_temperature
+        return self._source_temperature
+    
+    @callback
+    def _record_setpoint_writes(self, ac_state: State, plan: list[PlannedCommand]) -> None:
+        """闭环补偿时，改变源空调设定温度的命令计入命令预算."""
+        if self._compensator is None:
+            return
+        current = ac_state.attributes.get(ATTR_TEMPERATURE)
+        if any(
+            command.service == "set_temperature"
+            and not values_match(ATTR_TEMPERATURE, command.data.get(ATTR_TEMPERATURE), current)
+            for command in plan
+        ):
+            self._compensator.budget.record(self.hass.loop.time())
+    
+    async def _async_send_compensation(self, setpoint: float) -> None:
+        """发送补偿后的设定温度."""
+        _LOGGER.debug(
+            "闭环补偿：目标温度 %s，室温 %s，源空调设定温度调整为 %s",
+            self._user_target,
+            self._attr_current_temperature,
+            setpoint,
+        )
+        try:
+            # 补偿命令由本实体自行发出，不关联之前的任何调用
+            await self._commands.async_submit(
+                ATTR_TEMPERATURE, "set_temperature", {ATTR_TEMPERATURE: setpoint}
+            )
+        except Exception as err:  # noqa: BLE001
+            _LOGGER.warning("发送补偿设定温度 %s 失败: %s", setpoint, err)
+    
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """额外的状态属性."""
+        attributes: dict[str, Any] = {}
+        if self._restored:
+            attributes[ATTR_RESTORED] = True
+        if self._temp_filter.enabled:
+            attributes[ATTR_TEMP_UPDATES_SUPPRESSED] = self._temp_filter.suppressed
+        if self._units:
+            attributes[ATTR_UNITS] = self._units
+        if self._compensator is not None and self._source_temperature is not None:
+            attributes[ATTR_SOURCE_TEMPERATURE] = self._source_temperature
+        if self._temperature_trend is not None:
+            attributes[ATTR_TEMPERATURE_TREND] = self._temperature_trend
+        if self._time_to_target is not None:
+            attributes[ATTR_TIME_TO_TARGET] = self._time_to_target
+        return attributes or None
+    
+    def _update_trend(self) -> None:
+        """按样本计算温度变化率（°C/小时）和按当前趋势到达目标温度的时间（分钟）."""
+        now = time.time()
+        self._temperature_trend = self._time_to_target = None
+        if (slope := self._history.slope(now, HISTORY_TREND_WINDOW)) is None:
+            return
+        self._temperature_trend = round(slope * 3600, 2)
+        if self._attr_hvac_mode != HVACMode.OFF and (
+            seconds := self._history.time_to_target(
+                now, HISTORY_TREND_WINDOW, self._attr_target_temperature
+            )
+        ) is not None:
+            self._time_to_target = round(seconds / 60)
+    
+    async def _async_call_source(
+        self,
+        service: str,
+        data: dict[str, Any],
+        entity_ids: list[str] | None = None,
+        parent: Context | None = None,
+    ) -> dict[str, str]:
+        """调用源空调（或 entity_ids 中的源空调）的 climate 服务，返回每台空调的结果.
+
+        多台源空调时并发发送给每一台；parent 是触发命令的调用。
+        """
+        targets = self._group.entity_ids if entity_ids is None else entity_ids
+        if len(targets) == 1:
+            entity_id = targets[0]
+            return {
+                entity_id: await self._async_call_unit(entity_id, service, data, parent)
+                or RESULT_OK
+            }
+        
+        results = await self._group.async_fan_out(
+            functools.partial(
+                self._async_call_unit, service=service, data=data, parent=parent
+            ),
+            targets,
+        )
+        _LOGGER.debug("命令 %s %s 的结果: %s", service, data, results)
+        failed = {
+            entity_id: result
+            for entity_id, result in results.items()
+            if result
+            not in (RESULT_OK, RESULT_SUPERSEDED, RESULT_TIMEOUT, RESULT_UNAVAILABLE)
+        }
+        if failed:
+            raise HomeAssistantError(f"部分源空调的命令 {service} 失败: {failed}")
+        if all(result == RESULT_UNAVAILABLE for result in results.values()):
+            raise HomeAssistantError(f"没有可用的源空调，命令 {service} 未发送")
+        return results
+    
+    async def _async_call_unit(
+        self,
+        entity_id: str,
+        service: str,
+        data: dict[str, Any],
+        parent: Context | None = None,
+    ) -> str | None:
+        """调用一台源空调的 climate 服务.
+
+        源空调未及时确认时返回 timeout，命令在网关队列中被之后的命令取代时返回
+        superseded。
+        """
+        start = time.monotonic()
+        error: str | None = None
+        # 每个命令使用自己的 Context，源空调带着它写入状态时即为确认；
+        # 以触发本命令的调用为父 Context，自动化链路保持可追溯
+        context = Context(parent_id=parent.id if parent is not None else None)
+        self._outbound.async_add(context)
+        ac_state = self.hass.states.get(entity_id)
+        confirmation = None
+        if ac_state is None or not command_satisfied(ac_state, service, data):
+            # 源空调已经处于目标状态时不会产生状态变化，无需等待
+            confirmation = self._confirmations.async_expect(
+                context,
+                functools.partial(command_satisfied, service=service, data=data),
+                entity_id,
+            )
+        try:
+            if not await self._async_send_unit(entity_id, service, data, context):
+                # 同一网关队列中之后提交的命令取代了它，数据没有发送，由那个命令负责确认
+                self._confirmations.async_discard(context)
+                confirmation = None
+                error = RESULT_SUPERSEDED
+            if confirmation is not None:
+                # 只有确认等待可以超时；发送本身的错误（包括超时）按发送失败处理
+                try:
+                    async with asyncio.timeout(self._command_timeout):
+                        await confirmation
+                except TimeoutError:
+                    # 命令已发出但源空调未在期限内上报，后续状态仍会通过事件更新
+                    self._metrics.command_timeouts += 1
+                    error = RESULT_TIMEOUT
+                    _LOGGER.warning(
+                        "源空调 %s 未在 %s 秒内确认命令 %s: %s",
+                        entity_id,
+                        self._command_timeout,
+                        service,
+                        data,
+                    )
+        except Exception as err:
+            self._metrics.command_failures += 1
+            error = repr(err)
+            raise
+        finally:
+            self._confirmations.async_discard(context)
+            duration = time.monotonic() - start
+            self._metrics.commands_sent += 1
+            self._metrics.command_latency.observe(duration)
+            self._metrics.record_command(service, data, duration, error)
+        return error
+    
+    async def _async_send_unit(
+        self, entity_id: str, service: str, data: dict[str, Any], context: Context
+    ) -> bool:
+        """发送一个源空调命令，属于网关组时经网关队列发送；被取代时返回 False."""
+        
+        async def _async_send(data: dict[str, Any]) -> None:
+            # 非阻塞发送，源集成卡住时也不会无限期占用调用方
+            await self.hass.services.async_call(
+                "climate",
+                service,
+                {"entity_id": entity_id, **data},
+                blocking=False,
+                context=context,
+            )
+        
+        if entity_id not in self._gateways:
+            self._gateways[entity_id] = async_resolve_gateway(
+                self.hass, entity_id, self._gateway_setting
+            )
+        if (gateway := self._gateways[entity_id]) is None:
+            await _async_send(data)
+            return True
+        
+        queued_at = time.monotonic()
+        
+        async def _async_send_queued(data: dict[str, Any]) -> None:
+            self._metrics.gateway_wait.observe(time.monotonic() - queued_at)
+            await _async_send(data)
+        
+        self._metrics.gateway_queued += 1
+        try:
+            return await async_get_gateways(self.hass).async_send(
+                gateway, entity_id, service, data, _async_send_queued, self._gateway_spacing
+            )
+        finally:
+            self._metrics.gateway_queued -= 1
+    
+    @callback
+    def _async_write_if_changed(self) -> bool:
+        """只有对外可见的状态发生变化时才写入状态机，返回是否写入.
+
+        趋势属性随时间变化，不参与比较，只在写入时重新计算。
+        """
+        projected = self._projected_state()
+        if projected == self._last_projected:
+            self._metrics.skipped_writes += 1
+            return False
+        self._last_projected = projected
+        self._update_trend()
+        self._metrics.state_writes += 1
         self.async_write_ha_state()
+        return True
+    
+    @callback
+    def diagnostics(self) -> dict[str, Any]:
+        """诊断信息：缓存的源空调能力、合并更新和命令队列的状态."""
+        due = self._updater.due
+        now = time.time()
+        return {
+            "ac_entity_ids": self._group.entity_ids,
+            "group": self._group.diagnostics() if self._group.is_group else None,
+            "temp_entity_ids": self._temp_entity_ids,
+            "available": self._attr_available,
+            "restored": self._restored,
+            "waiting_for_sources": self._waiter.pending if self._waiter is not None else [],
+            "capabilities": (
+                self._capabilities.as_dict() if self._capabilities is not None else None
+            ),
+            "shared_capability_snapshots": interned_count(),
+            "last_active_mode": self._last_active_mode,
+            "update": {
+                "window": self._updater.window,
+                "pending": self._updater.pending,
+                "due_in": None if due is None else round(due - self.hass.loop.time(), 3),
+                "requested": self._updater.requested,
+                "coalesced": self._updater.coalesced,
+                "executed": self._updater.executed,
+            },
+            "temperature": {
+                "aggregation": self._temp_aggregate.method,
+                "readings": self._temp_aggregate.values,
+                "aggregated": self._temp_aggregate.value,
+                "filter_enabled": self._temp_filter.enabled,
+                "filter_suppressed": self._temp_filter.suppressed,
+                "flush_pending": self._temp_flush_handle is not None,
+            },
+            "history": {
+                "samples": len(self._history),
+                "bytes": self._history.nbytes,
+                "temperature_range": self._history.min_max(now, HISTORY_TREND_WINDOW),
+                "setpoint_changed_ago": self._history.time_since_change(now, "setpoint"),
+                "mode_changed_ago": self._history.time_since_change(now, "mode"),
+            },
+            "compensation": (
+                {
+                    "user_target": self._user_target,
+                    "source_temperature": self._source_temperature,
+                    "offset": round(self._compensator.offset, 3),
+                    "deferred": self._compensator.deferred,
+                    "commands": self._compensator.commands,
+                    "blocked": self._compensator.blocked,
+                    "commands_last_hour": self._compensator.budget.used(
+                        self.hass.loop.time()
+                    ),
+                }
+                if self._compensator is not None
+                else None
+            ),
+            "optimistic": (
+                {
+                    "pending": self._optimistic.values,
+                    "confirmed": self._optimistic.confirmed,
+                    "rolled_back": self._optimistic.rolled_back,
+                }
+                if self._optimistic is not None
+                else None
+            ),
+            "gateways": {
+                "assigned": self._gateways,
+                "spacing": self._gateway_spacing,
+                "queues": async_get_gateways(self.hass).diagnostics(
+                    [gateway for gateway in self._gateways.values() if gateway is not None]
+                ),
+            },
+            "commands": {
+                "timeout": self._command_timeout,
+                "awaiting_confirmation": len(self._confirmations),
+                "outbound_contexts": len(self._outbound),
+                "outbound_context_hits": self._outbound.hits,
+                "confirmed_by_context": self._confirmations.confirmed_by_context,
+                "confirmed_by_state": self._confirmations.confirmed_by_state,
+                "in_flight": self._commands.in_flight,
+                "pending": self._commands.pending,
+                "submitted": self._commands.submitted,
+                "merged": self._commands.merged,
+                "sent": self._commands.sent,
+                "failed": self._commands.failed,
+            },
+        }
+    
+    def _recursive_target(self) -> bool:
+        """命令是否会绕回虚拟空调，即源空调中有虚拟空调自身或其他虚拟空调.
+
+        由源空调状态变化触发的自动化再调用本实体是正常的调用，不按 Context 拒绝；
+        出站命令的 Context 只用于识别源空调的回声。
+        """
+        return any(
+            ac_entity_id == self.entity_id or ac_entity_id.startswith(f"{DOMAIN}.")
+            for ac_entity_id in self._group.entity_ids
+        )
+    
+    def _echo_reflected(self, ac_state: State) -> bool:
+        """单台源空调的状态是否已经完全反映在当前显示的状态中."""
+        if (
+            self._group.is_group
+            or not self._attr_available
+            or self._restored
+            or ac_state.state in (STATE_UNAVAILABLE, STATE_UNKNOWN)
+            or intern_capabilities(ac_state.attributes) is not self._capabilities
+        ):
+            return False
+        attributes = ac_state.attributes
+        if (
+            attributes.get("target_temp_high") != self._attr_target_temperature_high
+            or attributes.get("target_temp_low") != self._attr_target_temperature_low
+        ):
+            return False
+        displayed = {key: getattr(self, name) for key, name in _OPTIMISTIC_ATTRIBUTES.items()}
+        if self._compensator is not None:
+            # 闭环补偿时显示的是用户的目标温度，回声对应源空调的设定温度
+            displayed[ATTR_TEMPERATURE] = self._source_temperature
+        return all(
+            values_match(key, value, source_value(ac_state, key))
+            for key, value in displayed.items()
+        )
+    
+    def _projected_state(self) -> tuple:
+        """对外可见状态的紧凑表示，用于比较是否需要写入."""
+        return tuple(getattr(self, name, None) for name in _PROJECTED_ENTITY_ATTRIBUTES)
         
     def _update_state(self) -> None:
         """更新实体状态."""
-        # 获取源空调实体状态
-        ac_state = self.hass.states.get(self._ac_entity_id)
+        # 获取源空调实体状态（多台源空调时为合并状态）
+        ac_state = self._group.state
+        self._units = self._group.units
+        if ac_state is None and self._restored:
+            # 源空调尚未加载，继续显示恢复的状态
+            self._update_hvac_action()
+            return
+        self._restored = False
         if ac_state is None or ac_state.state in (STATE_UNAVAILABLE, STATE_UNKNOWN):
             # 源空调不可用时，我们的虚拟空调也不可用
+            self._ac_fingerprint = source_fingerprint(ac_state)
             self._attr_available = False
             return
         
-        # 防止无限递归的简单检查 - 标记正在更新过程中
-        key = f"{self.entity_id}_updating"
-        if key in _RECURSION_COUNTERS and _RECURSION_COUNTERS[key] > 0:
-            _RECURSION_COUNTERS[key] += 1
-            if _RECURSION_COUNTERS[key] > _MAX_RECURSION_DEPTH:
-                _LOGGER.debug("跳过递归状态更新: %s", key)
-                return
-        else:
-            _RECURSION_COUNTERS[key] = 1
-            
+        self._attr_available = True
+        
+        # 源空调投射字段未变化时无需重新投射
+        fingerprint = source_fingerprint(ac_state)
+        if fingerprint != self._ac_fingerprint:
+            self._ac_fingerprint = fingerprint
+            self._project_ac(ac_state)
+        
+        # 源空调上报一致的值时确认乐观值，其余的继续覆盖投射结果
+        if self._optimistic:
+            self._optimistic.async_confirm(ac_state)
+            self._apply_optimistic()
+                
+        # 当前温度由温度传感器事件维护，这里只更新HVAC操作状态
+        self._update_hvac_action()
+    
+    def _apply_optimistic(self) -> None:
+        """用等待确认的乐观值覆盖投射的属性."""
+        for key, value in self._optimistic.values.items():
+            setattr(self, _OPTIMISTIC_ATTRIBUTES[key], value)
+    
+    @callback
+    def _async_show_optimistic(self, values: dict[str, Any]) -> list[str]:
+        """乐观模式下立即显示命令值，返回记录的属性."""
+        if self._optimistic is None:
+            return []
+        values = {key: value for key, value in values.items() if value is not None}
+        self._optimistic.async_set(values)
+        self._apply_optimistic()
+        self._update_hvac_action()
+        self._async_write_if_changed()
+        return list(values)
+    
+    @callback
+    def _async_rollback_optimistic(self, keys: list[str]) -> None:
+        """命令发送失败时立即回滚乐观值."""
+        if self._optimistic is not None and keys:
+            self._optimistic.async_rollback(keys, "command_failed")
+    
+    @callback
+    def _async_optimistic_rollback(self, key: str, expected: Any, reason: str) -> None:
+        """乐观值未被确认：记录失败并恢复源空调的实际状态."""
+        ac_state = self._group.state
+        actual = source_value(ac_state, key) if ac_state is not None else None
+        _LOGGER.warning(
+            "源空调 %s 未确认 %s=%s（%s），已回滚为 %s",
+            self._group.entity_ids,
+            key,
+            expected,
+            reason,
+            actual,
+        )
+        self._metrics.optimistic_rollbacks += 1
+        self.hass.bus.async_fire(
+            EVENT_OPTIMISTIC_ROLLBACK,
+            {
+                "entity_id": self.entity_id,
+                "source_entity_id": self._group.primary,
+                "source_entity_ids": self._group.entity_ids,
+                "attribute": key,
+                "expected": expected,
+                "actual": actual,
+                "reason": reason,
+            },
+        )
+        # 强制重新投射源空调的实际状态
+        self._ac_fingerprint = None
+        self._update_state()
+        self._async_write_if_changed()
+    
+    def _project_ac(self, ac_state: State) -> None:
+        """将源空调状态投射到虚拟空调属性."""
+        attributes = ac_state.attributes
+        
+        # 从源空调复制模式和功能
         try:
-            self._attr_available = True
+            self._attr_hvac_mode = HVACMode(ac_state.state)
+        except ValueError:
+            self._attr_hvac_mode = HVACMode.OFF
+        if self._attr_hvac_mode != HVACMode.OFF:
+            # 记住最近的运行模式，开机时一次性恢复
+            self._last_active_mode = self._attr_hvac_mode
             
-            # 从源空调复制模式和功能
-            try:
-                self._attr_hvac_mode = HVACMode(ac_state.state) if ac_state.state in [mode.value for mode in HVACMode] else HVACMode.OFF
-            except ValueError:
-                self._attr_hvac_mode = HVACMode.OFF
+        # 能力列表使用共享的不可变快照，能力不变时不复制任何列表
+        capabilities = intern_capabilities(attributes)
+        if capabilities is not self._capabilities:
+            self._capabilities = capabilities
+            self._attr_hvac_modes = capabilities.hvac_modes
                 
-            # 重置HVAC模式列表
-            self._attr_hvac_modes = [HVACMode.OFF]
+        # 复制风扇模式
+        if "fan_modes" in attributes and "fan_mode" in attributes:
+            self._attr_fan_modes = capabilities.fan_modes or ()
+            self._attr_fan_mode = attributes.get("fan_mode")
             
-            # 获取支持的模式
-            for mode in HVACMode:
-                if mode.value in ac_state.attributes.get("hvac_modes", []):
-                    if mode not in self._attr_hvac_modes:
-                        self._attr_hvac_modes.append(mode)
-                    
-            # 复制风扇模式
-            if "fan_modes" in ac_state.attributes and "fan_mode" in ac_state.attributes:
-                self._attr_fan_modes = ac_state.attributes.get("fan_modes", [])
-                self._attr_fan_mode = ac_state.attributes.get("fan_mode")
-                
-            # 复制摆动模式
-            if "swing_modes" in ac_state.attributes and "swing_mode" in ac_state.attributes:
-                self._attr_swing_modes = ac_state.attributes.get("swing_modes", [])
-                self._attr_swing_mode = ac_state.attributes.get("swing_mode")
-                
-            # 从源空调获取目标温度
-            if ATTR_TEMPERATURE in ac_state.attributes:
-                self._attr_target_temperature = ac_state.attributes.get(ATTR_TEMPERATURE)
-                self._attr_target_temperature_high = ac_state.attributes.get("target_temp_high")
-                self._attr_target_temperature_low = ac_state.attributes.get("target_temp_low")
-                self._attr_max_temp = ac_state.attributes.get("max_temp")
-                self._attr_min_temp = ac_state.attributes.get("min_temp")
-                self._attr_target_temperature_step = ac_state.attributes.get("target_temp_step", 1)
-                _LOGGER.debug(
-                    "从源空调更新温度 - 目标温度: %s, 最小: %s, 最大: %s, 步长: %s",
-                    self._attr_target_temperature,
-                    self._attr_min_temp,
-                    self._attr_max_temp,
-                    self._attr_target_temperature_step
-                )
-            else:
-                _LOGGER.debug("源空调 %s 状态中没有温度属性", self._ac_entity_id)
-                
-            # 从温度传感器获取当前温度
-            temp_state = self.hass.states.get(self._temp_entity_id)
-            if temp_state is not None and temp_state.state not in (STATE_UNAVAILABLE, STATE_UNKNOWN):
-                try:
-                    self._attr_current_temperature = float(temp_state.state)
-                except ValueError:
-                    _LOGGER.error("无法将温度传感器值转换为数字: %s", temp_state.state)
-                    
-            # 更新HVAC操作状态
-            if self.hvac_mode == HVACMode.OFF:
-                self._attr_hvac_action = HVACAction.OFF
-            elif hasattr(self, "current_temperature") and hasattr(self, "target_temperature"):
-                if self.hvac_mode == HVACMode.COOL and self.current_temperature > self.target_temperature:
-                    self._attr_hvac_action = HVACAction.COOLING
-                elif self.hvac_mode == HVACMode.HEAT and self.current_temperature < self.target_temperature:
-                    self._attr_hvac_action = HVACAction.HEATING
-                else:
-                    self._attr_hvac_action = HVACAction.IDLE
-            else:
-                self._attr_hvac_action = HVACAction.IDLE
-        finally:
-            # 减少递归计数器
-            _RECURSION_COUNTERS[key] -= 1
-            if _RECURSION_COUNTERS[key] == 0:
-                del _RECURSION_COUNTERS[key]
+        # 复制摆动模式
+        if "swing_modes" in attributes and "swing_mode" in attributes:
+            self._attr_swing_modes = capabilities.swing_modes or ()
+            self._attr_swing_mode = attributes.get("swing_mode")
+            
+        # 从源空调获取目标温度
+        if ATTR_TEMPERATURE in attributes:
+            self._attr_target_temperature = attributes.get(ATTR_TEMPERATURE)
+            self._source_temperature = self._attr_target_temperature
+            if self._compensator is not None:
+                # 闭环补偿时显示用户的目标温度，第一次投射时沿用源空调的设定
+                if self._user_target is None:
+                    self._user_target = self._source_temperature
+                self._attr_target_temperature = self._user_target
+            self._attr_target_temperature_high = attributes.get("target_temp_high")
+            self._attr_target_temperature_low = attributes.get("target_temp_low")
+            self._attr_max_temp = capabilities.max_temp
+            self._attr_min_temp = capabilities.min_temp
+            self._attr_target_temperature_step = capabilities.target_temp_step or 1
+            _LOGGER.debug(
+                "从源空调更新温度 - 目标温度: %s, 最小: %s, 最大: %s, 步长: %s",
+                self._attr_target_temperature,
+                self._attr_min_temp,
+                self._attr_max_temp,
+                self._attr_target_temperature_step
+            )
+        else:
+            _LOGGER.debug("源空调 %s 状态中没有温度属性", self._group.entity_ids)
+    
+    def _update_hvac_action(self) -> None:
+        """根据模式和温度推导HVAC操作状态."""
+        current = self._attr_current_temperature
+        target = self._attr_target_temperature
+        if self._attr_hvac_mode == HVACMode.OFF:
+            self._attr_hvac_action = HVACAction.OFF
+        elif current is None or target is None:
+            self._attr_hvac_action = HVACAction.IDLE
+        elif self._attr_hvac_mode == HVACMode.COOL and current > target:
+            self._attr_hvac_action = HVACAction.COOLING
+        elif self._attr_hvac_mode == HVACMode.HEAT and current < target:
+            self._attr_hvac_action = HVACAction.HEATING
+        else:
+            self._attr_hvac_action = HVACAction.IDLE
         
-    @prevent_recursion
     async def async_set_temperature(self, **kwargs) -> None:
         """设置温度."""
         # 检查目标实体ID，防止递归调用
-        entity_id = self.entity_id  # 获取当前实体的完整实体ID
-        if self._ac_entity_id == entity_id or self._ac_entity_id.startswith(f"{DOMAIN}."):
-            _LOGGER.error("检测到递归调用：无法将温度设置传递给虚拟空调实体 %s", self._ac_entity_id)
+        if self._recursive_target():
+            _LOGGER.error("检测到递归调用：无法将温度设置传递给虚拟空调实体 %s", self._group.entity_ids)
+            self._metrics.recursion_guard_trips += 1
             return
             
         # 记录传入的参数，帮助调试
         _LOGGER.debug("设置温度请求参数: %s", kwargs)
         
         # 确保温度值正确传递
-        service_data = {"entity_id": self._ac_entity_id}
+        service_data = {}
         
         # 提取关键参数
         if ATTR_TEMPERATURE in kwargs:
             service_data[ATTR_TEMPERATURE] = kwargs[ATTR_TEMPERATURE]
             _LOGGER.debug("正在设置目标空调 %s 的温度为 %s", 
-                          self._ac_entity_id, kwargs[ATTR_TEMPERATURE])
+                          self._group.entity_ids, kwargs[ATTR_TEMPERATURE])
         else:
             _LOGGER.warning("设置温度请求中缺少温度参数")
             return
@@ -433,185 +1463,242 @@ class HonghuiAirClimate(ClimateEntity):
             service_data["target_temp_low"] = kwargs["target_temp_low"]
 
         # 将温度设置传递给源空调
+        optimistic: list[str] = []
         try:
             # 检查目标空调实体是否存在
-            ac_state = self.hass.states.get(self._ac_entity_id)
+            ac_state = self._group.command_state
             if ac_state is None:
-                _LOGGER.error("无法设置温度: 目标空调实体 %s 不存在", self._ac_entity_id)
+                _LOGGER.error("无法设置温度: 目标空调实体 %s 不存在", self._group.entity_ids)
                 return
                 
             # 检查目标空调是否支持温度设置
             if not hasattr(ac_state.attributes, 'get') or ATTR_TEMPERATURE not in ac_state.attributes:
-                _LOGGER.warning("目标空调实体 %s 可能不支持温度设置", self._ac_entity_id)
+                _LOGGER.warning("目标空调实体 %s 可能不支持温度设置", self._group.entity_ids)
                 # 继续尝试设置，因为有些实体可能接受设置但不报告属性
             
-            # 直接调用服务设置温度
-            await self.hass.services.async_call(
-                "climate",
-                "set_temperature",
-                service_data,
-                blocking=True,
+            temperature = service_data[ATTR_TEMPERATURE]
+            if self._compensator is not None:
+                # 闭环补偿时立即显示用户的目标温度，按当前室温重新开始补偿
+                self._user_target = temperature
+                self._attr_target_temperature = temperature
+                service_data[ATTR_TEMPERATURE] = self._compensator.start(
+                    temperature,
+                    self._attr_current_temperature,
+                    self.hass.loop.time(),
+                    self._attr_target_temperature_step or 1,
+                    self._attr_min_temp,
+                    self._attr_max_temp,
+                )
+                self._update_hvac_action()
+                self._async_write_if_changed()
+                temperature = None
+            
+            # 乐观模式下立即显示新的目标温度和模式
+            optimistic = self._async_show_optimistic(
+                {
+                    ATTR_TEMPERATURE: temperature,
+                    "hvac_mode": service_data.get("hvac_mode"),
+                }
+            )
+            
+            # 通过命令队列发送，连续的设置只会发送最新的温度
+            await self._commands.async_submit(
+                ATTR_TEMPERATURE, "set_temperature", service_data, context=self._context
             )
             
             # 在温度设置后主动更新一次状态，确保变化被反映
             self._update_state()
-            self.async_write_ha_state()
+            self._async_write_if_changed()
             
             _LOGGER.debug("成功发送温度设置到目标空调: %s", service_data)
         except Exception as e:
-            _LOGGER.error("设置目标空调温度时出错: %s, 错误: %s", self._ac_entity_id, str(e))
+            self._async_rollback_optimistic(optimistic)
+            _LOGGER.error("设置目标空调温度时出错: %s, 错误: %s", self._group.entity_ids, str(e))
         
-    @prevent_recursion
     async def async_set_hvac_mode(self, hvac_mode: HVACMode) -> None:
         """设置HVAC模式."""
         # 检查目标实体ID，防止递归调用
-        entity_id = self.entity_id  # 获取当前实体的完整实体ID
-        if self._ac_entity_id == entity_id or self._ac_entity_id.startswith(f"{DOMAIN}."):
-            _LOGGER.error("检测到递归调用：无法将HVAC模式设置传递给虚拟空调实体 %s", self._ac_entity_id)
+        if self._recursive_target():
+            _LOGGER.error("检测到递归调用：无法将HVAC模式设置传递给虚拟空调实体 %s", self._group.entity_ids)
+            self._metrics.recursion_guard_trips += 1
             return
             
         # 记录正在设置的模式
-        _LOGGER.debug("设置HVAC模式: %s 到目标空调: %s", hvac_mode, self._ac_entity_id)
+        _LOGGER.debug("设置HVAC模式: %s 到目标空调: %s", hvac_mode, self._group.entity_ids)
         
+        ac_state = self._group.command_state
+        if ac_state is None:
+            _LOGGER.error("无法设置HVAC模式: 目标空调实体 %s 不存在", self._group.entity_ids)
+            return
+        
+        optimistic = self._async_show_optimistic({"hvac_mode": hvac_mode})
         try:
-            # 将模式设置传递给源空调
-            await self.hass.services.async_call(
-                "climate",
-                "set_hvac_mode",
-                {"entity_id": self._ac_entity_id, "hvac_mode": hvac_mode},
-                blocking=True,
+            # 同时携带当前目标温度，避免模式变化后目标温度丢失需要再补发一次
+            plan = plan_commands(
+                ac_state,
+                TargetState(hvac_mode=hvac_mode, temperature=self._source_setpoint()),
             )
-            
-            # 保存当前的目标温度，以备需要
-            current_target_temp = self.target_temperature if hasattr(self, "target_temperature") else None
+            self._record_setpoint_writes(ac_state, plan)
+            await self._commands.async_execute(plan, context=self._context)
             
             # 更新状态以反映模式变化
             self._update_state()
-            self.async_write_ha_state()
-            
-            # 如果模式变化后目标温度丢失，尝试重新设置
-            if hvac_mode != HVACMode.OFF and current_target_temp is not None:
-                # 获取更新后的状态
-                ac_state = self.hass.states.get(self._ac_entity_id)
-                if ac_state and ATTR_TEMPERATURE not in ac_state.attributes:
-                    _LOGGER.debug("模式变化后目标温度丢失，尝试重新设置: %s", current_target_temp)
-                    # 重新设置温度
-                    await self.async_set_temperature(**{ATTR_TEMPERATURE: current_target_temp})
+            self._async_write_if_changed()
                     
             _LOGGER.debug("成功设置HVAC模式: %s", hvac_mode)
         except Exception as e:
+            self._async_rollback_optimistic(optimistic)
             _LOGGER.error("设置HVAC模式时出错: %s, 错误: %s", hvac_mode, str(e))
         
-    @prevent_recursion
     async def async_set_fan_mode(self, fan_mode: str) -> None:
         """设置风扇模式."""
         # 检查目标实体ID，防止递归调用
-        entity_id = self.entity_id  # 获取当前实体的完整实体ID
-        if self._ac_entity_id == entity_id or self._ac_entity_id.startswith(f"{DOMAIN}."):
-            _LOGGER.error("检测到递归调用：无法将风扇模式设置传递给虚拟空调实体 %s", self._ac_entity_id)
+        if self._recursive_target():
+            _LOGGER.error("检测到递归调用：无法将风扇模式设置传递给虚拟空调实体 %s", self._group.entity_ids)
+            self._metrics.recursion_guard_trips += 1
             return
             
         # 将风扇模式设置传递给源空调
-        await self.hass.services.async_call(
-            "climate",
-            "set_fan_mode",
-            {"entity_id": self._ac_entity_id, "fan_mode": fan_mode},
-            blocking=True,
-        )
+        optimistic = self._async_show_optimistic({"fan_mode": fan_mode})
+        try:
+            await self._commands.async_submit(
+                "fan_mode", "set_fan_mode", {"fan_mode": fan_mode}, context=self._context
+            )
+        except Exception:
+            self._async_rollback_optimistic(optimistic)
+            raise
         
-    @prevent_recursion
     async def async_set_swing_mode(self, swing_mode: str) -> None:
         """设置摆动模式."""
         # 检查目标实体ID，防止递归调用
-        entity_id = self.entity_id  # 获取当前实体的完整实体ID
-        if self._ac_entity_id == entity_id or self._ac_entity_id.startswith(f"{DOMAIN}."):
-            _LOGGER.error("检测到递归调用：无法将摆动模式设置传递给虚拟空调实体 %s", self._ac_entity_id)
+        if self._recursive_target():
+            _LOGGER.error("检测到递归调用：无法将摆动模式设置传递给虚拟空调实体 %s", self._group.entity_ids)
+            self._metrics.recursion_guard_trips += 1
             return
             
         # 将摆动模式设置传递给源空调
-        await self.hass.services.async_call(
-            "climate",
-            "set_swing_mode",
-            {"entity_id": self._ac_entity_id, "swing_mode": swing_mode},
-            blocking=True,
-        )
+        optimistic = self._async_show_optimistic({"swing_mode": swing_mode})
+        try:
+            await self._commands.async_submit(
+                "swing_mode",
+                "set_swing_mode",
+                {"swing_mode": swing_mode},
+                context=self._context,
+            )
+        except Exception:
+            self._async_rollback_optimistic(optimistic)
+            raise
         
-    @prevent_recursion
     async def async_turn_on(self) -> None:
         """打开空调."""
         # 检查目标实体ID，防止递归调用
-        entity_id = self.entity_id  # 获取当前实体的完整实体ID
-        if self._ac_entity_id == entity_id or self._ac_entity_id.startswith(f"{DOMAIN}."):
-            _LOGGER.error("检测到递归调用：无法将开机命令传递给虚拟空调实体 %s", self._ac_entity_id)
+        if self._recursive_target():
+            _LOGGER.error("检测到递归调用：无法将开机命令传递给虚拟空调实体 %s", self._group.entity_ids)
+            self._metrics.recursion_guard_trips += 1
             return
             
-        _LOGGER.debug("打开空调: %s", self._ac_entity_id)
+        _LOGGER.debug("打开空调: %s", self._group.entity_ids)
         
+        ac_state = self._group.command_state
+        if ac_state is None:
+            _LOGGER.error("无法打开空调: 目标空调实体 %s 不存在", self._group.entity_ids)
+            return
+        if ac_state.state not in (HVACMode.OFF, STATE_MIXED):
+            # 多台源空调有开有关时（mixed）仍需开启关闭的那些
+            _LOGGER.debug("源空调已处于开启状态: %s", ac_state.state)
+            return
+        
+        optimistic: list[str] = []
         try:
-            # 尝试调用源空调的 turn_on 服务
-            await self.hass.services.async_call(
-                "climate",
-                "turn_on",
-                {"entity_id": self._ac_entity_id},
-                blocking=True,
+            features = int(ac_state.attributes.get("supported_features") or 0)
+            available_modes = ac_state.attributes.get("hvac_modes", [])
+            # 优先恢复上一次的运行模式，和目标温度一起在一次调用中发送
+            target_mode = (
+                self._last_active_mode
+                if self._last_active_mode is not None
+                and self._last_active_mode.value in available_modes
+                else None
             )
+            if target_mode is None and features & ClimateEntityFeature.TURN_ON:
+                plan = [PlannedCommand("hvac_mode", "turn_on", {})]
+            else:
+                target_mode = target_mode or preferred_on_mode(ac_state)
+                if target_mode is None:
+                    _LOGGER.error("源空调 %s 没有可用的开机模式", self._group.entity_ids)
+                    return
+                plan = plan_commands(
+                    ac_state,
+                    TargetState(hvac_mode=target_mode, temperature=self._source_setpoint()),
+                )
+                # 开机模式已知时乐观显示；源空调自己的 turn_on 无法预知结果
+                optimistic = self._async_show_optimistic({"hvac_mode": target_mode})
+            self._record_setpoint_writes(ac_state, plan)
+            await self._commands.async_execute(plan, context=self._context)
             
-            # 如果源空调不支持 turn_on，尝试设置为默认模式
-            ac_state = self.hass.states.get(self._ac_entity_id)
-            if ac_state and ac_state.state == HVACMode.OFF.value:
-                # 获取可用的模式，优先选择 COOL，然后是 HEAT，最后是 AUTO
-                available_modes = ac_state.attributes.get("hvac_modes", [])
-                target_mode = None
-                
-                if HVACMode.COOL.value in available_modes:
-                    target_mode = HVACMode.COOL
-                elif HVACMode.HEAT.value in available_modes:
-                    target_mode = HVACMode.HEAT
-                elif HVACMode.AUTO.value in available_modes:
-                    target_mode = HVACMode.AUTO
-                
-                if target_mode:
-                    _LOGGER.debug("源空调不支持 turn_on，尝试设置为模式: %s", target_mode)
-                    await self.async_set_hvac_mode(target_mode)
+            # 如果源空调的 turn_on 没有效果，退回到设置默认模式
+            ac_state = self._group.command_state
+            if (
+                target_mode is None
+                and ac_state
+                and ac_state.state == HVACMode.OFF.value
+                and (target_mode := preferred_on_mode(ac_state)) is not None
+            ):
+                _LOGGER.debug("源空调 turn_on 无效，尝试设置为模式: %s", target_mode)
+                plan = plan_commands(
+                    ac_state,
+                    TargetState(hvac_mode=target_mode, temperature=self._source_setpoint()),
+                )
+                self._record_setpoint_writes(ac_state, plan)
+                await self._commands.async_execute(plan, context=self._context)
             
             # 更新状态
             self._update_state()
-            self.async_write_ha_state()
+            self._async_write_if_changed()
             
             _LOGGER.debug("成功打开空调")
         except Exception as e:
+            self._async_rollback_optimistic(optimistic)
             _LOGGER.error("打开空调时出错: %s", str(e))
             
-    @prevent_recursion
     async def async_turn_off(self) -> None:
         """关闭空调."""
         # 检查目标实体ID，防止递归调用
-        entity_id = self.entity_id  # 获取当前实体的完整实体ID
-        if self._ac_entity_id == entity_id or self._ac_entity_id.startswith(f"{DOMAIN}."):
-            _LOGGER.error("检测到递归调用：无法将关机命令传递给虚拟空调实体 %s", self._ac_entity_id)
+        if self._recursive_target():
+            _LOGGER.error("检测到递归调用：无法将关机命令传递给虚拟空调实体 %s", self._group.entity_ids)
+            self._metrics.recursion_guard_trips += 1
             return
             
-        _LOGGER.debug("关闭空调: %s", self._ac_entity_id)
+        _LOGGER.debug("关闭空调: %s", self._group.entity_ids)
         
+        ac_state = self._group.command_state
+        if ac_state is None:
+            _LOGGER.error("无法关闭空调: 目标空调实体 %s 不存在", self._group.entity_ids)
+            return
+        
+        optimistic = self._async_show_optimistic({"hvac_mode": HVACMode.OFF})
         try:
-            # 尝试调用源空调的 turn_off 服务
-            await self.hass.services.async_call(
-                "climate",
-                "turn_off",
-                {"entity_id": self._ac_entity_id},
-                blocking=True,
+            # 已经关闭时不发送任何命令；支持 turn_off 时使用 turn_off，否则设置为 OFF 模式
+            await self._commands.async_execute(
+                plan_commands(ac_state, TargetState(hvac_mode=HVACMode.OFF)),
+                context=self._context,
             )
             
-            # 如果源空调不支持 turn_off，尝试设置为 OFF 模式
-            ac_state = self.hass.states.get(self._ac_entity_id)
+            # 如果源空调的 turn_off 没有效果，退回到设置 OFF 模式
+            ac_state = self._group.command_state
             if ac_state and ac_state.state != HVACMode.OFF.value:
-                _LOGGER.debug("源空调不支持 turn_off，尝试设置为 OFF 模式")
-                await self.async_set_hvac_mode(HVACMode.OFF)
+                _LOGGER.debug("源空调 turn_off 无效，尝试设置为 OFF 模式")
+                await self._commands.async_submit(
+                    "hvac_mode",
+                    "set_hvac_mode",
+                    {"hvac_mode": HVACMode.OFF},
+                    context=self._context,
+                )
             
             # 更新状态
             self._update_state()
-            self.async_write_ha_state()
+            self._async_write_if_changed()
             
             _LOGGER.debug("成功关闭空调")
         except Exception as e:
+            self._async_rollback_optimistic(optimistic)
             _LOGGER.error("关闭空调时出错: %s", str(e))
@@ -0,0 +1,302 @@
+"""HongHui Climate 出站命令处理."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+import logging
+from typing import Any
+
+from homeassistant.components.climate import ClimateEntityFeature, HVACMode
+from homeassistant.const import ATTR_TEMPERATURE
+from homeassistant.core import Context, HomeAssistant, State, callback
+from homeassistant.exceptions import HomeAssistantError
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class TargetState:
+    """命令希望达到的源空调最终状态，None 表示不关心."""
+
+    hvac_mode: HVACMode | None = None
+    temperature: float | None = None
+    fan_mode: str | None = None
+    swing_mode: str | None = None
+
+
+@dataclass(frozen=True)
+class PlannedCommand:
+    """计划发送的一个服务调用."""
+
+    key: str
+    service: str
+    data: dict[str, Any]
+
+
+def plan_commands(ac_state: State, target: TargetState) -> list[PlannedCommand]:
+    """用尽可能少的服务调用把源空调带到目标状态.
+
+    已经满足的部分会被跳过；模式和目标温度同时需要设置时，使用带
+    ``hvac_mode`` 的 ``set_temperature`` 一次完成。所有改变模式的命令都使用
+    ``hvac_mode`` 队列，按提交顺序发送，较早的模式不会在较新的模式（例如关机）
+    之后发出。
+    """
+    attributes = ac_state.attributes
+    features = int(attributes.get("supported_features") or 0)
+    plan: list[PlannedCommand] = []
+
+    mode_changed = target.hvac_mode is not None and target.hvac_mode != ac_state.state
+
+    if target.hvac_mode == HVACMode.OFF:
+        if mode_changed:
+            if features & ClimateEntityFeature.TURN_OFF:
+                plan.append(PlannedCommand("hvac_mode", "turn_off", {}))
+            else:
+                plan.append(
+                    PlannedCommand("hvac_mode", "set_hvac_mode", {"hvac_mode": HVACMode.OFF})
+                )
+        # 关机时其他属性没有意义
+        return plan
+
+    temperature_changed = (
+        target.temperature is not None
+        and target.temperature != attributes.get(ATTR_TEMPERATURE)
+    )
+    supports_temperature = bool(features & ClimateEntityFeature.TARGET_TEMPERATURE)
+
+    if mode_changed and target.temperature is not None and supports_temperature:
+        # 一次调用同时设置模式和目标温度，与其他模式命令排在同一个队列
+        plan.append(
+            PlannedCommand(
+                "hvac_mode",
+                "set_temperature",
+                {ATTR_TEMPERATURE: target.temperature, "hvac_mode": target.hvac_mode},
+            )
+        )
+    else:
+        if mode_changed:
+            plan.append(
+                PlannedCommand("hvac_mode", "set_hvac_mode", {"hvac_mode": target.hvac_mode})
+            )
+        if temperature_changed:
+            plan.append(
+                PlannedCommand(
+                    ATTR_TEMPERATURE, "set_temperature", {ATTR_TEMPERATURE: target.temperature}
+                )
+            )
+
+    if (
+        target.fan_mode is not None
+        and target.fan_mode != attributes.get("fan_mode")
+        and features & ClimateEntityFeature.FAN_MODE
+    ):
+        plan.append(PlannedCommand("fan_mode", "set_fan_mode", {"fan_mode": target.fan_mode}))
+
+    if (
+        target.swing_mode is not None
+        and target.swing_mode != attributes.get("swing_mode")
+        and features & ClimateEntityFeature.SWING_MODE
+    ):
+        plan.append(
+            PlannedCommand("swing_mode", "set_swing_mode", {"swing_mode": target.swing_mode})
+        )
+
+    return plan
+
+
+# 目标温度的比较容差（°C），源空调可能按自己的精度上报
+TEMPERATURE_TOLERANCE = 0.05
+
+# 可以从源空调状态读回的命令属性
+_CONFIRMABLE_KEYS = ("hvac_mode", ATTR_TEMPERATURE, "fan_mode", "swing_mode")
+
+
+def source_value(state: State, key: str) -> Any:
+    """源空调状态中与命令属性对应的值."""
+    if key == "hvac_mode":
+        return state.state
+    return state.attributes.get(key)
+
+
+def values_match(key: str, expected: Any, actual: Any) -> bool:
+    """源空调上报的值是否与命令值一致."""
+    if key == ATTR_TEMPERATURE and expected is not None and actual is not None:
+        try:
+            return abs(float(expected) - float(actual)) <= TEMPERATURE_TOLERANCE
+        except (TypeError, ValueError):
+            return False
+    return expected == actual
+
+
+def command_satisfied(state: State, service: str, data: dict[str, Any]) -> bool:
+    """源空调状态是否已经反映了命令."""
+    if service == "turn_off":
+        return state.state == HVACMode.OFF
+    if service == "turn_on":
+        return state.state != HVACMode.OFF
+    keys = [key for key in _CONFIRMABLE_KEYS if key in data]
+    return bool(keys) and all(
+        values_match(key, data[key], source_value(state, key)) for key in keys
+    )
+
+
+def preferred_on_mode(ac_state: State) -> HVACMode | None:
+    """源空调不支持 turn_on 时使用的开机模式，优先 COOL，然后是 HEAT，最后是 AUTO."""
+    available_modes = ac_state.attributes.get("hvac_modes", [])
+    for mode in (HVACMode.COOL, HVACMode.HEAT, HVACMode.AUTO):
+        if mode.value in available_modes:
+            return mode
+    return None
+
+
+@dataclass
+class PendingCommand:
+    """等待发送的命令，targets 为 None 时发送给所有源空调."""
+
+    service: str
+    data: dict[str, Any]
+    targets: list[str] | None = None
+    waiters: list[asyncio.Future[Any]] = field(default_factory=list)
+    # 触发命令的调用，作为出站命令的父 Context
+    context: Context | None = None
+
+
+class CommandQueue:
+    """按属性合并的出站命令队列（后写者胜出）.
+
+    每个属性（温度、模式、风扇、摆动）最多保留一个待发送命令，新提交的值会
+    覆盖尚未发送的旧值。每个属性同一时间只有一个命令在发送，发送完成后再发送该
+    属性最新的值，因此拖动滑块时源空调只会收到最终值，且最终值不会丢失；不同属性
+    的命令互不等待。只发送给部分源空调的命令（批量控制）按属性和目标分别排队。
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        send: Callable[
+            [str, dict[str, Any], list[str] | None, Context | None], Awaitable[Any]
+        ],
+        name: str,
+    ) -> None:
+        """初始化命令队列."""
+        self.hass = hass
+        self._send = send
+        self._name = name
+        self._pending: dict[str, PendingCommand] = {}
+        self._workers: dict[str, asyncio.Task] = {}
+        self._in_flight: set[str] = set()
+        # 统计数据
+        self.submitted = 0
+        self.merged = 0
+        self.sent = 0
+        self.failed = 0
+
+    @property
+    def in_flight(self) -> list[str]:
+        """正在发送的命令属性."""
+        return sorted(self._in_flight)
+
+    @property
+    def pending(self) -> dict[str, dict[str, Any]]:
+        """等待发送的命令（属性 -> 服务和数据）."""
+        return {
+            key: {"service": command.service, "data": dict(command.data)}
+            for key, command in self._pending.items()
+        }
+
+    async def async_execute(
+        self,
+        plan: list[PlannedCommand],
+        targets: list[str] | None = None,
+        context: Context | None = None,
+    ) -> list[Any]:
+        """依次提交计划中的命令，返回每个命令的发送结果."""
+        return [
+            await self.async_submit(
+                command.key, command.service, command.data, targets, context
+            )
+            for command in plan
+        ]
+
+    async def async_submit(
+        self,
+        key: str,
+        service: str,
+        data: dict[str, Any],
+        targets: list[str] | None = None,
+        context: Context | None = None,
+    ) -> Any:
+        """提交命令并等待它（或覆盖它的更新值）发送完成，返回发送结果.
+
+        context 是触发命令的调用，合并时使用最新提交的命令的 context；没有时
+        （例如闭环补偿自行发出的命令）出站命令不关联任何调用。
+        """
+        future: asyncio.Future[Any] = self.hass.loop.create_future()
+        self.submitted += 1
+        if targets is not None:
+            key = f"{key}:{','.join(targets)}"
+
+        if (pending := self._pending.get(key)) is not None:
+            # 同一属性已有待发送命令，合并为最新值
+            self.merged += 1
+            if pending.service == service:
+                pending.data.update(data)
+            else:
+                pending.service = service
+                pending.data = dict(data)
+            pending.waiters.append(future)
+            pending.context = context
+        else:
+            self._pending[key] = PendingCommand(
+                service, dict(data), targets, [future], context
+            )
+
+        if key not in self._workers:
+            self._workers[key] = self.hass.async_create_background_task(
+                self._async_run(key), f"{self._name} command queue {key}"
+            )
+        return await future
+
+    async def _async_run(self, key: str) -> None:
+        """依次发送一个属性的最新命令."""
+        try:
+            while (command := self._pending.pop(key, None)) is not None:
+                self._in_flight.add(key)
+                try:
+                    result = await self._send(
+                        command.service, command.data, command.targets, command.context
+                    )
+                except asyncio.CancelledError:
+                    for waiter in command.waiters:
+                        if not waiter.done():
+                            waiter.set_exception(
+                                HomeAssistantError("虚拟空调已移除，命令未确认")
+                            )
+                    raise
+                except Exception as err:  # noqa: BLE001
+                    self.failed += 1
+                    for waiter in command.waiters:
+                        if not waiter.done():
+                            waiter.set_exception(err)
+                else:
+                    self.sent += 1
+                    for waiter in command.waiters:
+                        if not waiter.done():
+                            waiter.set_result(result)
+                finally:
+                    self._in_flight.discard(key)
+        finally:
+            self._workers.pop(key, None)
+
+    @callback
+    def async_shutdown(self) -> None:
+        """停止队列，通知所有等待者."""
+        workers, self._workers = self._workers, {}
+        for worker in workers.values():
+            worker.cancel()
+        pending, self._pending = self._pending, {}
+        for command in pending.values():
+            for waiter in command.waiters:
+                if not waiter.done():
+                    waiter.set_exception(HomeAssistantError("虚拟空调已移除，命令未发送"))
@@ -0,0 +1,185 @@
+"""HongHui Climate 基于外部温度传感器的设定温度闭环补偿."""
+from __future__ import annotations
+
+from collections import deque
+import math
+
+# 补偿后的设定温度越过量化边界多少个步长后才发送，避免在两个档位之间来回切换
+HYSTERESIS = 0.25
+
+# 积分使用的最大时间间隔（秒），传感器长时间没有上报后不会一次积分过多
+MAX_INTEGRATION_STEP = 600
+
+_HOUR = 3600
+
+
+class CommandBudget:
+    """每台源空调的命令预算：两次命令的最小间隔和每小时的命令数上限."""
+
+    def __init__(self, min_interval: float, max_per_hour: int) -> None:
+        """初始化命令预算."""
+        self._min_interval = min_interval
+        self._max_per_hour = max_per_hour
+        # 最近一小时内发送命令的时间
+        self._sent: deque[float] = deque()
+
+    def used(self, now: float) -> int:
+        """最近一小时内发送的命令数."""
+        self._prune(now)
+        return len(self._sent)
+
+    def delay(self, now: float) -> float:
+        """距离下一个命令可以发送还需等待的秒数，0 表示可以立即发送."""
+        self._prune(now)
+        wait = 0.0
+        if self._sent:
+            wait = self._sent[-1] + self._min_interval - now
+        if self._max_per_hour and len(self._sent) >= self._max_per_hour:
+            wait = max(wait, self._sent[-self._max_per_hour] + _HOUR - now)
+        return max(0.0, wait)
+
+    def record(self, now: float) -> None:
+        """记录一个已发送的命令."""
+        self._sent.append(now)
+
+    def _prune(self, now: float) -> None:
+        """丢弃一小时以前的记录."""
+        while self._sent and self._sent[0] <= now - _HOUR:
+            self._sent.popleft()
+
+
+class SetpointCompensator:
+    """按外部传感器测得的室温调整发送给源空调的设定温度.
+
+    源空调按自己的内部传感器调节，内部传感器往往与房间的实际温度有偏差。补偿器以
+    用户的目标温度和外部传感器读数之差做比例积分控制，得到下发给源空调的设定温度：
+    补偿量限制在 ±max_offset 以内，按 ``target_temp_step`` 量化，并且只有在越过
+    量化边界一定的滞回量、命令预算允许时才产生新的设定温度。每个实体只保存常数
+    大小的状态，由调用方在新的读数到来时调用 ``update``。
+    """
+
+    def __init__(
+        self,
+        budget: CommandBudget,
+        max_offset: float,
+        gain: float,
+        integral_time: float,
+    ) -> None:
+        """初始化补偿器."""
+        self.budget = budget
+        self._max_offset = max_offset
+        self._gain = gain
+        self._integral_time = integral_time
+        self._integral = 0.0
+        self._last_update: float | None = None
+        self.offset = 0.0
+        # 因命令预算而推迟的设定温度
+        self.deferred: float | None = None
+        # 统计数据
+        self.commands = 0
+        self.blocked = 0
+
+    def reset(self) -> None:
+        """清除积分，例如用户修改了目标温度."""
+        self._integral = 0.0
+        self._last_update = None
+        self.offset = 0.0
+        self.deferred = None
+
+    def pause(self) -> None:
+        """停止积分（空调关机或不在制冷/制热模式），恢复后从新的读数继续."""
+        self._last_update = None
+        self.deferred = None
+
+    def start(
+        self,
+        target: float,
+        room: float | None,
+        now: float,
+        step: float,
+        min_temp: float | None,
+        max_temp: float | None,
+    ) -> float:
+        """用户设置了新的目标温度：清除积分，返回按当前室温补偿后的设定温度.
+
+        用户的命令总是立即发送，但同样计入命令预算。
+        """
+        self.reset()
+        clamped = target
+        if room is not None:
+            clamped = self._control(target, room, now, min_temp, max_temp)
+        self.budget.record(now)
+        return _quantize(clamped, step, min_temp, max_temp)
+
+    def update(
+        self,
+        target: float,
+        room: float,
+        now: float,
+        current: float | None,
+        step: float,
+        min_temp: float | None,
+        max_temp: float | None,
+    ) -> float | None:
+        """输入新的室温读数，返回需要发送的设定温度；None 表示保持源空调当前的设定.
+
+        current 是源空调当前的设定温度。命令预算不允许发送时返回 None 并记录在
+        ``deferred`` 中，调用方可以在 ``budget.delay`` 之后再次调用。
+        """
+        clamped = self._control(target, room, now, min_temp, max_temp)
+        new = _quantize(clamped, step, min_temp, max_temp)
+        if current is not None and (
+            new == current or abs(clamped - current) < step * (0.5 + HYSTERESIS)
+        ):
+            self.deferred = None
+            return None
+        if self.budget.delay(now) > 0:
+            self.blocked += 1
+            self.deferred = new
+            return None
+        self.budget.record(now)
+        self.commands += 1
+        self.deferred = None
+        return new
+
+    def _control(
+        self,
+        target: float,
+        room: float,
+        now: float,
+        min_temp: float | None,
+        max_temp: float | None,
+    ) -> float:
+        """比例积分控制一步，返回限幅后（未量化）的设定温度."""
+        error = target - room
+        dt = 0.0 if self._last_update is None else min(now - self._last_update, MAX_INTEGRATION_STEP)
+        self._last_update = now
+
+        integral = self._integral + error * dt / self._integral_time
+        desired = target + self._gain * (error + integral)
+        lower = target - self._max_offset
+        upper = target + self._max_offset
+        if min_temp is not None:
+            lower = max(lower, min_temp)
+        if max_temp is not None:
+            upper = min(upper, max_temp)
+        clamped = min(max(desired, lower), upper)
+        if clamped == desired:
+            # 饱和时不再积分，避免积分饱和后长时间过冲
+            self._integral = integral
+        self.offset = clamped - target
+        return clamped
+
+
+def _quantize(
+    value: float, step: float, min_temp: float | None, max_temp: float | None
+) -> float:
+    """按步长量化设定温度并限制在源空调的范围内."""
+    step = step or 1
+    quantized = math.floor(value / step + 0.5) * step
+    if min_temp is not None:
+        quantized = max(quantized, math.ceil(min_temp / step - 1e-9) * step)
+    if max_temp is not None:
+        quantized = min(quantized, math.floor(max_temp / step + 1e-9) * step)
+    # 去掉浮点误差，例如 0.1 步长下的 23.200000000000003
+    return round(quantized, 2)
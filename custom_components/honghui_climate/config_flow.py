@@ -4,21 +4,72 @@ from __future__ import annotations
 import voluptuous as vol
 
 from homeassistant import config_entries
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
-import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.selector import (
+    BooleanSelector,
     EntitySelector,
     EntitySelectorConfig,
+    NumberSelector,
+    NumberSelectorConfig,
+    NumberSelectorMode,
+    SelectSelector,
+    SelectSelectorConfig,
+    SelectSelectorMode,
 )
 from homeassistant.const import Platform
 
 from .const import (
+    AGGREGATION_METHODS,
     CONF_AC_ENTITY_ID,
+    CONF_COMMAND_TIMEOUT,
+    CONF_COMPENSATION,
+    CONF_COMPENSATION_MAX_OFFSET,
+    CONF_COMPENSATION_MAX_PER_HOUR,
+    CONF_COMPENSATION_MIN_INTERVAL,
+    CONF_ENABLE_METRICS,
+    CONF_GATEWAY,
+    CONF_GATEWAY_SPACING,
+    CONF_GROUP_MAX_PARALLEL,
+    CONF_OPTIMISTIC,
+    CONF_OPTIMISTIC_TIMEOUT,
+    CONF_SOURCE_TIMEOUT,
+    CONF_TEMP_AGGREGATION,
+    CONF_TEMP_DEADBAND,
+    CONF_TEMP_EMA_ALPHA,
     CONF_TEMP_ENTITY_ID,
+    CONF_TEMP_MIN_INTERVAL,
+    CONF_TEMP_SMOOTHING,
+    CONF_TEMP_STALE_AFTER,
+    CONF_UPDATE_WINDOW,
+    DEFAULT_COMMAND_TIMEOUT,
+    DEFAULT_COMPENSATION,
+    DEFAULT_COMPENSATION_MAX_OFFSET,
+    DEFAULT_COMPENSATION_MAX_PER_HOUR,
+    DEFAULT_COMPENSATION_MIN_INTERVAL,
+    DEFAULT_ENABLE_METRICS,
+    DEFAULT_GATEWAY,
+    DEFAULT_GATEWAY_SPACING,
+    DEFAULT_GROUP_MAX_PARALLEL,
     DEFAULT_NAME,
+    DEFAULT_OPTIMISTIC,
+    DEFAULT_OPTIMISTIC_TIMEOUT,
+    DEFAULT_SOURCE_TIMEOUT,
+    DEFAULT_TEMP_AGGREGATION,
+    DEFAULT_TEMP_DEADBAND,
+    DEFAULT_TEMP_EMA_ALPHA,
+    DEFAULT_TEMP_MIN_INTERVAL,
+    DEFAULT_TEMP_SMOOTHING,
+    DEFAULT_TEMP_STALE_AFTER,
+    DEFAULT_UPDATE_WINDOW,
     DOMAIN,
+    GATEWAY_MODES,
+    SMOOTHING_MODES,
 )
+from .helpers import entity_id_list
+
+# 源实体保存在条目数据中，其余高级选项保存在条目选项中
+SOURCE_KEYS = (CONF_AC_ENTITY_ID, CONF_TEMP_ENTITY_ID)
 
 
 class HonghuiAirConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
@@ -31,26 +82,33 @@ class HonghuiAirConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         errors = {}
 
         if user_input is not None:
-            # 验证选择的实体是否存在
-            if not self.hass.states.get(user_input[CONF_AC_ENTITY_ID]):
+            # 验证选择的实体是否存在，可以选择多台空调组成一组
+            ac_entity_ids = entity_id_list(user_input[CONF_AC_ENTITY_ID])
+            if not ac_entity_ids or not all(
+                self.hass.states.get(ac_entity_id) for ac_entity_id in ac_entity_ids
+            ):
                 errors[CONF_AC_ENTITY_ID] = "entity_not_found"
-            if not self.hass.states.get(user_input[CONF_TEMP_ENTITY_ID]):
+            temp_entity_ids = entity_id_list(user_input[CONF_TEMP_ENTITY_ID])
+            if not temp_entity_ids or not all(
+                self.hass.states.get(temp_entity_id) for temp_entity_id in temp_entity_ids
+            ):
                 errors[CONF_TEMP_ENTITY_ID] = "entity_not_found"
                 
             # 验证空调实体不是虚拟空调实体，避免递归
-            if user_input[CONF_AC_ENTITY_ID].startswith(f"{DOMAIN}."):
+            if any(ac_entity_id.startswith(f"{DOMAIN}.") for ac_entity_id in ac_entity_ids):
                 errors[CONF_AC_ENTITY_ID] = "cannot_use_virtual_climate"
 
             if not errors:
                 # 检查这种配置是否已存在
                 await self.async_set_unique_id(
-                    f"{user_input[CONF_AC_ENTITY_ID]}_{user_input[CONF_TEMP_ENTITY_ID]}"
+                    f"{','.join(ac_entity_ids)}_{','.join(temp_entity_ids)}"
                 )
                 self._abort_if_unique_id_configured()
                 
                 # 创建条目
+                names = ", ".join(ac_entity_id.split(".")[-1] for ac_entity_id in ac_entity_ids)
                 return self.async_create_entry(
-                    title=f"{DEFAULT_NAME}: {user_input[CONF_AC_ENTITY_ID].split('.')[-1]}",
+                    title=f"{DEFAULT_NAME}: {names}",
                     data=user_input,
                 )
 
@@ -60,10 +118,10 @@ class HonghuiAirConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             data_schema=vol.Schema(
                 {
                     vol.Required(CONF_AC_ENTITY_ID): EntitySelector(
-                        EntitySelectorConfig(domain=Platform.CLIMATE)
+                        EntitySelectorConfig(domain=Platform.CLIMATE, multiple=True)
                     ),
                     vol.Required(CONF_TEMP_ENTITY_ID): EntitySelector(
-                        EntitySelectorConfig(domain=Platform.SENSOR)
+                        EntitySelectorConfig(domain=Platform.SENSOR, multiple=True)
                     ),
                 }
             ),
@@ -91,27 +149,40 @@ class HonghuiAirOptionsFlow(config_entries.OptionsFlow):
         errors = {}
 
         if user_input is not None:
-            # 验证选择的实体是否存在
-            if not self.hass.states.get(user_input[CONF_AC_ENTITY_ID]):
+            # 验证选择的实体是否存在，可以选择多台空调组成一组
+            ac_entity_ids = entity_id_list(user_input[CONF_AC_ENTITY_ID])
+            if not ac_entity_ids or not all(
+                self.hass.states.get(ac_entity_id) for ac_entity_id in ac_entity_ids
+            ):
                 errors[CONF_AC_ENTITY_ID] = "entity_not_found"
-            if not self.hass.states.get(user_input[CONF_TEMP_ENTITY_ID]):
+            temp_entity_ids = entity_id_list(user_input[CONF_TEMP_ENTITY_ID])
+            if not temp_entity_ids or not all(
+                self.hass.states.get(temp_entity_id) for temp_entity_id in temp_entity_ids
+            ):
                 errors[CONF_TEMP_ENTITY_ID] = "entity_not_found"
                 
             # 验证空调实体不是虚拟空调实体，避免递归
-            if user_input[CONF_AC_ENTITY_ID].startswith(f"{DOMAIN}."):
+            if any(ac_entity_id.startswith(f"{DOMAIN}.") for ac_entity_id in ac_entity_ids):
                 errors[CONF_AC_ENTITY_ID] = "cannot_use_virtual_climate"
 
             if not errors:
-                # 更新条目数据
+                # 源实体保存在条目数据中，其余为选项；一次更新两者，update_listener
+                # 只调用一次，之后创建的选项与条目中的相同，不会再次触发
                 data = {**self.config_entry.data}
-                data.update(user_input)
+                data.update({key: user_input[key] for key in SOURCE_KEYS})
+                options = {
+                    key: value
+                    for key, value in user_input.items()
+                    if key not in SOURCE_KEYS
+                }
                 self.hass.config_entries.async_update_entry(
-                    self.config_entry, data=data
+                    self.config_entry, data=data, options=options
                 )
-                return self.async_create_entry(title="", data={})
+                return self.async_create_entry(title="", data=options)
 
         # 获取现有配置
         data = {**self.config_entry.data}
+        options = {**self.config_entry.options}
 
         # 创建选项表单
         return self.async_show_form(
@@ -119,11 +190,219 @@ class HonghuiAirOptionsFlow(config_entries.OptionsFlow):
             data_schema=vol.Schema(
                 {
                     vol.Required(
-                        CONF_AC_ENTITY_ID, default=data.get(CONF_AC_ENTITY_ID)
-                    ): EntitySelector(EntitySelectorConfig(domain=Platform.CLIMATE)),
+                        CONF_AC_ENTITY_ID,
+                        default=entity_id_list(data.get(CONF_AC_ENTITY_ID)),
+                    ): EntitySelector(
+                        EntitySelectorConfig(domain=Platform.CLIMATE, multiple=True)
+                    ),
                     vol.Required(
-                        CONF_TEMP_ENTITY_ID, default=data.get(CONF_TEMP_ENTITY_ID)
-                    ): EntitySelector(EntitySelectorConfig(domain=Platform.SENSOR)),
+                        CONF_TEMP_ENTITY_ID,
+                        default=entity_id_list(data.get(CONF_TEMP_ENTITY_ID)),
+                    ): EntitySelector(
+                        EntitySelectorConfig(domain=Platform.SENSOR, multiple=True)
+                    ),
+                    vol.Optional(
+                        CONF_SOURCE_TIMEOUT,
+                        default=options.get(CONF_SOURCE_TIMEOUT, DEFAULT_SOURCE_TIMEOUT),
+                    ): NumberSelector(
+                        NumberSelectorConfig(
+                            min=0,
+                            max=3600,
+                            step=1,
+                            unit_of_measurement="s",
+                            mode=NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_UPDATE_WINDOW,
+                        default=options.get(CONF_UPDATE_WINDOW, DEFAULT_UPDATE_WINDOW),
+                    ): NumberSelector(
+                        NumberSelectorConfig(
+                            min=0,
+                            max=5,
+                            step=0.05,
+                            unit_of_measurement="s",
+                            mode=NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_TEMP_DEADBAND,
+                        default=options.get(CONF_TEMP_DEADBAND, DEFAULT_TEMP_DEADBAND),
+                    ): NumberSelector(
+                        NumberSelectorConfig(
+                            min=0,
+                            max=2,
+                            step=0.01,
+                            unit_of_measurement="°C",
+                            mode=NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_TEMP_MIN_INTERVAL,
+                        default=options.get(CONF_TEMP_MIN_INTERVAL, DEFAULT_TEMP_MIN_INTERVAL),
+                    ): NumberSelector(
+                        NumberSelectorConfig(
+                            min=0,
+                            max=3600,
+                            step=1,
+                            unit_of_measurement="s",
+                            mode=NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_TEMP_SMOOTHING,
+                        default=options.get(CONF_TEMP_SMOOTHING, DEFAULT_TEMP_SMOOTHING),
+                    ): SelectSelector(
+                        SelectSelectorConfig(
+                            options=SMOOTHING_MODES,
+                            mode=SelectSelectorMode.DROPDOWN,
+                            translation_key=CONF_TEMP_SMOOTHING,
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_TEMP_EMA_ALPHA,
+                        default=options.get(CONF_TEMP_EMA_ALPHA, DEFAULT_TEMP_EMA_ALPHA),
+                    ): NumberSelector(
+                        NumberSelectorConfig(
+                            min=0.01,
+                            max=1,
+                            step=0.01,
+                            mode=NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_TEMP_AGGREGATION,
+                        default=options.get(CONF_TEMP_AGGREGATION, DEFAULT_TEMP_AGGREGATION),
+                    ): SelectSelector(
+                        SelectSelectorConfig(
+                            options=AGGREGATION_METHODS,
+                            mode=SelectSelectorMode.DROPDOWN,
+                            translation_key=CONF_TEMP_AGGREGATION,
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_TEMP_STALE_AFTER,
+                        default=options.get(CONF_TEMP_STALE_AFTER, DEFAULT_TEMP_STALE_AFTER),
+                    ): NumberSelector(
+                        NumberSelectorConfig(
+                            min=0,
+                            max=86400,
+                            step=1,
+                            unit_of_measurement="s",
+                            mode=NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_COMMAND_TIMEOUT,
+                        default=options.get(CONF_COMMAND_TIMEOUT, DEFAULT_COMMAND_TIMEOUT),
+                    ): NumberSelector(
+                        NumberSelectorConfig(
+                            min=1,
+                            max=120,
+                            step=1,
+                            unit_of_measurement="s",
+                            mode=NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_GROUP_MAX_PARALLEL,
+                        default=options.get(CONF_GROUP_MAX_PARALLEL, DEFAULT_GROUP_MAX_PARALLEL),
+                    ): NumberSelector(
+                        NumberSelectorConfig(
+                            min=1,
+                            max=16,
+                            step=1,
+                            mode=NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_GATEWAY,
+                        default=options.get(CONF_GATEWAY, DEFAULT_GATEWAY),
+                    ): SelectSelector(
+                        SelectSelectorConfig(
+                            options=GATEWAY_MODES,
+                            mode=SelectSelectorMode.DROPDOWN,
+                            custom_value=True,
+                            translation_key=CONF_GATEWAY,
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_GATEWAY_SPACING,
+                        default=options.get(CONF_GATEWAY_SPACING, DEFAULT_GATEWAY_SPACING),
+                    ): NumberSelector(
+                        NumberSelectorConfig(
+                            min=0,
+                            max=30,
+                            step=0.1,
+                            unit_of_measurement="s",
+                            mode=NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_COMPENSATION,
+                        default=options.get(CONF_COMPENSATION, DEFAULT_COMPENSATION),
+                    ): BooleanSelector(),
+                    vol.Optional(
+                        CONF_COMPENSATION_MAX_OFFSET,
+                        default=options.get(
+                            CONF_COMPENSATION_MAX_OFFSET, DEFAULT_COMPENSATION_MAX_OFFSET
+                        ),
+                    ): NumberSelector(
+                        NumberSelectorConfig(
+                            min=0.5,
+                            max=10,
+                            step=0.5,
+                            unit_of_measurement="°C",
+                            mode=NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_COMPENSATION_MIN_INTERVAL,
+                        default=options.get(
+                            CONF_COMPENSATION_MIN_INTERVAL, DEFAULT_COMPENSATION_MIN_INTERVAL
+                        ),
+                    ): NumberSelector(
+                        NumberSelectorConfig(
+                            min=60,
+                            max=7200,
+                            step=60,
+                            unit_of_measurement="s",
+                            mode=NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_COMPENSATION_MAX_PER_HOUR,
+                        default=options.get(
+                            CONF_COMPENSATION_MAX_PER_HOUR, DEFAULT_COMPENSATION_MAX_PER_HOUR
+                        ),
+                    ): NumberSelector(
+                        NumberSelectorConfig(
+                            min=1,
+                            max=60,
+                            step=1,
+                            mode=NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_OPTIMISTIC,
+                        default=options.get(CONF_OPTIMISTIC, DEFAULT_OPTIMISTIC),
+                    ): BooleanSelector(),
+                    vol.Optional(
+                        CONF_OPTIMISTIC_TIMEOUT,
+                        default=options.get(CONF_OPTIMISTIC_TIMEOUT, DEFAULT_OPTIMISTIC_TIMEOUT),
+                    ): NumberSelector(
+                        NumberSelectorConfig(
+                            min=1,
+                            max=120,
+                            step=1,
+                            unit_of_measurement="s",
+                            mode=NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_ENABLE_METRICS,
+                        default=options.get(CONF_ENABLE_METRICS, DEFAULT_ENABLE_METRICS),
+                    ): BooleanSelector(),
                 }
             ),
             errors=errors,
@@ -0,0 +1,132 @@
+"""HongHui Climate 出站命令的状态确认."""
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from homeassistant.core import Context, Event, HomeAssistant, State, callback
+from homeassistant.exceptions import HomeAssistantError
+
+
+@dataclass
+class _Expectation:
+    """等待确认的一个命令."""
+
+    context_id: str
+    predicate: Callable[[State], bool] | None
+    future: asyncio.Future[State]
+    # 按状态值确认时只接受这个源空调的状态
+    entity_id: str | None = None
+
+
+class ConfirmationTracker:
+    """等待源空调对非阻塞命令的确认.
+
+    每个命令使用自己的 Context 发出，源空调写入的状态带有同一个 Context（或以它为父
+    Context）时确认；不传递 Context 的源集成则通过 predicate 按状态值确认。多个命令
+    可以同时等待，每个命令一个 future。
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """初始化确认跟踪."""
+        self.hass = hass
+        self._expectations: dict[str, _Expectation] = {}
+        # 统计数据
+        self.confirmed_by_context = 0
+        self.confirmed_by_state = 0
+
+    def __len__(self) -> int:
+        """等待确认的命令数量."""
+        return len(self._expectations)
+
+    @callback
+    def async_expect(
+        self,
+        context: Context,
+        predicate: Callable[[State], bool] | None = None,
+        entity_id: str | None = None,
+    ) -> asyncio.Future[State]:
+        """登记一个命令，返回收到确认状态时完成的 future."""
+        future: asyncio.Future[State] = self.hass.loop.create_future()
+        self._expectations[context.id] = _Expectation(
+            context.id, predicate, future, entity_id
+        )
+        return future
+
+    @callback
+    def async_discard(self, context: Context) -> None:
+        """不再等待一个命令（已确认、超时或被取消）."""
+        if (expectation := self._expectations.pop(context.id, None)) is not None:
+            if not expectation.future.done():
+                expectation.future.cancel()
+
+    @callback
+    def async_process(self, event: Event) -> None:
+        """用源空调的状态变化事件确认等待中的命令."""
+        if not self._expectations:
+            return
+        if (new_state := event.data.get("new_state")) is None:
+            return
+        context = event.context
+        entity_id = event.data["entity_id"]
+        for context_id, expectation in list(self._expectations.items()):
+            if context_id in (context.id, context.parent_id):
+                self.confirmed_by_context += 1
+            elif (
+                expectation.predicate is not None
+                and expectation.entity_id in (None, entity_id)
+                and expectation.predicate(new_state)
+            ):
+                self.confirmed_by_state += 1
+            else:
+                continue
+            del self._expectations[context_id]
+            if not expectation.future.done():
+                expectation.future.set_result(new_state)
+
+    @callback
+    def async_cancel(self) -> None:
+        """取消所有等待中的命令."""
+        expectations, self._expectations = self._expectations, {}
+        for expectation in expectations.values():
+            if not expectation.future.done():
+                expectation.future.set_exception(
+                    HomeAssistantError("虚拟空调已移除，命令未确认")
+                )
+
+
+class OutboundContexts:
+    """最近发出的命令 Context，数量有上限，按最久未使用的顺序淘汰.
+
+    源空调带着这些 Context（或以它们为父 Context）写入的状态是本实体命令的回声。
+    """
+
+    def __init__(self, max_size: int) -> None:
+        """初始化."""
+        self._max_size = max_size
+        self._contexts: OrderedDict[str, None] = OrderedDict()
+        # 统计数据
+        self.hits = 0
+
+    def __len__(self) -> int:
+        """记住的 Context 数量."""
+        return len(self._contexts)
+
+    def __contains__(self, context: Context) -> bool:
+        """Context 是否来自（或派生自）本实体发出的命令."""
+        for context_id in (context.id, context.parent_id):
+            if context_id is not None and context_id in self._contexts:
+                self._contexts.move_to_end(context_id)
+                self.hits += 1
+                return True
+        return False
+
+    @callback
+    def async_add(self, context: Context) -> None:
+        """记录一个发出的命令 Context."""
+        self._contexts[context.id] = None
+        self._contexts.move_to_end(context.id)
+        while len(self._contexts) > self._max_size:
+            self._contexts.popitem(last=False)
@@ -6,5 +6,107 @@ DOMAIN = "honghui_climate"
 CONF_AC_ENTITY_ID = "ac_entity_id"
 CONF_TEMP_ENTITY_ID = "temp_entity_id"
 
+# 高级选项
+CONF_SOURCE_TIMEOUT = "source_timeout"
+CONF_UPDATE_WINDOW = "update_window"
+CONF_TEMP_DEADBAND = "temp_deadband"
+CONF_TEMP_MIN_INTERVAL = "temp_min_interval"
+CONF_TEMP_SMOOTHING = "temp_smoothing"
+CONF_TEMP_EMA_ALPHA = "temp_ema_alpha"
+CONF_TEMP_AGGREGATION = "temp_aggregation"
+CONF_TEMP_STALE_AFTER = "temp_stale_after"
+CONF_ENABLE_METRICS = "enable_metrics"
+CONF_OPTIMISTIC = "optimistic"
+CONF_OPTIMISTIC_TIMEOUT = "optimistic_timeout"
+CONF_COMMAND_TIMEOUT = "command_timeout"
+CONF_GROUP_MAX_PARALLEL = "group_max_parallel"
+CONF_COMPENSATION = "compensation"
+CONF_COMPENSATION_MAX_OFFSET = "compensation_max_offset"
+CONF_COMPENSATION_MIN_INTERVAL = "compensation_min_interval"
+CONF_COMPENSATION_MAX_PER_HOUR = "compensation_max_per_hour"
+CONF_GATEWAY = "gateway"
+CONF_GATEWAY_SPACING = "gateway_spacing"
+
+# configuration.yaml 中的集成级配置
+CONF_SERVICE_RATE = "service_rate"
+CONF_SERVICE_BURST = "service_burst"
+
+# 温度平滑方式
+SMOOTHING_NONE = "none"
+SMOOTHING_EMA = "ema"
+SMOOTHING_MEDIAN = "median"
+SMOOTHING_MODES = [SMOOTHING_NONE, SMOOTHING_EMA, SMOOTHING_MEDIAN]
+
+# 网关组：none 不串行发送，auto 按源集成自动分组，其他值为用户命名的网关组
+GATEWAY_NONE = "none"
+GATEWAY_AUTO = "auto"
+GATEWAY_MODES = [GATEWAY_NONE, GATEWAY_AUTO]
+
+# 多温度传感器聚合方式
+AGGREGATION_MEAN = "mean"
+AGGREGATION_MEDIAN = "median"
+AGGREGATION_MIN = "min"
+AGGREGATION_MAX = "max"
+AGGREGATION_METHODS = [AGGREGATION_MEAN, AGGREGATION_MEDIAN, AGGREGATION_MIN, AGGREGATION_MAX]
+
+# hass.data[DOMAIN] 中的集成级数据
+DATA_DISPATCHER = "dispatcher"
+DATA_LIMITER = "limiter"
+DATA_GATEWAYS = "gateways"
+
+# hass.data[DOMAIN][entry_id] 中的条目级数据
+DATA_METRICS = "metrics"
+DATA_ENTITY = "entity"
+DATA_OPTIONS = "options"
+
+# 事件
+EVENT_OPTIMISTIC_ROLLBACK = f"{DOMAIN}_optimistic_rollback"
+
+# 状态属性
+ATTR_TEMP_UPDATES_SUPPRESSED = "temperature_updates_suppressed"
+ATTR_RESTORED = "restored"
+ATTR_UNITS = "units"
+ATTR_SOURCE_TEMPERATURE = "source_temperature"
+ATTR_TEMPERATURE_TREND = "temperature_trend"
+ATTR_TIME_TO_TARGET = "time_to_target"
+
 # 默认值
-DEFAULT_NAME = "洪绘空调" 
\ No newline at end of file
+DEFAULT_NAME = "洪绘空调"
+DEFAULT_SOURCE_TIMEOUT = 0  # 等待源实体的整体期限（秒），0 表示一直等待
+DEFAULT_UPDATE_WINDOW = 0.2  # 合并源事件的窗口（秒），即状态更新的最大延迟
+DEFAULT_TEMP_DEADBAND = 0.0  # 温度变化小于该值时不更新（°C）
+DEFAULT_TEMP_MIN_INTERVAL = 0  # 两次温度更新的最小间隔（秒）
+DEFAULT_TEMP_SMOOTHING = SMOOTHING_NONE
+DEFAULT_TEMP_EMA_ALPHA = 0.3
+DEFAULT_TEMP_AGGREGATION = AGGREGATION_MEAN
+DEFAULT_TEMP_STALE_AFTER = 0  # 传感器超过该时间（秒）未上报则不参与聚合，0 表示不检查
+DEFAULT_ENABLE_METRICS = False
+DEFAULT_OPTIMISTIC = False
+DEFAULT_OPTIMISTIC_TIMEOUT = 10  # 乐观值等待源空调确认的时间（秒）
+DEFAULT_COMMAND_TIMEOUT = 10  # 每个命令等待源空调上报状态的期限（秒）
+DEFAULT_GROUP_MAX_PARALLEL = 3  # 绑定多台源空调时同时发送命令的空调数量
+DEFAULT_COMPENSATION = False
+DEFAULT_COMPENSATION_MAX_OFFSET = 3.0  # 设定温度相对目标温度的最大补偿量（°C）
+DEFAULT_COMPENSATION_MIN_INTERVAL = 600  # 两次补偿命令的最小间隔（秒）
+DEFAULT_COMPENSATION_MAX_PER_HOUR = 4  # 每小时最多发送的设定温度命令数
+DEFAULT_GATEWAY = GATEWAY_NONE
+DEFAULT_GATEWAY_SPACING = 1.0  # 同一网关组两次命令之间的间隔（秒）
+
+# 闭环补偿的比例增益和积分时间（秒）
+COMPENSATION_GAIN = 0.5
+COMPENSATION_INTEGRAL_TIME = 3600
+
+# 每个虚拟空调记住的最近发出的命令 Context 数量，用于识别回声和递归
+OUTBOUND_CONTEXT_CACHE_SIZE = 32
+
+# 每个虚拟空调保存的样本数量、样本的最小间隔（秒）和计算趋势的时间窗口（秒）
+HISTORY_CAPACITY = 128
+HISTORY_RESOLUTION = 60
+HISTORY_TREND_WINDOW = 1800
+
+# 诊断指标传感器的刷新间隔（秒）
+METRICS_UPDATE_INTERVAL = 30
+
+# 服务调用限流：每个虚拟空调每秒补充的令牌数和令牌桶容量
+DEFAULT_SERVICE_RATE = 1.0
+DEFAULT_SERVICE_BURST = 3
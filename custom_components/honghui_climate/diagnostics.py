@@ -0,0 +1,56 @@
+"""HongHui Climate 诊断信息."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import (
+    CONF_AC_ENTITY_ID,
+    CONF_TEMP_ENTITY_ID,
+    DATA_ENTITY,
+    DATA_METRICS,
+    DOMAIN,
+)
+from .helpers import entity_id_list
+
+
+def _source_state(hass: HomeAssistant, entity_id: str) -> dict[str, Any] | None:
+    """源实体当前的状态."""
+    if (state := hass.states.get(entity_id)) is None:
+        return None
+    return {
+        "state": state.state,
+        "attributes": dict(state.attributes),
+        "last_changed": state.last_changed.isoformat(),
+        "last_updated": state.last_updated.isoformat(),
+    }
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """配置条目的诊断信息."""
+    entry_data = hass.data.get(DOMAIN, {}).get(entry.entry_id, {})
+    source_entity_ids = [
+        *entity_id_list(entry.data.get(CONF_AC_ENTITY_ID)),
+        *entity_id_list(entry.data.get(CONF_TEMP_ENTITY_ID)),
+    ]
+    # 条目未加载或配置缺少源实体时没有实体
+    entity = entry_data.get(DATA_ENTITY)
+    metrics = entry_data.get(DATA_METRICS)
+    return {
+        "entry": {
+            "data": dict(entry.data),
+            "options": dict(entry.options),
+        },
+        "sources": {
+            entity_id: _source_state(hass, entity_id)
+            for entity_id in source_entity_ids
+            if entity_id
+        },
+        "entity": entity.diagnostics() if entity is not None else None,
+        "metrics": metrics.as_dict() if metrics is not None else None,
+        "recent": metrics.recent_as_list() if metrics is not None else None,
+    }
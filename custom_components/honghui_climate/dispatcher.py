@@ -0,0 +1,88 @@
+"""HongHui Climate 源实体状态变化分发."""
+from __future__ import annotations
+
+from collections.abc import Callable
+import logging
+
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_state_change_event
+
+from .const import DATA_DISPATCHER, DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class SourceDispatcher:
+    """所有虚拟空调共享的源实体状态变化分发器.
+
+    每个不同的源实体只有一个状态订阅，并维护源实体ID到依赖它的虚拟空调的索引，
+    一个事件只分发给依赖它的监听器。添加和移除监听器都是 O(1)。
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """初始化分发器."""
+        self.hass = hass
+        self._listeners: dict[str, dict[object, Callable[[Event], None]]] = {}
+        self._unsubs: dict[str, CALLBACK_TYPE] = {}
+
+    @property
+    def sources(self) -> dict[str, int]:
+        """当前订阅的源实体及其监听器数量."""
+        return {
+            entity_id: len(listeners)
+            for entity_id, listeners in self._listeners.items()
+        }
+
+    @callback
+    def async_subscribe(
+        self, entity_id: str, listener: Callable[[Event], None]
+    ) -> CALLBACK_TYPE:
+        """订阅一个源实体的状态变化，返回取消订阅的回调."""
+        token = object()
+        if (listeners := self._listeners.get(entity_id)) is None:
+            listeners = self._listeners[entity_id] = {}
+            self._unsubs[entity_id] = async_track_state_change_event(
+                self.hass, [entity_id], self._async_dispatch
+            )
+        listeners[token] = listener
+
+        @callback
+        def _async_unsubscribe() -> None:
+            """取消订阅，最后一个监听器移除时释放状态订阅."""
+            listeners = self._listeners.get(entity_id)
+            if listeners is None or listeners.pop(token, None) is None:
+                return
+            if not listeners:
+                del self._listeners[entity_id]
+                self._unsubs.pop(entity_id)()
+
+        return _async_unsubscribe
+
+    @callback
+    def _async_dispatch(self, event: Event) -> None:
+        """把事件分发给依赖该源实体的所有监听器."""
+        listeners = self._listeners.get(event.data["entity_id"])
+        if not listeners:
+            return
+        for listener in list(listeners.values()):
+            try:
+                listener(event)
+            except Exception:  # noqa: BLE001
+                _LOGGER.exception("处理源实体 %s 状态变化时出错", event.data["entity_id"])
+
+    @callback
+    def async_shutdown(self) -> None:
+        """释放所有状态订阅."""
+        for unsub in self._unsubs.values():
+            unsub()
+        self._unsubs.clear()
+        self._listeners.clear()
+
+
+@callback
+def async_get_dispatcher(hass: HomeAssistant) -> SourceDispatcher:
+    """获取（必要时创建）集成共享的分发器."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if (dispatcher := domain_data.get(DATA_DISPATCHER)) is None:
+        dispatcher = domain_data[DATA_DISPATCHER] = SourceDispatcher(hass)
+    return dispatcher
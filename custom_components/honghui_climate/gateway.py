@@ -0,0 +1,265 @@
+"""HongHui Climate 按网关串行发送源空调命令."""
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+import logging
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+
+from .const import DATA_GATEWAYS, DOMAIN, GATEWAY_AUTO, GATEWAY_NONE
+from .metrics import LatencyHistogram
+
+_LOGGER = logging.getLogger(__name__)
+
+Send = Callable[[dict[str, Any]], Awaitable[None]]
+
+
+@callback
+def async_resolve_gateway(hass: HomeAssistant, entity_id: str, setting: str | None) -> str | None:
+    """源空调所属的网关组，不需要串行发送时返回 None.
+
+    setting 为 auto 时按源集成自动分组：挂在同一个设备（红外发射器、网关）下的
+    设备为一组，否则同一个集成条目（例如同一个云账号）的实体为一组。其他值是
+    用户命名的网关组。
+    """
+    if not setting or setting == GATEWAY_NONE:
+        return None
+    if setting != GATEWAY_AUTO:
+        return setting
+    if (entry := er.async_get(hass).async_get(entity_id)) is None:
+        return None
+    if (
+        entry.device_id is not None
+        and (device := dr.async_get(hass).async_get(entry.device_id)) is not None
+        and device.via_device_id is not None
+    ):
+        return f"device:{device.via_device_id}"
+    if entry.config_entry_id is not None:
+        return f"entry:{entry.config_entry_id}"
+    return None
+
+
+@dataclass
+class _QueuedCommand:
+    """网关队列中等待发送的命令."""
+
+    data: dict[str, Any]
+    send: Send
+    spacing: float
+    enqueued: float
+    waiters: list[asyncio.Future[bool]] = field(default_factory=list)
+
+
+class GatewayQueue:
+    """一个网关的串行命令队列.
+
+    命令按提交顺序逐个发送，每个命令发送后至少间隔它的 spacing 秒再发送下一个。
+    同一源空调的同一服务尚未发送时，新的命令与它合并并保留原来的排队位置：新命令
+    包含旧命令的所有字段时整体取代它；否则合并两个命令的数据（相同字段以新的值为
+    准），旧命令独有的字段随新命令一起发送。两种情况下命令都以新调用方的 Context
+    发送，由新调用方负责确认，旧的调用方立即得知它的命令已被更新的命令取代。
+    队列清空且最后一个命令的间隔结束后，发送任务退出并调用 on_idle。
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        name: str,
+        on_idle: Callable[[GatewayQueue], None] | None = None,
+    ) -> None:
+        """初始化网关队列."""
+        self.hass = hass
+        self.name = name
+        self._on_idle = on_idle
+        self._queue: OrderedDict[tuple[str, str], _QueuedCommand] = OrderedDict()
+        self._worker: asyncio.Task | None = None
+        self._in_flight: tuple[str, str] | None = None
+        self._next_send = 0.0
+        # 统计数据
+        self.submitted = 0
+        self.merged = 0
+        self.sent = 0
+        self.failed = 0
+        self.max_depth = 0
+        self.wait_time = LatencyHistogram()
+
+    def __len__(self) -> int:
+        """等待发送的命令数量."""
+        return len(self._queue)
+
+    async def async_send(
+        self,
+        entity_id: str,
+        service: str,
+        data: dict[str, Any],
+        send: Send,
+        spacing: float,
+    ) -> bool:
+        """排队发送命令，返回 True 表示已发送，False 表示被之后提交的命令取代（或合并）."""
+        key = (entity_id, service)
+        future: asyncio.Future[bool] = self.hass.loop.create_future()
+        self.submitted += 1
+
+        if (queued := self._queue.get(key)) is not None:
+            self.merged += 1
+            _LOGGER.debug("网关 %s 合并尚未发送的命令: %s %s", self.name, entity_id, service)
+            for waiter in queued.waiters:
+                if not waiter.done():
+                    waiter.set_result(False)
+            if queued.data.keys() <= data.keys():
+                # 新命令覆盖旧命令的所有字段
+                queued.data = dict(data)
+            else:
+                # 旧命令还有新命令没有的字段（例如开机时一起设置的模式），保留它们
+                queued.data = {**queued.data, **data}
+            queued.waiters = [future]
+            queued.send = send
+            queued.spacing = spacing
+        else:
+            self._queue[key] = _QueuedCommand(
+                dict(data), send, spacing, self.hass.loop.time(), [future]
+            )
+            self.max_depth = max(self.max_depth, len(self._queue))
+
+        if self._worker is None:
+            self._worker = self.hass.async_create_background_task(
+                self._async_run(), f"honghui_climate gateway {self.name}"
+            )
+        try:
+            return await future
+        except asyncio.CancelledError:
+            # 调用方已放弃，没有其他等待者时不再发送
+            if (queued := self._queue.get(key)) is not None and all(
+                waiter.done() for waiter in queued.waiters
+            ):
+                del self._queue[key]
+            raise
+
+    async def _async_run(self) -> None:
+        """按间隔依次发送队列中的命令."""
+        loop = self.hass.loop
+        try:
+            while True:
+                # 队列清空后也等到间隔结束再退出，之后新建的队列不会过早发送
+                if (delay := self._next_send - loop.time()) > 0:
+                    await asyncio.sleep(delay)
+                if not self._queue:
+                    break
+                key, command = self._queue.popitem(last=False)
+                self.wait_time.observe(loop.time() - command.enqueued)
+                self._in_flight = key
+                try:
+                    await command.send(command.data)
+                except asyncio.CancelledError:
+                    for waiter in command.waiters:
+                        if not waiter.done():
+                            waiter.set_exception(HomeAssistantError("网关队列已停止，命令未确认"))
+                    raise
+                except Exception as err:  # noqa: BLE001
+                    self.failed += 1
+                    for waiter in command.waiters:
+                        if not waiter.done():
+                            waiter.set_exception(err)
+                else:
+                    self.sent += 1
+                    for waiter in command.waiters:
+                        if not waiter.done():
+                            waiter.set_result(True)
+                finally:
+                    self._in_flight = None
+                    self._next_send = loop.time() + command.spacing
+        finally:
+            self._worker = None
+            if not self._queue and self._on_idle is not None:
+                self._on_idle(self)
+
+    @callback
+    def async_shutdown(self) -> None:
+        """停止队列，通知所有等待者."""
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        queue, self._queue = self._queue, OrderedDict()
+        for command in queue.values():
+            for waiter in command.waiters:
+                if not waiter.done():
+                    waiter.set_exception(HomeAssistantError("网关队列已停止，命令未发送"))
+
+    @callback
+    def diagnostics(self) -> dict[str, Any]:
+        """诊断信息."""
+        return {
+            "depth": len(self._queue),
+            "max_depth": self.max_depth,
+            "pending": [f"{entity_id} {service}" for entity_id, service in self._queue],
+            "in_flight": (
+                None if self._in_flight is None else " ".join(self._in_flight)
+            ),
+            "submitted": self.submitted,
+            "merged": self.merged,
+            "sent": self.sent,
+            "failed": self.failed,
+            "wait_time": self.wait_time.as_dict(),
+        }
+
+
+class GatewayScheduler:
+    """所有虚拟空调共享的网关队列，同一网关组的命令不论来自哪个虚拟空调都串行发送."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """初始化调度器."""
+        self.hass = hass
+        self._queues: dict[str, GatewayQueue] = {}
+
+    async def async_send(
+        self,
+        gateway: str,
+        entity_id: str,
+        service: str,
+        data: dict[str, Any],
+        send: Send,
+        spacing: float,
+    ) -> bool:
+        """通过网关组的队列发送命令."""
+        if (queue := self._queues.get(gateway)) is None:
+            queue = self._queues[gateway] = GatewayQueue(
+                self.hass, gateway, self._async_queue_idle
+            )
+        return await queue.async_send(entity_id, service, data, send, spacing)
+
+    @callback
+    def _async_queue_idle(self, queue: GatewayQueue) -> None:
+        """空闲的网关队列不再保留."""
+        if self._queues.get(queue.name) is queue:
+            del self._queues[queue.name]
+
+    @callback
+    def diagnostics(self, gateways: list[str] | None = None) -> dict[str, Any]:
+        """网关队列的诊断信息，可以只导出指定的网关组."""
+        return {
+            name: queue.diagnostics()
+            for name, queue in self._queues.items()
+            if gateways is None or name in gateways
+        }
+
+    @callback
+    def async_shutdown(self) -> None:
+        """停止所有队列."""
+        for queue in self._queues.values():
+            queue.async_shutdown()
+        self._queues.clear()
+
+
+@callback
+def async_get_gateways(hass: HomeAssistant) -> GatewayScheduler:
+    """获取（必要时创建）集成共享的网关调度器."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if (gateways := domain_data.get(DATA_GATEWAYS)) is None:
+        gateways = domain_data[DATA_GATEWAYS] = GatewayScheduler(hass)
+    return gateways
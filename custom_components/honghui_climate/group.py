@@ -0,0 +1,281 @@
+"""HongHui Climate 多台源空调的分组."""
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from collections.abc import Awaitable, Callable
+import logging
+from typing import Any, Final
+
+from homeassistant.components.climate import HVACMode
+from homeassistant.const import ATTR_TEMPERATURE, STATE_UNAVAILABLE, STATE_UNKNOWN
+from homeassistant.core import HomeAssistant, State, callback
+
+_LOGGER = logging.getLogger(__name__)
+
+# 虚拟空调从源空调投射的属性
+PROJECTED_AC_ATTRIBUTES: Final = (
+    "hvac_modes",
+    "fan_modes",
+    "fan_mode",
+    "swing_modes",
+    "swing_mode",
+    ATTR_TEMPERATURE,
+    "target_temp_high",
+    "target_temp_low",
+    "max_temp",
+    "min_temp",
+    "target_temp_step",
+)
+
+# 各台空调可以不一致的设定值
+_SETPOINT_ATTRIBUTES: Final = (
+    ATTR_TEMPERATURE,
+    "target_temp_high",
+    "target_temp_low",
+    "fan_mode",
+    "swing_mode",
+)
+
+# 各台空调模式不一致时，用于规划命令的合并状态
+STATE_MIXED: Final = "mixed"
+
+# 单台空调命令的结果
+RESULT_OK: Final = "ok"
+RESULT_TIMEOUT: Final = "timeout"
+RESULT_UNAVAILABLE: Final = "unavailable"
+# 源空调已经处于目标状态，没有发送命令
+RESULT_UNCHANGED: Final = "unchanged"
+# 命令在网关队列中被之后提交的命令取代，没有发送
+RESULT_SUPERSEDED: Final = "superseded"
+
+_MISSING = object()
+
+
+def source_fingerprint(state: State | None) -> tuple | None:
+    """源空调中被投射字段的紧凑指纹，不复制任何列表."""
+    if state is None:
+        return None
+    attributes = state.attributes
+    return (state.state, *(attributes.get(attr) for attr in PROJECTED_AC_ATTRIBUTES))
+
+
+def _available(state: State | None) -> bool:
+    """源空调是否可用."""
+    return state is not None and state.state not in (STATE_UNAVAILABLE, STATE_UNKNOWN)
+
+
+def _shared(values: list[Any]) -> Any:
+    """所有值相同时返回该值，否则返回 _MISSING."""
+    first = values[0]
+    return first if all(value == first for value in values[1:]) else _MISSING
+
+
+def _common_modes(states: list[State], attribute: str) -> list[str] | None:
+    """所有空调都支持的模式，保持第一台空调的顺序."""
+    lists = [state.attributes.get(attribute) for state in states]
+    if any(modes is None for modes in lists):
+        return None
+    return [mode for mode in lists[0] if all(mode in modes for modes in lists[1:])]
+
+
+def _limit(states: list[State], attribute: str, pick: Callable[..., Any]) -> Any:
+    """对所有空调都上报的数值属性取 pick（min/max）."""
+    values = [state.attributes.get(attribute) for state in states]
+    if any(value is None for value in values):
+        return None
+    return pick(values)
+
+
+class SourceGroup:
+    """一台虚拟空调绑定的一台或多台源空调.
+
+    单台空调时直接使用它的状态。多台空调时按各自被投射字段的指纹增量合并：
+    只有某台空调的指纹变化时才重新合并，合并结果被缓存。模式一致时使用共同的
+    模式，不一致时显示多数运行模式，并在 ``units`` 中给出每台空调的详情。
+    命令以有限的并发发送给每台可用的空调，并记录每台空调的结果。
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entity_ids: list[str],
+        max_parallel: int,
+    ) -> None:
+        """初始化空调分组."""
+        self.hass = hass
+        self.entity_ids = list(entity_ids)
+        self._max_parallel = max_parallel
+        self._semaphore = asyncio.Semaphore(max_parallel)
+        # 上次合并时和最近一次事件中每台空调的指纹
+        self._fingerprints: dict[str, tuple | None] = {}
+        self._seen: dict[str, tuple | None] = {}
+        self._state: State | None = None
+        self._command_state: State | None = None
+        self._units: list[dict[str, Any]] | None = None
+        # 每台空调最近一次命令的结果
+        self.last_results: dict[str, str] = {}
+        # 统计数据
+        self.merges = 0
+
+    def __len__(self) -> int:
+        """空调数量."""
+        return len(self.entity_ids)
+
+    @property
+    def primary(self) -> str:
+        """第一台空调，合并状态使用它的实体ID."""
+        return self.entity_ids[0]
+
+    @property
+    def is_group(self) -> bool:
+        """是否绑定了多台空调."""
+        return len(self.entity_ids) > 1
+
+    @property
+    def state(self) -> State | None:
+        """用于显示的合并状态，没有任何空调加载时为 None."""
+        self._async_refresh()
+        return self._state
+
+    @property
+    def command_state(self) -> State | None:
+        """用于规划命令的合并状态，不一致的模式为 mixed，不一致的设定值为 None."""
+        self._async_refresh()
+        return self._command_state
+
+    @property
+    def units(self) -> list[dict[str, Any]] | None:
+        """各台空调不一致时每台空调的详情."""
+        self._async_refresh()
+        return self._units
+
+    @callback
+    def async_changed(self, entity_id: str, state: State | None) -> bool:
+        """状态变化事件是否改变了该台空调被投射的字段（与它的上一个事件相比）."""
+        fingerprint = source_fingerprint(state)
+        if self._seen.get(entity_id, _MISSING) == fingerprint:
+            return False
+        self._seen[entity_id] = fingerprint
+        return True
+
+    @callback
+    def _async_refresh(self) -> None:
+        """某台空调的指纹变化时重新合并."""
+        if not self.is_group:
+            # 单台空调总是使用状态机中最新的状态对象
+            self._state = self._command_state = self.hass.states.get(self.primary)
+            return
+        states = [self.hass.states.get(entity_id) for entity_id in self.entity_ids]
+        fingerprints = {
+            entity_id: source_fingerprint(state)
+            for entity_id, state in zip(self.entity_ids, states)
+        }
+        if fingerprints == self._fingerprints:
+            return
+        self._fingerprints = fingerprints
+        self._merge(states)
+        self.merges += 1
+
+    def _merge(self, states: list[State | None]) -> None:
+        """合并多台空调的状态."""
+        available = [state for state in states if _available(state)]
+        if not available:
+            # 全部未加载时为 None，否则显示第一台的不可用状态
+            loaded = [state for state in states if state is not None]
+            self._state = self._command_state = loaded[0] if loaded else None
+            self._units = None
+            return
+
+        modes = [state.state for state in available]
+        shared_mode = _shared(modes)
+        if shared_mode is not _MISSING:
+            mode = shared_mode
+        else:
+            # 显示多数运行中的模式，数量相同时按空调顺序
+            active = Counter(mode for mode in modes if mode != HVACMode.OFF)
+            mode = active.most_common(1)[0][0] if active else HVACMode.OFF.value
+        reference = next(state for state in available if state.state == mode)
+
+        # 能力取所有可用空调的交集，命令对每台空调都有效
+        attributes = dict(reference.attributes)
+        supported_features = int(available[0].attributes.get("supported_features") or 0)
+        for state in available[1:]:
+            supported_features &= int(state.attributes.get("supported_features") or 0)
+        attributes["supported_features"] = supported_features
+        for attribute in ("hvac_modes", "fan_modes", "swing_modes"):
+            if (common := _common_modes(available, attribute)) is not None:
+                attributes[attribute] = common
+        for attribute, pick in (
+            ("min_temp", max),
+            ("max_temp", min),
+            ("target_temp_step", max),
+        ):
+            if (value := _limit(available, attribute, pick)) is not None:
+                attributes[attribute] = value
+
+        command_attributes = dict(attributes)
+        agree = shared_mode is not _MISSING and len(available) == len(states)
+        for attribute in _SETPOINT_ATTRIBUTES:
+            shared = _shared([state.attributes.get(attribute) for state in available])
+            if shared is _MISSING:
+                command_attributes[attribute] = None
+                agree = False
+
+        self._state = State(self.primary, mode, attributes)
+        self._command_state = State(
+            self.primary,
+            mode if shared_mode is not _MISSING else STATE_MIXED,
+            command_attributes,
+        )
+        self._units = None if agree else [
+            {
+                "entity_id": entity_id,
+                "available": _available(state),
+                "hvac_mode": state.state if state is not None else None,
+                **{
+                    attribute: state.attributes.get(attribute) if state is not None else None
+                    for attribute in _SETPOINT_ATTRIBUTES
+                },
+            }
+            for entity_id, state in zip(self.entity_ids, states)
+        ]
+
+    async def async_fan_out(
+        self,
+        call: Callable[[str], Awaitable[str | None]],
+        entity_ids: list[str] | None = None,
+    ) -> dict[str, str]:
+        """以有限的并发对每台（或 entity_ids 中的）可用空调执行 call，返回每台空调的结果.
+
+        call 正常返回时结果为 ok（或它返回的结果，例如 timeout），抛出异常时结果为
+        异常的描述；不可用的空调不发送命令。
+        """
+        entity_ids = self.entity_ids if entity_ids is None else entity_ids
+
+        async def _async_call_unit(entity_id: str) -> str:
+            if not _available(self.hass.states.get(entity_id)):
+                return RESULT_UNAVAILABLE
+            async with self._semaphore:
+                try:
+                    return await call(entity_id) or RESULT_OK
+                except Exception as err:  # noqa: BLE001
+                    _LOGGER.debug("源空调 %s 命令失败: %s", entity_id, err)
+                    return repr(err)
+
+        results = await asyncio.gather(
+            *(_async_call_unit(entity_id) for entity_id in entity_ids)
+        )
+        self.last_results = dict(zip(entity_ids, results))
+        return self.last_results
+
+    @callback
+    def diagnostics(self) -> dict[str, Any]:
+        """诊断信息."""
+        return {
+            "entity_ids": self.entity_ids,
+            "max_parallel": self._max_parallel,
+            "merges": self.merges,
+            "units": self._units,
+            "last_results": self.last_results,
+        }
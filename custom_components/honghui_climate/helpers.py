@@ -0,0 +1,13 @@
+"""HongHui Climate 通用辅助函数."""
+from __future__ import annotations
+
+from typing import Any
+
+
+def entity_id_list(value: Any) -> list[str]:
+    """把配置中的单个实体ID或实体ID列表统一为列表（兼容旧版本的单个实体配置）."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [value]
+    return list(value)
@@ -0,0 +1,206 @@
+"""HongHui Climate 每个虚拟空调最近的温度、设定温度和模式样本."""
+from __future__ import annotations
+
+from array import array
+from collections.abc import Iterable
+import math
+
+from homeassistant.components.climate import HVACMode
+
+# 模式按枚举顺序编码为数字
+_MODES: tuple[HVACMode, ...] = tuple(HVACMode)
+_MODE_CODES = {mode.value: float(code) for code, mode in enumerate(_MODES)}
+
+_NAN = math.nan
+
+# 计算趋势至少需要的样本跨度（秒），跨度太短时斜率主要是噪声
+MIN_TREND_SPAN = 300
+
+# 估计到达目标温度的时间上限（秒），更慢的趋势视为不会到达
+MAX_TIME_TO_TARGET = 24 * 3600
+
+# 认为已经到达目标温度的误差（°C）
+TARGET_REACHED = 0.1
+
+Sample = tuple[float, float | None, float | None, str | None]
+
+
+def _value(value: float) -> float | None:
+    """NaN 表示没有值."""
+    return None if math.isnan(value) else value
+
+
+class SampleHistory:
+    """固定容量的样本环形缓冲，按列保存在 ``array('d')`` 中.
+
+    每个样本是时间戳、当前温度、目标温度和模式，缺少的值为 NaN。内存大小只取决于
+    容量（每个样本 32 字节），追加为 O(1)：距离最新样本的创建不到 resolution 秒且
+    模式和目标温度都没有变化时，覆盖最新样本而不是追加，因此容量对应的时间跨度
+    至少是 capacity × resolution 秒。窗口只有一百多个样本，查询逐个样本计算即可，
+    不需要在启动时加载 NumPy。
+    """
+
+    def __init__(self, capacity: int, resolution: float) -> None:
+        """初始化缓冲."""
+        self._capacity = capacity
+        self._resolution = resolution
+        self._timestamps = array("d", [_NAN]) * capacity
+        self._temperatures = array("d", [_NAN]) * capacity
+        self._setpoints = array("d", [_NAN]) * capacity
+        self._modes = array("d", [_NAN]) * capacity
+        # 下一个写入位置、样本数量和最新样本的创建时间
+        self._head = 0
+        self._count = 0
+        self._slot_created = _NAN
+
+    def __len__(self) -> int:
+        """样本数量."""
+        return self._count
+
+    @property
+    def nbytes(self) -> int:
+        """缓冲区占用的字节数."""
+        return sum(
+            column.itemsize * len(column)
+            for column in (self._timestamps, self._temperatures, self._setpoints, self._modes)
+        )
+
+    def clear(self) -> None:
+        """清除所有样本."""
+        self._head = 0
+        self._count = 0
+        self._slot_created = _NAN
+
+    def record(
+        self,
+        timestamp: float,
+        temperature: float | None,
+        setpoint: float | None,
+        mode: str | None,
+    ) -> None:
+        """记录一个样本."""
+        temperature = _NAN if temperature is None else float(temperature)
+        setpoint = _NAN if setpoint is None else float(setpoint)
+        code = _MODE_CODES.get(mode, _NAN) if mode is not None else _NAN
+        if self._count:
+            last = (self._head - 1) % self._capacity
+            if timestamp < self._timestamps[last]:
+                # 比最新样本更早的样本（例如迟到的历史记录）不再插入
+                return
+            if (
+                timestamp - self._slot_created < self._resolution
+                and _same(self._setpoints[last], setpoint)
+                and _same(self._modes[last], code)
+            ):
+                self._timestamps[last] = timestamp
+                self._temperatures[last] = temperature
+                return
+        index = self._head
+        self._timestamps[index] = timestamp
+        self._temperatures[index] = temperature
+        self._setpoints[index] = setpoint
+        self._modes[index] = code
+        self._head = (index + 1) % self._capacity
+        self._count = min(self._count + 1, self._capacity)
+        self._slot_created = timestamp
+
+    def seed(self, samples: Iterable[Sample]) -> int:
+        """用更早的样本（例如历史记录）填充缓冲，已有的样本保留在它们之后.
+
+        返回采用的历史样本数量。
+        """
+        existing = self.samples()
+        first = existing[0][0] if existing else math.inf
+        self.clear()
+        seeded = 0
+        for timestamp, temperature, setpoint, mode in samples:
+            if timestamp < first:
+                self.record(timestamp, temperature, setpoint, mode)
+                seeded += 1
+        for sample in existing:
+            self.record(*sample)
+        return seeded
+
+    def samples(self) -> list[Sample]:
+        """按时间顺序导出所有样本."""
+        return [
+            (
+                self._timestamps[index],
+                _value(self._temperatures[index]),
+                _value(self._setpoints[index]),
+                _MODES[int(code)].value if not math.isnan(code := self._modes[index]) else None,
+            )
+            for index in self._order()
+        ]
+
+    def _order(self) -> list[int]:
+        """按时间顺序排列的缓冲区下标."""
+        start = (self._head - self._count) % self._capacity
+        return [(start + offset) % self._capacity for offset in range(self._count)]
+
+    def _temperature_window(
+        self, now: float, window: float
+    ) -> tuple[list[float], list[float]]:
+        """窗口内有温度的样本的时间戳和温度（按时间顺序）."""
+        pairs = [
+            (self._timestamps[index], self._temperatures[index])
+            for index in self._order()
+            if self._timestamps[index] >= now - window
+            and not math.isnan(self._temperatures[index])
+        ]
+        return [pair[0] for pair in pairs], [pair[1] for pair in pairs]
+
+    def slope(self, now: float, window: float) -> float | None:
+        """窗口内温度的最小二乘斜率（°C/秒），样本不足时返回 None."""
+        timestamps, temperatures = self._temperature_window(now, window)
+        if len(timestamps) < 2 or timestamps[-1] - timestamps[0] < MIN_TREND_SPAN:
+            return None
+        mean_time = sum(timestamps) / len(timestamps)
+        mean_temperature = sum(temperatures) / len(temperatures)
+        denominator = sum((timestamp - mean_time) ** 2 for timestamp in timestamps)
+        if not denominator:
+            return None
+        return sum(
+            (timestamp - mean_time) * (temperature - mean_temperature)
+            for timestamp, temperature in zip(timestamps, temperatures)
+        ) / denominator
+
+    def min_max(self, now: float, window: float) -> tuple[float, float] | None:
+        """窗口内温度的最小值和最大值."""
+        _timestamps, temperatures = self._temperature_window(now, window)
+        if not temperatures:
+            return None
+        return min(temperatures), max(temperatures)
+
+    def time_since_change(self, now: float, field: str) -> float | None:
+        """目标温度（setpoint）或模式（mode）最近一次变化以来的秒数.
+
+        缓冲区内没有变化时返回 None。
+        """
+        column = self._setpoints if field == "setpoint" else self._modes
+        order = self._order()
+        for newer, older in zip(reversed(order), reversed(order[:-1])):
+            if not _same(column[newer], column[older]):
+                return now - self._timestamps[newer]
+        return None
+
+    def time_to_target(self, now: float, window: float, target: float | None) -> float | None:
+        """按窗口内的趋势估计温度到达 target 的秒数，不会到达时返回 None."""
+        if target is None or not self._count:
+            return None
+        latest = self._temperatures[(self._head - 1) % self._capacity]
+        if math.isnan(latest):
+            return None
+        difference = target - latest
+        if abs(difference) <= TARGET_REACHED:
+            return 0.0
+        slope = self.slope(now, window)
+        if not slope or (slope > 0) != (difference > 0):
+            return None
+        seconds = difference / slope
+        return seconds if seconds <= MAX_TIME_TO_TARGET else None
+
+
+def _same(first: float, second: float) -> bool:
+    """两个值是否相同，两个 NaN 视为相同."""
+    return first == second or (math.isnan(first) and math.isnan(second))
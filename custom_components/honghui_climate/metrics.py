@@ -0,0 +1,173 @@
+"""HongHui Climate 运行时指标."""
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime, timezone
+import time
+from typing import Any
+
+# 命令延迟直方图的桶上界（秒），最后一个桶收集更慢的命令
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 诊断信息中保留的最近事件和命令数量
+RECENT_SIZE = 50
+
+
+class LatencyHistogram:
+    """固定桶的延迟直方图，内存大小与样本数量无关."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self) -> None:
+        """初始化直方图."""
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        """记录一个样本."""
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    @property
+    def mean(self) -> float | None:
+        """平均值（秒）."""
+        return self.total / self.count if self.count else None
+
+    def quantile(self, fraction: float) -> float | None:
+        """按桶上界估计分位数（秒）."""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else self.max
+        return self.max
+
+    def as_dict(self) -> dict[str, Any]:
+        """以字典形式导出，桶以上界（毫秒）为键."""
+        buckets = {
+            f"le_{int(bound * 1000)}ms": count
+            for bound, count in zip(LATENCY_BUCKETS, self.counts)
+        }
+        buckets["inf"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "mean_ms": _ms(self.mean),
+            "p50_ms": _ms(self.quantile(0.5)),
+            "p95_ms": _ms(self.quantile(0.95)),
+            "max_ms": _ms(self.max) if self.count else None,
+            "buckets": buckets,
+        }
+
+
+def _ms(seconds: float | None) -> float | None:
+    """秒转换为毫秒."""
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+def _iso(timestamp: float) -> str:
+    """Unix 时间戳转换为 ISO 8601 字符串."""
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+class EntityMetrics:
+    """单个虚拟空调的热路径计数器，以及最近事件和命令的环形缓冲."""
+
+    def __init__(self, recent_size: int = RECENT_SIZE) -> None:
+        """初始化计数器."""
+        # 收到的源实体事件
+        self.inbound_events = 0
+        # 没有引起重新投射的事件（投射字段未变化或被温度过滤器拦下）
+        self.suppressed_events = 0
+        # 被合并到同一次更新中的事件
+        self.coalesced_updates = 0
+        # 状态写入，以及因对外状态未变化而跳过的写入
+        self.state_writes = 0
+        self.skipped_writes = 0
+        # 发往源空调的命令
+        self.commands_sent = 0
+        self.command_failures = 0
+        # 已发出但源空调未在期限内确认的命令
+        self.command_timeouts = 0
+        self.command_latency = LatencyHistogram()
+        # 在网关队列中等待发送的命令数，以及命令在队列中的等待时间
+        self.gateway_queued = 0
+        self.gateway_wait = LatencyHistogram()
+        # 递归保护触发次数
+        self.recursion_guard_trips = 0
+        # 被识别为本实体命令回声、无需重新投射的源空调事件
+        self.echo_events = 0
+        # 乐观值未被源空调确认而回滚的次数
+        self.optimistic_rollbacks = 0
+        # 最近的入站事件（含由它们触发的状态更新）和出站命令，只保存元组，导出时再格式化
+        self.recent_events: deque[tuple[float, str, str, float | None]] = deque(
+            maxlen=recent_size
+        )
+        self.recent_commands: deque[tuple[float, str, dict[str, Any], float, str | None]] = deque(
+            maxlen=recent_size
+        )
+
+    def record_event(self, source: str, result: str, duration: float | None = None) -> None:
+        """记录一个入站事件或状态更新."""
+        self.recent_events.append((time.time(), source, result, duration))
+
+    def record_command(
+        self,
+        service: str,
+        data: dict[str, Any],
+        duration: float,
+        error: str | None = None,
+    ) -> None:
+        """记录一个出站命令."""
+        self.recent_commands.append((time.time(), service, data, duration, error))
+
+    def as_dict(self) -> dict[str, Any]:
+        """以字典形式导出所有指标."""
+        return {
+            "inbound_events": self.inbound_events,
+            "suppressed_events": self.suppressed_events,
+            "coalesced_updates": self.coalesced_updates,
+            "state_writes": self.state_writes,
+            "skipped_writes": self.skipped_writes,
+            "commands_sent": self.commands_sent,
+            "command_failures": self.command_failures,
+            "command_timeouts": self.command_timeouts,
+            "command_latency": self.command_latency.as_dict(),
+            "gateway_queued": self.gateway_queued,
+            "gateway_wait": self.gateway_wait.as_dict(),
+            "recursion_guard_trips": self.recursion_guard_trips,
+            "echo_events": self.echo_events,
+            "optimistic_rollbacks": self.optimistic_rollbacks,
+        }
+
+    def recent_as_list(self) -> dict[str, list[dict[str, Any]]]:
+        """导出最近的事件和命令，持续时间为毫秒."""
+        return {
+            "events": [
+                {
+                    "time": _iso(timestamp),
+                    "source": source,
+                    "result": result,
+                    "duration_ms": _ms(duration),
+                }
+                for timestamp, source, result, duration in self.recent_events
+            ],
+            "commands": [
+                {
+                    "time": _iso(timestamp),
+                    "service": service,
+                    "data": data,
+                    "duration_ms": _ms(duration),
+                    "error": error,
+                }
+                for timestamp, service, data, duration, error in self.recent_commands
+            ],
+        }
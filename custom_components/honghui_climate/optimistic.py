@@ -0,0 +1,88 @@
+"""HongHui Climate 乐观状态."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable, Mapping
+from typing import Any
+
+from homeassistant.core import HomeAssistant, State, callback
+
+from .commands import source_value, values_match
+
+
+class OptimisticOverlay:
+    """命令发出后立即显示的乐观值.
+
+    每个属性（模式、目标温度、风扇、摆动）最多有一个等待确认的值。源空调上报一致
+    的状态时确认并移除；超时仍未确认时回滚，由 on_rollback 回调记录失败并恢复源空调
+    的实际状态。
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        timeout: float,
+        on_rollback: Callable[[str, Any, str], None],
+    ) -> None:
+        """初始化乐观状态."""
+        self.hass = hass
+        self._timeout = timeout
+        self._on_rollback = on_rollback
+        self._pending: dict[str, tuple[Any, asyncio.TimerHandle]] = {}
+        # 统计数据
+        self.confirmed = 0
+        self.rolled_back = 0
+
+    @property
+    def values(self) -> dict[str, Any]:
+        """等待确认的乐观值."""
+        return {key: value for key, (value, _handle) in self._pending.items()}
+
+    def __bool__(self) -> bool:
+        """是否有等待确认的值."""
+        return bool(self._pending)
+
+    @callback
+    def async_set(self, values: Mapping[str, Any]) -> None:
+        """记录新发出的命令值，覆盖同一属性尚未确认的旧值."""
+        for key, value in values.items():
+            if (pending := self._pending.get(key)) is not None:
+                pending[1].cancel()
+            self._pending[key] = (
+                value,
+                self.hass.loop.call_later(self._timeout, self._async_expire, key),
+            )
+
+    @callback
+    def async_confirm(self, state: State) -> None:
+        """用源空调的最新状态确认乐观值."""
+        for key, (value, handle) in list(self._pending.items()):
+            if values_match(key, value, source_value(state, key)):
+                handle.cancel()
+                del self._pending[key]
+                self.confirmed += 1
+
+    @callback
+    def async_rollback(self, keys: list[str], reason: str) -> None:
+        """立即回滚指定属性的乐观值，例如命令发送失败."""
+        for key in keys:
+            if (pending := self._pending.pop(key, None)) is None:
+                continue
+            pending[1].cancel()
+            self.rolled_back += 1
+            self._on_rollback(key, pending[0], reason)
+
+    @callback
+    def async_clear(self) -> None:
+        """丢弃所有乐观值，不回滚."""
+        for _value, handle in self._pending.values():
+            handle.cancel()
+        self._pending.clear()
+
+    @callback
+    def _async_expire(self, key: str) -> None:
+        """超时仍未确认，回滚."""
+        if (pending := self._pending.pop(key, None)) is None:
+            return
+        self.rolled_back += 1
+        self._on_rollback(key, pending[0], "timeout")
@@ -0,0 +1,162 @@
+"""HongHui Climate 集成服务的限流."""
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+import logging
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+
+_LOGGER = logging.getLogger(__name__)
+
+Action = Callable[[dict[str, Any]], Awaitable[None]]
+
+
+@dataclass
+class _Bucket:
+    """单个键的令牌桶和被推迟的调用."""
+
+    tokens: float
+    updated: float
+    # 被推迟的调用：合并后的参数、最新的执行函数和所有等待者
+    payload: dict[str, Any] | None = None
+    action: Action | None = None
+    waiters: list[asyncio.Future[None]] = field(default_factory=list)
+    handle: asyncio.TimerHandle | None = None
+
+
+class TokenBucketLimiter:
+    """按键（虚拟空调）的令牌桶限流器.
+
+    桶内有令牌时调用立即执行；没有令牌时调用被推迟到下一个令牌产生，期间的后续
+    调用与它合并（后写者胜出），不会被丢弃。键的数量有上限，超过时按最久未使用的
+    顺序淘汰没有推迟调用的键。
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        rate: float,
+        burst: int,
+        max_keys: int = 256,
+    ) -> None:
+        """初始化限流器."""
+        self.hass = hass
+        self._rate = rate
+        self._burst = burst
+        self._max_keys = max_keys
+        self._buckets: OrderedDict[str, _Bucket] = OrderedDict()
+        # 统计数据
+        self.immediate = 0
+        self.deferred = 0
+        self.merged = 0
+
+    def __len__(self) -> int:
+        """当前跟踪的键数量."""
+        return len(self._buckets)
+
+    async def async_call(self, key: str, payload: dict[str, Any], action: Action) -> None:
+        """在限流下执行调用，被推迟时等待合并后的调用完成."""
+        now = self.hass.loop.time()
+        bucket = self._async_bucket(key, now)
+
+        if bucket.payload is not None:
+            # 已有被推迟的调用，合并为最新的参数
+            self.merged += 1
+            bucket.payload.update(payload)
+            bucket.action = action
+        elif bucket.tokens >= 1:
+            self.immediate += 1
+            bucket.tokens -= 1
+            await action(payload)
+            return
+        else:
+            self.deferred += 1
+            bucket.payload = dict(payload)
+            bucket.action = action
+            delay = (1 - bucket.tokens) / self._rate
+            _LOGGER.debug("服务调用过于频繁，推迟 %.2f 秒执行: %s", delay, key)
+            bucket.handle = self.hass.loop.call_later(delay, self._async_release, key)
+
+        future: asyncio.Future[None] = self.hass.loop.create_future()
+        bucket.waiters.append(future)
+        await future
+
+    @callback
+    def async_remove(self, key: str) -> None:
+        """移除一个键，取消它被推迟的调用."""
+        if (bucket := self._buckets.pop(key, None)) is None:
+            return
+        if bucket.handle is not None:
+            bucket.handle.cancel()
+        for waiter in bucket.waiters:
+            if not waiter.done():
+                waiter.set_exception(HomeAssistantError("虚拟空调已卸载，调用未执行"))
+
+    @callback
+    def _async_bucket(self, key: str, now: float) -> _Bucket:
+        """获取键的令牌桶并补充令牌."""
+        if (bucket := self._buckets.get(key)) is None:
+            bucket = self._buckets[key] = _Bucket(tokens=self._burst, updated=now)
+            self._async_evict(key)
+        else:
+            self._buckets.move_to_end(key)
+            bucket.tokens = min(
+                self._burst, bucket.tokens + (now - bucket.updated) * self._rate
+            )
+            bucket.updated = now
+        return bucket
+
+    @callback
+    def _async_evict(self, current: str) -> None:
+        """按最久未使用的顺序淘汰没有推迟调用的键，正在使用的键 current 除外.
+
+        所有其他键都有推迟的调用时暂时超出上限，之后添加新键时再淘汰。
+        """
+        if len(self._buckets) <= self._max_keys:
+            return
+        for key in list(self._buckets):
+            if len(self._buckets) <= self._max_keys:
+                break
+            if key != current and self._buckets[key].payload is None:
+                del self._buckets[key]
+
+    @callback
+    def _async_release(self, key: str) -> None:
+        """令牌产生后执行被推迟的调用."""
+        if (bucket := self._buckets.get(key)) is None:
+            return
+        now = self.hass.loop.time()
+        bucket.tokens = max(
+            0.0,
+            min(self._burst, bucket.tokens + (now - bucket.updated) * self._rate) - 1,
+        )
+        bucket.updated = now
+        payload, action, waiters = bucket.payload, bucket.action, bucket.waiters
+        bucket.payload = bucket.action = bucket.handle = None
+        bucket.waiters = []
+        self.hass.async_create_background_task(
+            self._async_run(action, payload, waiters), f"honghui_climate rate limit {key}"
+        )
+
+    async def _async_run(
+        self,
+        action: Action,
+        payload: dict[str, Any],
+        waiters: list[asyncio.Future[None]],
+    ) -> None:
+        """执行被推迟的调用并通知等待者."""
+        try:
+            await action(payload)
+        except Exception as err:  # noqa: BLE001
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(err)
+        else:
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
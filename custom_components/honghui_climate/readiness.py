@@ -0,0 +1,154 @@
+"""HongHui Climate 源实体就绪等待."""
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable
+import logging
+
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.helpers.entity_registry import EVENT_ENTITY_REGISTRY_UPDATED
+from homeassistant.helpers.event import (
+    async_call_later,
+    async_track_state_change_event,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class SourceReadinessWaiter:
+    """等待一组源实体出现在状态机中.
+
+    通过订阅源实体的状态变化事件和实体注册表事件来代替轮询，
+    最后一个依赖实体出现时在同一个事件循环周期内回调 ``on_ready``。
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entity_ids: Iterable[str],
+        on_ready: Callable[[list[str]], None],
+        timeout: float | None = None,
+        on_timeout: Callable[[list[str]], None] | None = None,
+    ) -> None:
+        """初始化等待器."""
+        self.hass = hass
+        self._entity_ids = list(entity_ids)
+        # 原始实体ID -> 当前实体ID（源实体在注册表中被重命名时会变化）
+        self._resolved = {entity_id: entity_id for entity_id in self._entity_ids}
+        self._pending: set[str] = set()
+        self._on_ready = on_ready
+        self._on_timeout = on_timeout
+        self._timeout = timeout
+        self._unsub_state: CALLBACK_TYPE | None = None
+        self._unsub_registry: CALLBACK_TYPE | None = None
+        self._unsub_timeout: CALLBACK_TYPE | None = None
+        self._done = False
+
+    @property
+    def pending(self) -> list[str]:
+        """尚未出现的源实体."""
+        return sorted(self._pending)
+
+    @property
+    def done(self) -> bool:
+        """等待是否已结束（就绪、超时或取消）."""
+        return self._done
+
+    @callback
+    def async_start(self) -> None:
+        """开始等待，如果所有源实体都已存在则立即回调."""
+        self._refresh_pending()
+        if not self._pending:
+            self._async_finish()
+            return
+
+        _LOGGER.debug("等待源实体加载: %s", self.pending)
+        self._unsub_registry = self.hass.bus.async_listen(
+            EVENT_ENTITY_REGISTRY_UPDATED, self._async_registry_updated
+        )
+        self._async_track_pending()
+
+        if self._timeout:
+            self._unsub_timeout = async_call_later(
+                self.hass, self._timeout, self._async_timed_out
+            )
+
+    @callback
+    def async_cancel(self) -> None:
+        """取消等待并释放所有订阅."""
+        self._done = True
+        if self._unsub_state:
+            self._unsub_state()
+            self._unsub_state = None
+        if self._unsub_registry:
+            self._unsub_registry()
+            self._unsub_registry = None
+        if self._unsub_timeout:
+            self._unsub_timeout()
+            self._unsub_timeout = None
+
+    def _refresh_pending(self) -> None:
+        """根据状态机重新计算尚未出现的实体."""
+        self._pending = {
+            entity_id
+            for entity_id in self._resolved.values()
+            if self.hass.states.get(entity_id) is None
+        }
+
+    @callback
+    def _async_track_pending(self) -> None:
+        """只订阅仍在等待的实体."""
+        if self._unsub_state:
+            self._unsub_state()
+        self._unsub_state = async_track_state_change_event(
+            self.hass, list(self._pending), self._async_state_changed
+        )
+
+    @callback
+    def _async_state_changed(self, event: Event) -> None:
+        """源实体状态出现时的处理."""
+        if self._done or event.data.get("new_state") is None:
+            return
+        self._pending.discard(event.data["entity_id"])
+        if not self._pending:
+            self._async_finish()
+
+    @callback
+    def _async_registry_updated(self, event: Event) -> None:
+        """实体注册表变化时的处理（创建、重命名、启用）."""
+        if self._done:
+            return
+        entity_id = event.data.get("entity_id")
+        old_entity_id = event.data.get("old_entity_id")
+        if entity_id not in self._pending and old_entity_id not in self._pending:
+            return
+
+        if old_entity_id in self._pending:
+            # 源实体被重命名，跟随新的实体ID
+            _LOGGER.info("源实体已重命名: %s -> %s", old_entity_id, entity_id)
+            for original, current in self._resolved.items():
+                if current == old_entity_id:
+                    self._resolved[original] = entity_id
+
+        self._refresh_pending()
+        if not self._pending:
+            self._async_finish()
+            return
+        self._async_track_pending()
+
+    @callback
+    def _async_timed_out(self, _now) -> None:
+        """超过整体等待期限."""
+        self._unsub_timeout = None
+        if self._done:
+            return
+        pending = self.pending
+        self.async_cancel()
+        _LOGGER.error("等待源实体超时(%s秒)，仍不可用: %s", self._timeout, pending)
+        if self._on_timeout is not None:
+            self._on_timeout(pending)
+
+    @callback
+    def _async_finish(self) -> None:
+        """所有源实体都已就绪."""
+        self.async_cancel()
+        self._on_ready([self._resolved[entity_id] for entity_id in self._entity_ids])
@@ -0,0 +1,75 @@
+"""HongHui Climate 实体状态更新调度."""
+from __future__ import annotations
+
+from asyncio import TimerHandle
+from collections.abc import Callable
+import logging
+
+from homeassistant.core import HomeAssistant, callback
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class UpdateCoalescer:
+    """把一个时间窗口内任意次数的更新请求合并为一次执行.
+
+    第一个请求启动一个定时器，窗口内的后续请求只计数而不分配新的任务，
+    因此最坏情况下的延迟就是窗口长度。窗口为 0 时同步执行。
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        window: float,
+        action: Callable[[], None],
+    ) -> None:
+        """初始化调度器."""
+        self.hass = hass
+        self._window = window
+        self._action = action
+        self._handle: TimerHandle | None = None
+        # 统计数据
+        self.requested = 0
+        self.coalesced = 0
+        self.executed = 0
+
+    @property
+    def window(self) -> float:
+        """合并窗口（秒）."""
+        return self._window
+
+    @property
+    def due(self) -> float | None:
+        """等待中的更新的执行时间（事件循环时间）."""
+        return self._handle.when() if self._handle is not None else None
+
+    @property
+    def pending(self) -> bool:
+        """是否有等待执行的更新."""
+        return self._handle is not None
+
+    @callback
+    def async_request(self) -> None:
+        """请求一次更新."""
+        self.requested += 1
+        if self._handle is not None:
+            self.coalesced += 1
+            return
+        if self._window <= 0:
+            self._run()
+            return
+        self._handle = self.hass.loop.call_later(self._window, self._run)
+
+    @callback
+    def async_cancel(self) -> None:
+        """取消等待中的更新."""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    @callback
+    def _run(self) -> None:
+        """执行更新."""
+        self._handle = None
+        self.executed += 1
+        self._action()
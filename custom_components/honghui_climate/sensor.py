@@ -0,0 +1,166 @@
+"""HongHui Climate 运行时指标诊断传感器."""
+from __future__ import annotations
+
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any
+
+from homeassistant.components.sensor import (
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory, UnitOfTime
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_track_time_interval
+
+from .const import (
+    CONF_ENABLE_METRICS,
+    DATA_METRICS,
+    DEFAULT_ENABLE_METRICS,
+    DEFAULT_NAME,
+    DOMAIN,
+    METRICS_UPDATE_INTERVAL,
+)
+from .metrics import EntityMetrics
+
+
+@dataclass(frozen=True, kw_only=True)
+class HonghuiMetricSensorDescription(SensorEntityDescription):
+    """指标传感器描述."""
+
+    value_fn: Callable[[EntityMetrics], float | int | None]
+    attributes_fn: Callable[[EntityMetrics], Mapping[str, Any]] | None = None
+
+
+def _counter(key: str) -> HonghuiMetricSensorDescription:
+    """累计计数器传感器描述."""
+    return HonghuiMetricSensorDescription(
+        key=key,
+        translation_key=key,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: getattr(metrics, key),
+    )
+
+
+METRIC_SENSORS: tuple[HonghuiMetricSensorDescription, ...] = (
+    _counter("inbound_events"),
+    _counter("suppressed_events"),
+    _counter("coalesced_updates"),
+    _counter("state_writes"),
+    _counter("skipped_writes"),
+    _counter("commands_sent"),
+    _counter("command_failures"),
+    _counter("command_timeouts"),
+    _counter("recursion_guard_trips"),
+    _counter("echo_events"),
+    _counter("optimistic_rollbacks"),
+    HonghuiMetricSensorDescription(
+        key="command_latency",
+        translation_key="command_latency",
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        value_fn=lambda metrics: metrics.command_latency.as_dict()["p95_ms"],
+        attributes_fn=lambda metrics: metrics.command_latency.as_dict(),
+    ),
+    HonghuiMetricSensorDescription(
+        key="gateway_queued",
+        translation_key="gateway_queued",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda metrics: metrics.gateway_queued,
+    ),
+    HonghuiMetricSensorDescription(
+        key="gateway_wait",
+        translation_key="gateway_wait",
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        value_fn=lambda metrics: metrics.gateway_wait.as_dict()["p95_ms"],
+        attributes_fn=lambda metrics: metrics.gateway_wait.as_dict(),
+    ),
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """设置指标传感器."""
+    if not entry.options.get(CONF_ENABLE_METRICS, DEFAULT_ENABLE_METRICS):
+        return
+
+    metrics: EntityMetrics = hass.data[DOMAIN][entry.entry_id][DATA_METRICS]
+    async_add_entities(
+        HonghuiMetricSensor(entry.entry_id, metrics, description)
+        for description in METRIC_SENSORS
+    )
+
+
+class HonghuiMetricSensor(SensorEntity):
+    """虚拟空调的一个运行时指标.
+
+    计数器在热路径上直接累加，传感器只按固定间隔读取，并且只在数值变化时写入状态，
+    不会给事件处理增加额外的状态写入。
+    """
+
+    entity_description: HonghuiMetricSensorDescription
+
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(
+        self,
+        entry_id: str,
+        metrics: EntityMetrics,
+        description: HonghuiMetricSensorDescription,
+    ) -> None:
+        """初始化指标传感器."""
+        self.entity_description = description
+        self._metrics = metrics
+        self._attr_unique_id = f"{DOMAIN}_{entry_id}_{description.key}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, entry_id)},
+            name=DEFAULT_NAME,
+            manufacturer="Honghui",
+            model="Virtual AC",
+        )
+        self._refresh()
+
+    async def async_added_to_hass(self) -> None:
+        """开始定时刷新."""
+        self.async_on_remove(
+            async_track_time_interval(
+                self.hass,
+                self._async_refresh,
+                timedelta(seconds=METRICS_UPDATE_INTERVAL),
+            )
+        )
+
+    def _refresh(self) -> bool:
+        """读取指标，返回数值是否变化."""
+        description = self.entity_description
+        value = description.value_fn(self._metrics)
+        attributes = (
+            description.attributes_fn(self._metrics)
+            if description.attributes_fn
+            else None
+        )
+        if value == self._attr_native_value and attributes == getattr(
+            self, "_attr_extra_state_attributes", None
+        ):
+            return False
+        self._attr_native_value = value
+        self._attr_extra_state_attributes = attributes
+        return True
+
+    @callback
+    def _async_refresh(self, _now: datetime) -> None:
+        """定时刷新，数值未变化时不写入状态."""
+        if self._refresh():
+            self.async_write_ha_state()
@@ -0,0 +1,122 @@
+"""HongHui Climate 温度传感器输入过滤."""
+from __future__ import annotations
+
+from collections import deque
+
+from .const import SMOOTHING_EMA, SMOOTHING_MEDIAN, SMOOTHING_NONE
+
+# 中值平滑使用的样本数
+MEDIAN_WINDOW = 5
+
+
+class TemperatureFilter:
+    """温度传感器输入过滤：平滑、死区和最小发布间隔.
+
+    每个实体只保存常数大小的状态。被最小间隔拦下的值会保留为待发布值，
+    由调用方在 ``next_flush`` 返回的延迟后调用 ``flush`` 发布，保证最终值不会丢失。
+    """
+
+    def __init__(
+        self,
+        deadband: float = 0.0,
+        min_interval: float = 0.0,
+        smoothing: str = SMOOTHING_NONE,
+        ema_alpha: float = 0.3,
+    ) -> None:
+        """初始化过滤器."""
+        self._deadband = deadband
+        self._min_interval = min_interval
+        self._smoothing = smoothing
+        self._ema_alpha = ema_alpha
+        self._ema: float | None = None
+        self._window: deque[float] = deque(maxlen=MEDIAN_WINDOW)
+        self._last_value: float | None = None
+        self._last_emit: float | None = None
+        self._pending: float | None = None
+        # 统计数据
+        self.received = 0
+        self.emitted = 0
+
+    @property
+    def enabled(self) -> bool:
+        """是否启用了任何过滤."""
+        return bool(
+            self._deadband > 0
+            or self._min_interval > 0
+            or self._smoothing != SMOOTHING_NONE
+        )
+
+    @property
+    def suppressed(self) -> int:
+        """被过滤掉（未发布）的输入数量."""
+        return self.received - self.emitted
+
+    @property
+    def pending(self) -> float | None:
+        """等待最小间隔结束后发布的值."""
+        return self._pending
+
+    def reset(self) -> None:
+        """清除历史，例如更换了温度传感器."""
+        self._ema = None
+        self._window.clear()
+        self._last_value = None
+        self._last_emit = None
+        self._pending = None
+
+    def push(self, value: float, now: float) -> float | None:
+        """输入一个原始读数，返回需要立即发布的值；None 表示暂不发布."""
+        self.received += 1
+        smoothed = self._smooth(value)
+
+        if (
+            self._last_value is not None
+            and abs(smoothed - self._last_value) < self._deadband
+        ):
+            # 在死区内，之前待发布的值也不再需要
+            self._pending = None
+            return None
+
+        if self._last_emit is not None and now - self._last_emit < self._min_interval:
+            self._pending = smoothed
+            return None
+
+        self._emit(smoothed, now)
+        return smoothed
+
+    def next_flush(self, now: float) -> float | None:
+        """距离待发布值可以发布还需等待的秒数，没有待发布值时返回 None."""
+        if self._pending is None or self._last_emit is None:
+            return None
+        return max(0.0, self._last_emit + self._min_interval - now)
+
+    def flush(self, now: float) -> float | None:
+        """发布待发布的值."""
+        if (value := self._pending) is None:
+            return None
+        self._emit(value, now)
+        return value
+
+    def _emit(self, value: float, now: float) -> None:
+        """记录一次发布."""
+        self._pending = None
+        self._last_value = value
+        self._last_emit = now
+        self.emitted += 1
+
+    def _smooth(self, value: float) -> float:
+        """按配置的方式平滑原始读数."""
+        if self._smoothing == SMOOTHING_EMA:
+            if self._ema is None:
+                self._ema = value
+            else:
+                self._ema += self._ema_alpha * (value - self._ema)
+            return round(self._ema, 2)
+        if self._smoothing == SMOOTHING_MEDIAN:
+            self._window.append(value)
+            ordered = sorted(self._window)
+            middle = len(ordered) // 2
+            if len(ordered) % 2:
+                return ordered[middle]
+            return (ordered[middle - 1] + ordered[middle]) / 2
+        return value
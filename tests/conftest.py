@@ -0,0 +1,10 @@
+"""洪绘空调测试的 pytest 配置."""
+from __future__ import annotations
+
+from pathlib import Path
+import sys
+
+# 让测试能导入仓库中的 custom_components
+sys.path.insert(0, str(Path(__file__).parents[1]))
+
+pytest_plugins = ["pytest_homeassistant_custom_component"]
@@ -0,0 +1,64 @@
+"""出站命令队列的测试."""
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+from homeassistant.components.climate import ClimateEntityFeature, HVACMode
+from homeassistant.const import ATTR_TEMPERATURE
+from homeassistant.core import Context, HomeAssistant, State
+
+from custom_components.honghui_climate.commands import (
+    CommandQueue,
+    TargetState,
+    plan_commands,
+)
+
+FEATURES = ClimateEntityFeature.TARGET_TEMPERATURE | ClimateEntityFeature.TURN_OFF
+
+
+async def test_mode_commands_keep_submission_order(hass: HomeAssistant) -> None:
+    """快速切换制冷、制热、关机时，关机之后不会再发出较早的模式."""
+    sent: list[tuple[str, dict[str, Any]]] = []
+    release = asyncio.Event()
+
+    async def _async_send(
+        service: str,
+        data: dict[str, Any],
+        targets: list[str] | None,
+        context: Context | None,
+    ) -> None:
+        sent.append((service, dict(data)))
+        # 源空调确认之前命令一直处于发送中
+        await release.wait()
+
+    queue = CommandQueue(hass, _async_send, "climate.ac")
+    # 源空调还没有上报任何变化，每次都按同一个状态规划
+    state = State(
+        "climate.ac",
+        HVACMode.DRY,
+        {"supported_features": FEATURES, ATTR_TEMPERATURE: 20},
+    )
+
+    cool = asyncio.create_task(
+        queue.async_execute(plan_commands(state, TargetState(HVACMode.COOL, 22)))
+    )
+    # 等到制冷命令开始发送
+    while not sent:
+        await asyncio.sleep(0)
+    heat = asyncio.create_task(
+        queue.async_execute(plan_commands(state, TargetState(HVACMode.HEAT, 24)))
+    )
+    await asyncio.sleep(0)
+    off = asyncio.create_task(
+        queue.async_execute(plan_commands(state, TargetState(HVACMode.OFF)))
+    )
+    await asyncio.sleep(0)
+
+    release.set()
+    await asyncio.gather(cool, heat, off)
+
+    assert sent == [
+        ("set_temperature", {ATTR_TEMPERATURE: 22, "hvac_mode": HVACMode.COOL}),
+        ("turn_off", {}),
+    ]